@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Cold-start benchmark for post-application-data.
+
+post-application-data is run from poll rule actions every poll period for
+every queue, so its start-up time is paid constantly. This script starts a
+local stub of the application data endpoint, spawns a fresh interpreter
+for each run that posts a document to it the way the command does
+(including importing and constructing the web service client) and fails
+if the median exceeds the budget or the stub did not receive every post.
+
+It also verifies that importing the CLI module does not pull in modules
+that are only needed once a request is actually made, and reports how
+much of the time is the bare interpreter, the Tortuga CLI framework
+(which RuleCli subclasses, so it cannot be deferred) and printing the
+usage message.
+"""
+
+import argparse
+import http.server
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+# Median wall-clock budget (seconds) for posting a document
+DEFAULT_BUDGET = 0.5
+
+# Modules that must only be imported on demand
+DEFERRED_MODULES = [
+    'tortuga.rule.wsapi.ruleWsApi',
+    'tortuga.rule.objects.rule',
+    'tortuga.rule.ruleObjectFactory',
+    'tortuga.rule.ruleXmlParser',
+    'xml.dom.minidom',
+    'jinja2',
+]
+
+CLI_MODULE = 'tortuga.rule.scripts.post_application_data'
+
+APPLICATION_NAME = 'benchmark'
+
+DOCUMENT = b"""<?xml version="1.0"?>
+<resourceData queue="burst.q">
+  <neededNodes>4</neededNodes>
+</resourceData>
+"""
+
+# Runs the command as installed, with the web service URL and credentials
+# pointing at the local stub
+POST_SNIPPET = """\
+import sys
+sys.argv = ['post-application-data', '--app-name', {name!r},
+            '--data-file', {dataFile!r}]
+from {module} import PostApplicationDataCli
+cli = PostApplicationDataCli()
+cli.getUrl = lambda: {url!r}
+cli.getUsername = lambda: 'admin'
+cli.getPassword = lambda: 'password'
+cli.run()
+"""
+
+USAGE_SNIPPET = """\
+import sys
+sys.argv = ['post-application-data', '--help']
+from {0} import main
+try:
+    main()
+except SystemExit:
+    pass
+""".format(CLI_MODULE)
+
+# Start-up of the bare interpreter, of the CLI framework alone and up to
+# the usage message
+BASELINE_SNIPPETS = [
+    ('interpreter', 'pass'),
+    ('framework', 'import tortuga.cli.tortugaCli'),
+    ('usage', USAGE_SNIPPET),
+]
+
+IMPORT_SNIPPET = """\
+import json, sys
+import {0}
+print(json.dumps(sorted(sys.modules)))
+""".format(CLI_MODULE)
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Accepts documents posted to the application data endpoint.
+    """
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        if self.path == '/v1/applications/{0}/data'.format(
+                APPLICATION_NAME) and body == DOCUMENT:
+            self.server.postCount += 1
+
+            status, content = 200, b'{}'
+        else:
+            status, content = 404, b'{}'
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+
+        self.wfile.write(content)
+
+
+def start_stub_server():
+    server = http.server.HTTPServer(('127.0.0.1', 0), StubHandler)
+    server.postCount = 0
+
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    return server
+
+
+def measure_startup(runs, snippet):
+    timings = []
+
+    with open(os.devnull, 'w') as devnull:
+        for _ in range(runs):
+            start = time.perf_counter()
+
+            subprocess.check_call(
+                [sys.executable, '-c', snippet],
+                stdout=devnull, stderr=devnull)
+
+            timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+def measure_post(runs):
+    """
+    Returns:
+        (timings, number of documents received by the stub)
+    """
+
+    server = start_stub_server()
+
+    with tempfile.NamedTemporaryFile(suffix='.xml') as dataFile:
+        dataFile.write(DOCUMENT)
+        dataFile.flush()
+
+        snippet = POST_SNIPPET.format(
+            name=APPLICATION_NAME, dataFile=dataFile.name, module=CLI_MODULE,
+            url='http://127.0.0.1:{0}'.format(server.server_address[1]))
+
+        try:
+            timings = measure_startup(runs, snippet)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    return timings, server.postCount
+
+
+def find_eager_imports():
+    output = subprocess.check_output([sys.executable, '-c', IMPORT_SNIPPET])
+
+    loaded = set(json.loads(output.decode()))
+
+    return [name for name in DEFERRED_MODULES if name in loaded]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--runs', type=int, default=10,
+                        help='Number of cold starts (default: %(default)s)')
+    parser.add_argument(
+        '--budget', type=float,
+        default=float(os.getenv('SPE_CLI_STARTUP_BUDGET', DEFAULT_BUDGET)),
+        help='Median budget per post in seconds (default: %(default)s)')
+
+    args = parser.parse_args()
+
+    eager = find_eager_imports()
+
+    timings, postCount = measure_post(args.runs)
+
+    median = statistics.median(timings)
+
+    print('post-application-data cold start and post over {} run(s):'.format(
+        args.runs))
+    print('  min:    {:.3f}s'.format(min(timings)))
+    print('  median: {:.3f}s'.format(median))
+    print('  max:    {:.3f}s'.format(max(timings)))
+    print('  budget: {:.3f}s'.format(args.budget))
+
+    for name, snippet in BASELINE_SNIPPETS:
+        print('  {:<13}{:.3f}s (median)'.format(
+            name + ':', statistics.median(
+                measure_startup(args.runs, snippet))))
+
+    failed = False
+
+    if eager:
+        print('Modules imported eagerly: {}'.format(', '.join(eager)))
+        failed = True
+
+    if postCount != args.runs:
+        print('Stub endpoint received {} of {} document(s)'.format(
+            postCount, args.runs))
+        failed = True
+
+    if median > args.budget:
+        print('Median time per post exceeds budget')
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
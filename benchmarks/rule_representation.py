@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Rule representation benchmark.
+
+Compares the TortugaObject rule form with the engine's compiled form
+(CompiledRule) in:
+
+  memory      bytes allocated per loaded rule
+  evaluation  rule evaluations per second, where an evaluation does the
+              attribute accesses and counter updates the engine does for
+              a receive rule with an action (conditions and XPath
+              variables read, invocation and action counters updated,
+              maximum invocations checked)
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from tortuga.objects.xPathVariable import XPathVariable
+from tortuga.rule.compiledRule import CompiledRule
+from tortuga.rule.objects.applicationMonitor import ApplicationMonitor
+from tortuga.rule.objects.rule import Rule
+from tortuga.rule.objects.ruleCondition import RuleCondition
+
+
+def make_rule(index, conditions):
+    rule = Rule('app%d' % (index % 100), 'rule%d' % index)
+
+    appMonitor = ApplicationMonitor('receive')
+    appMonitor.setActionCommand(
+        '/opt/tortuga/bin/burst --rule %d --nodes __neededNodes__' % index)
+    appMonitor.setMaxActionInvocations('%d' % (1000000 + index))
+
+    rule.setApplicationMonitor(appMonitor)
+
+    v = XPathVariable()
+    v.setName('__neededNodes__')
+    v.setXPath("number(resourceData[@queue='q%d.q']/neededNodes)" % index)
+
+    rule.addXPathVariable(v)
+
+    for n in range(conditions):
+        rule.addCondition(RuleCondition(
+            '__neededNodes__', '>', '%d' % (index + n)))
+
+    return rule
+
+
+def evaluate_object(rule):
+    rule.ruleInvoked()
+
+    appMonitor = rule.getApplicationMonitor()
+
+    actionCmd = appMonitor.getActionCommand()
+
+    for v in rule.getXPathVariableList():
+        v.getName()
+        v.getXPath()
+
+    for condition in rule.getConditionList():
+        condition.getMetricXPath()
+        condition.getEvaluationOperator()
+        condition.getTriggerValue()
+
+    appMonitor.actionInvocationSucceeded()
+
+    maxActionInvocations = appMonitor.getMaxActionInvocations()
+
+    return actionCmd, maxActionInvocations and int(maxActionInvocations) <= \
+        (appMonitor.getSuccessfulActionInvocations() or 0)
+
+
+def evaluate_compiled(rule):
+    rule.ruleInvoked()
+
+    actionCmd = rule.actionCommand
+
+    for _ in rule.xPathVariables:
+        pass
+
+    for condition in rule.conditions:
+        condition.metricXPath
+        condition.evaluationOperator
+        condition.triggerValue
+
+    rule.actionInvocationSucceeded()
+
+    return actionCmd, rule.maxActionInvocations and \
+        rule.maxActionInvocations <= rule.getSuccessfulActionInvocations()
+
+
+def measure_memory(build, count):
+    gc.collect()
+
+    tracemalloc.start()
+
+    rules = [build(index) for index in range(count)]
+
+    gc.collect()
+
+    size = tracemalloc.get_traced_memory()[0]
+
+    tracemalloc.stop()
+
+    return size / count, rules
+
+
+def measure_evaluation(rules, evaluate, duration):
+    count = 0
+
+    deadline = time.perf_counter() + duration
+
+    start = time.perf_counter()
+
+    while time.perf_counter() < deadline:
+        for rule in rules:
+            evaluate(rule)
+
+        count += len(rules)
+
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--rules', type=int, default=10000,
+                        help='Number of rules (default: %(default)s)')
+    parser.add_argument('--conditions', type=int, default=2,
+                        help='Conditions per rule (default: %(default)s)')
+    parser.add_argument('--duration', type=float, default=3.0,
+                        help='Seconds of evaluation per form (default:'
+                        ' %(default)s)')
+
+    args = parser.parse_args()
+
+    forms = (
+        ('object', lambda index: make_rule(index, args.conditions),
+         evaluate_object),
+        ('compiled',
+         lambda index: CompiledRule(make_rule(index, args.conditions)),
+         evaluate_compiled),
+    )
+
+    print('{0:<10}{1:>16}{2:>16}'.format(
+        'form', 'bytes/rule', 'evaluations/s'))
+
+    for name, build, evaluate in forms:
+        bytesPerRule, rules = measure_memory(build, args.rules)
+
+        rate = measure_evaluation(rules, evaluate, args.duration)
+
+        print('{0:<10}{1:>16.0f}{2:>16.0f}'.format(name, bytesPerRule, rate))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Sustained application data posting benchmark.
+
+Starts a local stub of the application data endpoint and posts documents
+to it for a fixed duration using:
+
+  oneshot  a new connection (and authentication) for every post
+  pooled   HttpConnectionPool shared by several threads
+  async    AsyncHttpConnectionPool with several requests in flight
+
+The stub authenticates Basic credentials and hands out a session cookie,
+so the number of credential checks shows the effect of auth caching.
+"""
+
+import argparse
+import asyncio
+import base64
+import http.client
+import http.server
+import json
+import threading
+import time
+
+from tortuga.rule.wsapi.httpConnectionPool import AsyncHttpConnectionPool, \
+    HttpConnectionPool
+
+
+DOCUMENT = b"""<?xml version="1.0"?>
+<resourceData queue="burst.q">
+  <pendingJobs>12</pendingJobs>
+  <neededNodes>4</neededNodes>
+  <extraNodes>0</extraNodes>
+</resourceData>
+"""
+
+BODY = json.dumps({
+    'data': base64.b64encode(base64.encodebytes(DOCUMENT)).decode('ascii'),
+}).encode('utf-8')
+
+URL = 'applications/simple_burst/data'
+
+CREDENTIALS = 'Basic ' + base64.b64encode(b'admin:password').decode('ascii')
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        headers = {}
+
+        if 'session_id=stub' not in (self.headers.get('Cookie') or ''):
+            self.server.authCount += 1
+
+            if self.headers.get('Authorization') != CREDENTIALS:
+                self.send_response(401)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            headers['Set-Cookie'] = 'session_id=stub; Path=/'
+
+        body = b'{}'
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+
+        for key, value in headers.items():
+            self.send_header(key, value)
+
+        self.end_headers()
+
+        self.wfile.write(body)
+
+
+def start_stub_server():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    server.authCount = 0
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    return server
+
+
+def run_oneshot(baseurl, duration, _):
+    host, port = baseurl.split('//')[1].split('/')[0].split(':')
+
+    count = 0
+
+    deadline = time.perf_counter() + duration
+
+    while time.perf_counter() < deadline:
+        conn = http.client.HTTPConnection(host, int(port))
+
+        conn.request('POST', '/v1/' + URL, body=BODY, headers={
+            'Authorization': CREDENTIALS,
+            'Content-Type': 'application/json',
+            'Connection': 'close',
+        })
+
+        conn.getresponse().read()
+
+        conn.close()
+
+        count += 1
+
+    return count
+
+
+def run_pooled(baseurl, duration, concurrency):
+    pool = HttpConnectionPool(baseurl, username='admin', password='password',
+                              maxConnections=concurrency)
+
+    counts = [0] * concurrency
+
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        while time.perf_counter() < deadline:
+            pool.request('POST', URL, body=BODY, headers={
+                'Content-Type': 'application/json'})
+
+            counts[index] += 1
+
+    threads = [threading.Thread(target=worker, args=(index,))
+               for index in range(concurrency)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    pool.close()
+
+    return sum(counts)
+
+
+def run_async(baseurl, duration, concurrency):
+    async def main():
+        pool = AsyncHttpConnectionPool(
+            baseurl, username='admin', password='password',
+            maxConnections=concurrency)
+
+        count = 0
+
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal count
+
+            while time.perf_counter() < deadline:
+                await pool.request('POST', URL, body=BODY, headers={
+                    'Content-Type': 'application/json'})
+
+                count += 1
+
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+
+        await pool.close()
+
+        return count
+
+    # asyncio.run() needs Python 3.7
+    loop = asyncio.new_event_loop()
+
+    try:
+        return loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+
+MODES = {
+    'oneshot': run_oneshot,
+    'pooled': run_pooled,
+    'async': run_async,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--duration', type=float, default=5.0,
+                        help='Seconds per mode (default: %(default)s)')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='Threads/in-flight requests (default:'
+                        ' %(default)s)')
+    parser.add_argument('modes', nargs='*', metavar='MODE',
+                        help='One or more of: {0} (default: all)'.format(
+                            ', '.join(MODES)))
+
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        if mode not in MODES:
+            parser.error('invalid mode: {0}'.format(mode))
+
+    print('{0:<10}{1:>12}{2:>14}'.format('mode', 'posts/s', 'auth checks'))
+
+    for mode in args.modes or list(MODES):
+        server = start_stub_server()
+
+        baseurl = 'http://127.0.0.1:{0}/v1'.format(server.server_address[1])
+
+        count = MODES[mode](baseurl, args.duration, args.concurrency)
+
+        print('{0:<10}{1:>12.0f}{2:>14}'.format(
+            mode, count / args.duration, server.authCount))
+
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
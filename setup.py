@@ -27,6 +27,16 @@ setup(
     package_dir={'': 'src'},
     namespace_packages=['tortuga'],
     zip_safe=False,
+    python_requires='>=3.6',
+    install_requires=[
+        'requests',
+    ],
+    extras_require={
+        # Vectorized evaluation of receive rule conditions
+        'numpy': ['numpy'],
+        # AsyncRuleWsApi
+        'async': ['aiohttp'],
+    },
     data_files=[
         ('man/man8', [
             str(fn) for fn in Path(Path('man') / Path('man8')).iterdir()]),
@@ -37,10 +47,12 @@ setup(
             'delete-rule=tortuga.rule.scripts.delete_rule:main',
             'disable-rule=tortuga.rule.scripts.disable_rule:main',
             'enable-rule=tortuga.rule.scripts.enable_rule:main',
+            'evaluate-application-data=tortuga.rule.scripts.evaluate_application_data:main',
             'execute-rule=tortuga.rule.scripts.execute_rule:main',
             'get-rule=tortuga.rule.scripts.get_rule:main',
             'get-rule-list=tortuga.rule.scripts.get_rule_list:main',
             'post-application-data=tortuga.rule.scripts.post_application_data:main',
+            'replay-application-data=tortuga.rule.scripts.replay_application_data:main',
         ],
     },
 )
@@ -0,0 +1,255 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+from tortuga.exceptions.invalidArgument import InvalidArgument
+from tortuga.rule.metricValue import formatValue, toNumber
+from tortuga.rule.substitutionTemplate import SubstitutionTemplate
+
+
+# applicationMonitor attributes making up a batch policy
+BATCH_ATTRIBUTES = ('batchKey', 'batchWindow', 'batchMerge')
+
+# How values of an XPath variable are combined across batched actions
+MERGE_FUNCTIONS = {
+    'sum': sum,
+    'max': max,
+    'min': min,
+    'last': lambda values: values[-1],
+}
+
+# Merge function of variables not listed in 'batchMerge'
+DEFAULT_MERGE = 'last'
+
+
+def getBatchValues(xPathReplacementDict):
+    """
+    Returns:
+        XPath variable values of a triggered action, as numbers where
+        possible and text otherwise, so they outlive the document
+    """
+
+    result = {}
+
+    for name, value in xPathReplacementDict.items():
+        number = toNumber(value)
+
+        result[name] = number if number is not None else formatValue(value)
+
+    return result
+
+
+class BatchPolicy(object):
+    """
+    Actions whose rendered 'batchKey' is the same, across rules, are
+    collected for 'batchWindow' seconds and run as one command: the
+    action command of the first rule in the batch, with each XPath
+    variable set to the merged values of all actions in the batch.
+
+    'batchMerge' lists the merge function per variable, e.g.
+    '__neededNodes__:sum, __maxSlots__:max'.
+    """
+
+    __slots__ = ('keyTemplate', 'window', 'mergeDict')
+
+    def __init__(self, batchKey, window=None, mergeDict=None,
+                 variableNames=()):
+        self.keyTemplate = SubstitutionTemplate(batchKey, variableNames)
+        self.window = window
+        self.mergeDict = mergeDict or {}
+
+    @classmethod
+    def fromApplicationMonitor(cls, appMonitor, variableNames=()):
+        """
+        Returns:
+            BatchPolicy, None if the monitor does not batch its actions
+        Throws:
+            InvalidArgument
+        """
+
+        batchKey = appMonitor.get('batchKey')
+
+        if not batchKey:
+            if appMonitor.get('batchWindow') or appMonitor.get('batchMerge'):
+                raise InvalidArgument(
+                    '[batchWindow] and [batchMerge] require [batchKey]')
+
+            return None
+
+        window = appMonitor.get('batchWindow')
+
+        if window is not None and window != '':
+            try:
+                window = float(window)
+            except ValueError:
+                raise InvalidArgument(
+                    'Invalid value [%s] for [batchWindow]' % (window))
+
+            if window < 0:
+                raise InvalidArgument(
+                    'Invalid value [%s] for [batchWindow]' % (window))
+        else:
+            window = None
+
+        return cls(
+            batchKey, window=window,
+            mergeDict=cls.parseMerge(appMonitor.get('batchMerge') or ''),
+            variableNames=variableNames)
+
+    @staticmethod
+    def parseMerge(batchMerge):
+        """
+        Returns:
+            {variable name: merge function name}
+        Throws:
+            InvalidArgument
+        """
+
+        mergeDict = {}
+
+        for item in batchMerge.replace(',', ' ').split():
+            name, sep, function = item.rpartition(':')
+
+            if not sep or not name or function not in MERGE_FUNCTIONS:
+                raise InvalidArgument(
+                    'Invalid [batchMerge] entry [%s], expected'
+                    ' <variable>:<%s>' % (
+                        item, '|'.join(sorted(MERGE_FUNCTIONS))))
+
+            mergeDict[name] = function
+
+        return mergeDict
+
+    def getAttributes(self):
+        """
+        Returns:
+            {attribute: value} for the applicationMonitor element
+        """
+
+        result = {'batchKey': self.keyTemplate.text}
+
+        if self.window is not None:
+            result['batchWindow'] = self.window
+
+        if self.mergeDict:
+            result['batchMerge'] = ', '.join(
+                '%s:%s' % (name, function)
+                for name, function in sorted(self.mergeDict.items()))
+
+        return result
+
+    def merge(self, valueDicts):
+        """
+        Returns:
+            {variable name: merged value}
+        """
+
+        valueListDict = {}
+
+        for valueDict in valueDicts:
+            for name, value in valueDict.items():
+                valueListDict.setdefault(name, []).append(value)
+
+        result = {}
+
+        for name, values in valueListDict.items():
+            function = self.mergeDict.get(name, DEFAULT_MERGE)
+
+            if function != DEFAULT_MERGE and \
+                    any(isinstance(value, str) for value in values):
+                # Only numbers are summed or compared
+                function = DEFAULT_MERGE
+
+            result[name] = MERGE_FUNCTIONS[function](values)
+
+        return result
+
+
+class ActionBatcher(object):
+    """
+    Collects triggered actions of rules with a batch policy and hands one
+    merged action per batch to the engine when the batch window closes.
+
+    'schedule' is a callable taking (delay, callback, *args) and
+    'dispatch' one taking (rule, actionCmd), both provided by the engine.
+    """
+
+    def __init__(self, schedule, dispatch, defaultWindow=5.0):
+        self._schedule = schedule
+        self._dispatch = dispatch
+        self._defaultWindow = defaultWindow
+        self._lock = threading.Lock()
+        self._batchDict = {}
+
+    def add(self, rule, actionValues):
+        """
+        Add a triggered action of 'rule', 'actionValues' being its XPath
+        variable values as returned by getBatchValues().
+        """
+
+        policy = rule.batchPolicy
+
+        key = policy.keyTemplate.render(actionValues)
+
+        with self._lock:
+            batch = self._batchDict.get(key)
+
+            if batch is not None:
+                batch.append((rule, actionValues))
+
+                rule.actionBatched()
+
+                return
+
+            self._batchDict[key] = [(rule, actionValues)]
+
+        window = policy.window \
+            if policy.window is not None else self._defaultWindow
+
+        self._schedule(window, self.flush, key)
+
+    def flush(self, key):
+        """
+        Dispatch the merged action of a batch.
+        """
+
+        with self._lock:
+            batch = self._batchDict.pop(key, None)
+
+        if not batch:
+            return
+
+        rule = batch[0][0]
+
+        actionValues = rule.batchPolicy.merge(
+            values for _, values in batch)
+
+        self._dispatch(rule, rule.actionTemplate.render(actionValues))
+
+    def flushAll(self):
+        """
+        Dispatch all batches now, without waiting for their windows; their
+        scheduled flushes find nothing left to do.
+        """
+
+        with self._lock:
+            keys = list(self._batchDict)
+
+        for key in keys:
+            self.flush(key)
+
+    def getPendingCount(self):
+        with self._lock:
+            return sum(len(batch) for batch in self._batchDict.values())
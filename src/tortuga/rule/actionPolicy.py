@@ -0,0 +1,212 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+from tortuga.exceptions.invalidArgument import InvalidArgument
+
+
+# applicationMonitor attributes making up an action policy, with their
+# types
+POLICY_ATTRIBUTES = (
+    ('maxActions', int),
+    ('maxActionsPeriod', float),
+    ('cooldown', float),
+    ('holdCount', int),
+    ('holdTime', float),
+    ('exclusionGroup', str),
+    ('exclusionInterval', float),
+)
+
+
+class ExclusionGroups(object):
+    """
+    Last action per exclusion group, shared by all rules of an engine.
+
+    Rules in the same group must not run their actions within
+    'exclusionInterval' seconds of an action of another rule in the group,
+    e.g. a burst and an unburst rule of the same queue.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lastActionDict = {}
+
+    def acquire(self, group, ruleId, interval, now):
+        """
+        Record an action of 'ruleId' unless another rule of the group ran
+        its action less than 'interval' seconds ago.
+
+            Returns:
+                True if the action may run
+        """
+
+        with self._lock:
+            lastRuleId, lastActionTime = self._lastActionDict.get(
+                group, (None, None))
+
+            if lastRuleId is not None and lastRuleId != ruleId and \
+                    now - lastActionTime < interval:
+                return False
+
+            self._lastActionDict[group] = (ruleId, now)
+
+            return True
+
+
+class ActionPolicy(object):
+    """
+    Per-rule limits on action invocations.
+
+      maxActions/maxActionsPeriod  token bucket: at most 'maxActions'
+                                   actions in a burst, refilled at
+                                   'maxActions' per 'maxActionsPeriod'
+                                   seconds
+      cooldown                     seconds after a successful action
+                                   during which the action does not run
+      holdCount/holdTime           conditions must have been met for
+                                   'holdCount' consecutive evaluations
+                                   and for 'holdTime' seconds
+      exclusionGroup/Interval      see ExclusionGroups
+
+    An action is suppressed unless all limits allow it.
+    """
+
+    __slots__ = ('maxActions', 'maxActionsPeriod', 'cooldown', 'holdCount',
+                 'holdTime', 'exclusionGroup', 'exclusionInterval',
+                 '_tokens', '_tokensUpdated', '_consecutive', '_heldSince')
+
+    def __init__(self, maxActions=0, maxActionsPeriod=0.0, cooldown=0.0,
+                 holdCount=0, holdTime=0.0, exclusionGroup=None,
+                 exclusionInterval=0.0):
+        self.maxActions = maxActions
+        self.maxActionsPeriod = maxActionsPeriod
+        self.cooldown = cooldown
+        self.holdCount = holdCount
+        self.holdTime = holdTime
+        self.exclusionGroup = exclusionGroup
+        self.exclusionInterval = exclusionInterval
+
+        self._tokens = float(maxActions)
+        self._tokensUpdated = None
+        self._consecutive = 0
+        self._heldSince = None
+
+    @classmethod
+    def fromApplicationMonitor(cls, appMonitor):
+        """
+        Returns:
+            ActionPolicy, None if the monitor defines no policy
+        Throws:
+            InvalidArgument
+        """
+
+        kwargs = {}
+
+        for key, type_ in POLICY_ATTRIBUTES:
+            value = appMonitor.get(key)
+
+            if value is None or value == '':
+                continue
+
+            try:
+                value = type_(value)
+            except ValueError:
+                raise InvalidArgument(
+                    'Invalid value [%s] for [%s]' % (value, key))
+
+            if type_ is not str and value < 0:
+                raise InvalidArgument(
+                    'Invalid value [%s] for [%s]' % (value, key))
+
+            kwargs[key] = value
+
+        if not kwargs:
+            return None
+
+        if kwargs.get('maxActions') and not kwargs.get('maxActionsPeriod'):
+            raise InvalidArgument('[maxActions] requires [maxActionsPeriod]')
+
+        return cls(**kwargs)
+
+    def getAttributes(self):
+        """
+        Returns:
+            {attribute: value} for the applicationMonitor element
+        """
+
+        result = {}
+
+        for key, _ in POLICY_ATTRIBUTES:
+            value = getattr(self, key)
+
+            if value:
+                result[key] = value
+
+        return result
+
+    def check(self, conditionMet, now, lastSuccessfulActionTime, ruleId,
+              exclusionGroups):
+        """
+        Account for an evaluation of the rule and decide whether its
+        action may run.
+
+            Returns:
+                (allowed, reason), reason being why a met condition does
+                not run the action
+        """
+
+        if not conditionMet:
+            self._consecutive = 0
+            self._heldSince = None
+
+            return False, None
+
+        self._consecutive += 1
+
+        if self._heldSince is None:
+            self._heldSince = now
+
+        if self._consecutive < self.holdCount:
+            return False, 'condition met %d of %d consecutive times' % (
+                self._consecutive, self.holdCount)
+
+        if now - self._heldSince < self.holdTime:
+            return False, 'condition met for %.0f of %.0f seconds' % (
+                now - self._heldSince, self.holdTime)
+
+        if self.cooldown and lastSuccessfulActionTime and \
+                now - lastSuccessfulActionTime < self.cooldown:
+            return False, 'cooldown'
+
+        if self.maxActions:
+            if self._tokensUpdated is not None:
+                self._tokens = min(
+                    float(self.maxActions),
+                    self._tokens + (now - self._tokensUpdated) *
+                    self.maxActions / self.maxActionsPeriod)
+
+            self._tokensUpdated = now
+
+            if self._tokens < 1:
+                return False, 'rate limit'
+
+        if self.exclusionGroup and not exclusionGroups.acquire(
+                self.exclusionGroup, ruleId, self.exclusionInterval, now):
+            return False, 'exclusion group [%s]' % (self.exclusionGroup)
+
+        if self.maxActions:
+            self._tokens -= 1
+
+        return True, None
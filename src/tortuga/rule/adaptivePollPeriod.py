@@ -0,0 +1,155 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from tortuga.exceptions.invalidArgument import InvalidArgument
+from tortuga.rule.metricValue import isNodeSet, toNumber
+
+
+# applicationMonitor attributes enabling adaptive poll periods
+ADAPTIVE_POLL_ATTRIBUTES = ('minPollPeriod', 'maxPollPeriod')
+
+# Metrics within this fraction of their trigger value count as activity
+NEAR_TRIGGER = 0.1
+
+# Poll period factors on activity and on stable output
+SHRINK_FACTOR = 0.5
+GROWTH_FACTOR = 1.5
+
+
+def getTriggerDistance(metric, triggerValue):
+    """
+    Returns:
+        distance of a numeric metric to its trigger value, relative to the
+        trigger value (or absolute for trigger values below 1), None if
+        either is not a number
+    """
+
+    if isNodeSet(metric) or isNodeSet(triggerValue):
+        return None
+
+    number = toNumber(metric)
+    triggerNumber = toNumber(triggerValue)
+
+    if number is None or triggerNumber is None:
+        return None
+
+    return abs(number - triggerNumber) / max(abs(triggerNumber), 1.0)
+
+
+class AdaptivePollPeriod(object):
+    """
+    Poll period of a poll rule between 'minPollPeriod' and
+    'maxPollPeriod', starting at the rule's 'pollPeriod'.
+
+    After each poll the period is halved if the metrics of the rule
+    changed since the previous poll, its conditions were met or a metric
+    is within NEAR_TRIGGER of its trigger value, and grows by half
+    otherwise: an idle cluster is polled rarely, a busy one often.
+    """
+
+    __slots__ = ('minPollPeriod', 'maxPollPeriod', 'period',
+                 '_lastObservation')
+
+    def __init__(self, minPollPeriod, maxPollPeriod, pollPeriod=None):
+        self.minPollPeriod = minPollPeriod
+        self.maxPollPeriod = maxPollPeriod
+        self.period = self.__clamp(
+            pollPeriod if pollPeriod is not None else maxPollPeriod)
+        self._lastObservation = None
+
+    def __clamp(self, period):
+        return min(self.maxPollPeriod, max(self.minPollPeriod, period))
+
+    @classmethod
+    def fromApplicationMonitor(cls, appMonitor):
+        """
+        Returns:
+            AdaptivePollPeriod, None if the monitor has a fixed poll period
+        Throws:
+            InvalidArgument
+        """
+
+        valueDict = {}
+
+        for key in ('pollPeriod',) + ADAPTIVE_POLL_ATTRIBUTES:
+            value = appMonitor.get(key)
+
+            if value is None or value == '' or value == 'None':
+                continue
+
+            try:
+                value = float(value)
+            except ValueError:
+                raise InvalidArgument(
+                    'Invalid value [%s] for [%s]' % (value, key))
+
+            if value <= 0:
+                raise InvalidArgument(
+                    'Invalid value [%s] for [%s]' % (value, key))
+
+            valueDict[key] = value
+
+        if not any(key in valueDict for key in ADAPTIVE_POLL_ATTRIBUTES):
+            return None
+
+        pollPeriod = valueDict.get('pollPeriod')
+
+        minPollPeriod = valueDict.get('minPollPeriod', pollPeriod)
+        maxPollPeriod = valueDict.get('maxPollPeriod', pollPeriod)
+
+        if minPollPeriod is None or maxPollPeriod is None:
+            raise InvalidArgument(
+                '[minPollPeriod] and [maxPollPeriod] are required without'
+                ' [pollPeriod]')
+
+        if minPollPeriod > maxPollPeriod:
+            raise InvalidArgument(
+                '[minPollPeriod] must not exceed [maxPollPeriod]')
+
+        return cls(minPollPeriod, maxPollPeriod, pollPeriod)
+
+    def getAttributes(self):
+        """
+        Returns:
+            {attribute: value} for the applicationMonitor element
+        """
+
+        return {
+            'minPollPeriod': self.minPollPeriod,
+            'maxPollPeriod': self.maxPollPeriod,
+        }
+
+    def observe(self, observation, distance, conditionMet):
+        """
+        Adapt the period to the outcome of a poll. 'observation' is a
+        hashable summary of the rule's metric values, 'distance' the
+        smallest getTriggerDistance() of its conditions (None if there is
+        no numeric one).
+
+            Returns:
+                the new poll period
+        """
+
+        changed = self._lastObservation is not None and \
+            observation != self._lastObservation
+
+        self._lastObservation = observation
+
+        if changed or conditionMet or \
+                distance is not None and distance <= NEAR_TRIGGER:
+            self.period = self.__clamp(self.period * SHRINK_FACTOR)
+        else:
+            self.period = self.__clamp(self.period * GROWTH_FACTOR)
+
+        return self.period
@@ -0,0 +1,133 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import mmap
+import os
+import tempfile
+
+
+# Bytes copied at a time when spooling a request body
+COPY_SIZE = 1 << 16
+
+
+class SpooledApplicationData(object):
+    """
+    Posted document spooled to a temporary file instead of held in memory.
+
+    The XML parser reads the file itself and content digests are taken
+    from a memory map of it, so the document is never copied into Python
+    objects. The file is removed by close(), or when the object that
+    spooled it is garbage collected. Pickled copies, as passed to worker
+    processes, refer to the same file without owning it.
+    """
+
+    __slots__ = ('path', 'size', '_owner', '_mmap')
+
+    def __init__(self, path, size, owner=True):
+        self.path = path
+        self.size = size
+        self._owner = owner
+        self._mmap = None
+
+    def __len__(self):
+        return self.size
+
+    def __reduce__(self):
+        return self.__class__, (self.path, self.size, False)
+
+    def getBuffer(self):
+        """
+        Returns:
+            read-only memory map of the document
+        """
+
+        if self._mmap is None:
+            with open(self.path, 'rb') as fp:
+                self._mmap = mmap.mmap(
+                    fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return self._mmap
+
+    def read(self):
+        """
+        Returns:
+            the document as bytes
+        """
+
+        return self.getBuffer()[:]
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+
+            self._mmap = None
+
+        if self._owner:
+            self._owner = False
+
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def __del__(self):
+        self.close()
+
+
+def readApplicationData(fp, length=None, spoolSize=1 << 20, spoolDir=None):
+    """
+    Read a posted document from a request body. Documents of at least
+    'spoolSize' bytes, or of unknown length, are spooled to a temporary
+    file in 'spoolDir'.
+
+        Returns:
+            bytes, or SpooledApplicationData
+    """
+
+    if length is not None and length < spoolSize:
+        return fp.read(length)
+
+    fd, path = tempfile.mkstemp(prefix='application-data-', dir=spoolDir)
+
+    data = SpooledApplicationData(path, 0)
+
+    with os.fdopen(fd, 'wb') as spoolFile:
+        while True:
+            chunk = fp.read(COPY_SIZE)
+
+            if not chunk:
+                break
+
+            spoolFile.write(chunk)
+
+            data.size += len(chunk)
+
+    if data.size < spoolSize:
+        # Length was not known in advance and the document is small
+        content = data.read() if data.size else b''
+
+        data.close()
+
+        return content
+
+    return data
+
+
+def releaseApplicationData(applicationData):
+    """
+    Remove the spool file of a document, once it has been processed.
+    """
+
+    if isinstance(applicationData, SpooledApplicationData):
+        applicationData.close()
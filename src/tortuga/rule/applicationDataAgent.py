@@ -0,0 +1,354 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import logging
+import os
+import queue
+import select
+import threading
+import time
+
+
+class ApplicationDataAgent(object):
+    """
+    Long-running application data poster.
+
+    Documents are read from one or more sources (directory, FIFO, stream)
+    and handed, in order and as soon as they arrive, to 'poster', a
+    callable taking (applicationName, document) that raises on failure,
+    e.g. RuleWsApi.postApplicationData(), which posts the document as is
+    over a kept-alive connection. A document that is byte-identical to the
+    last one sent is skipped. Documents that cannot be posted are spooled
+    to disk and re-sent, oldest first, once posting succeeds again.
+    """
+
+    def __init__(self, poster, applicationName, spoolDir,
+                 maxSpooledFiles=1000, stopInterval=1.0):
+        self._poster = poster
+        self._applicationName = applicationName
+        self._spoolDir = spoolDir
+        self._maxSpooledFiles = maxSpooledFiles
+        # longest time run() takes to notice stop()
+        self._stopInterval = stopInterval
+        self._documentQ = queue.Queue()
+        self._lastDigest = None
+        self._spoolSeq = 0
+        self._sources = []
+        # sources that reached end of file
+        self._endedSources = 0
+        self._stopEvent = threading.Event()
+        self._logger = logging.getLogger(
+            'tortuga.rule.%s' % self.__class__.__name__)
+
+        self.posted = 0
+        self.skipped = 0
+        self.spooled = 0
+
+        if not os.path.exists(self._spoolDir):
+            os.makedirs(self._spoolDir)
+
+    def addDirectorySource(self, path, pollInterval=1.0):
+        """
+        Post every file that appears in 'path' and remove it afterwards.
+        Files whose name starts with '.' are ignored so that writers can
+        create a hidden temporary file and rename it into place.
+        """
+
+        self.__addSource(self.__readDirectory, path, pollInterval)
+
+    def addFifoSource(self, path, pollInterval=1.0):
+        """
+        Each writer session (open, write, close) on the FIFO is one
+        document. stop() is noticed within 'pollInterval' seconds, also
+        while no writer is connected.
+        """
+
+        self.__addSource(self.__readFifo, path, pollInterval)
+
+    def addStreamSource(self, stream, delimiter=b'\0'):
+        """
+        Documents are separated by 'delimiter' in the (binary) stream.
+        """
+
+        self.__addSource(self.__readStream, stream, delimiter)
+
+    def __addSource(self, target, *args):
+        t = threading.Thread(target=target, args=args)
+        t.daemon = True
+        self._sources.append(t)
+
+    def putDocument(self, document):
+        if isinstance(document, str):
+            document = document.encode('utf-8')
+
+        if document.strip():
+            self._documentQ.put(document)
+
+    def __readDirectory(self, path, pollInterval):
+        while not self._stopEvent.is_set():
+            try:
+                entries = sorted(
+                    (entry for entry in os.scandir(path)
+                     if entry.is_file() and not entry.name.startswith('.')),
+                    key=lambda entry: entry.stat().st_mtime)
+            except OSError as ex:
+                self._logger.error(
+                    '[%s] Unable to read directory [%s]: %s' % (
+                        self.__class__.__name__, path, ex))
+
+                entries = []
+
+            for entry in entries:
+                try:
+                    with open(entry.path, 'rb') as fp:
+                        self.putDocument(fp.read())
+
+                    os.unlink(entry.path)
+                except OSError as ex:
+                    self._logger.error(
+                        '[%s] Unable to read [%s]: %s' % (
+                            self.__class__.__name__, entry.path, ex))
+
+            self._stopEvent.wait(pollInterval)
+
+    def __readFifo(self, path, pollInterval):
+        while not self._stopEvent.is_set():
+            try:
+                # Opening for reading does not wait for a writer; reopened
+                # for every writer session as the end of one is reported
+                # until then
+                fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+            except OSError as ex:
+                self._logger.error(
+                    '[%s] Unable to open FIFO [%s]: %s' % (
+                        self.__class__.__name__, path, ex))
+
+                self._stopEvent.wait(pollInterval)
+
+                continue
+
+            try:
+                document = self.__readFifoSession(fd, pollInterval)
+            finally:
+                os.close(fd)
+
+            if document is not None:
+                self.putDocument(document)
+
+    def __readFifoSession(self, fd, pollInterval):
+        """
+        Read what one writer writes to the FIFO until it closes it.
+
+            Returns:
+                data written, None if stopped first
+        """
+
+        chunks = []
+
+        while not self._stopEvent.is_set():
+            # Readable once data is written or the writer has closed
+            readable, _, _ = select.select([fd], [], [], pollInterval)
+
+            if not readable:
+                continue
+
+            try:
+                data = os.read(fd, 65536)
+            except BlockingIOError:
+                # writer connected, nothing written yet
+                continue
+
+            if not data:
+                return b''.join(chunks)
+
+            chunks.append(data)
+
+        return None
+
+    def __readStream(self, stream, delimiter):
+        buf = b''
+
+        while True:
+            data = stream.read1(65536) if hasattr(stream, 'read1') \
+                else stream.read(65536)
+
+            if not data:
+                break
+
+            buf += data
+
+            *documents, buf = buf.split(delimiter)
+
+            for document in documents:
+                self.putDocument(document)
+
+        self.putDocument(buf)
+
+        # End of stream; nothing more will arrive from this source
+        self._documentQ.put(None)
+
+    def __nextBatch(self):
+        """
+        Wait up to 'stopInterval' seconds for a document and take the
+        documents queued behind it, without waiting for more.
+
+            Returns:
+                documents read
+        """
+
+        batch = []
+
+        timeout = self._stopInterval
+
+        while True:
+            try:
+                document = self._documentQ.get(timeout=timeout) \
+                    if timeout else self._documentQ.get_nowait()
+            except queue.Empty:
+                break
+
+            timeout = None
+
+            if document is None:
+                self._endedSources += 1
+
+                continue
+
+            batch.append(document)
+
+        return batch
+
+    def dedup(self, batch):
+        """
+        Drop documents identical to the previously sent one.
+        """
+
+        result = []
+
+        for document in batch:
+            digest = hashlib.sha1(document).digest()
+
+            if digest == self._lastDigest:
+                self.skipped += 1
+                continue
+
+            self._lastDigest = digest
+
+            result.append(document)
+
+        return result
+
+    def __getSpooledFiles(self):
+        return sorted(
+            os.path.join(self._spoolDir, name)
+            for name in os.listdir(self._spoolDir)
+            if name.endswith('.xml'))
+
+    def spool(self, batch):
+        for document in batch:
+            self._spoolSeq += 1
+
+            path = os.path.join(
+                self._spoolDir, '%017.6f-%06d.xml' % (
+                    time.time(), self._spoolSeq % 1000000))
+
+            with open(path + '.tmp', 'wb') as fp:
+                fp.write(document)
+
+            os.rename(path + '.tmp', path)
+
+            self.spooled += 1
+
+        spooledFiles = self.__getSpooledFiles()
+
+        for path in spooledFiles[:-self._maxSpooledFiles]:
+            self._logger.warning(
+                '[%s] Spool limit reached, dropping [%s]' % (
+                    self.__class__.__name__, path))
+
+            os.unlink(path)
+
+    def flushSpool(self):
+        """
+        Re-send spooled documents, oldest first.
+
+            Returns:
+                True if the spool is empty afterwards
+        """
+
+        for path in self.__getSpooledFiles():
+            with open(path, 'rb') as fp:
+                document = fp.read()
+
+            try:
+                self._poster(self._applicationName, document)
+            except Exception as ex:
+                self._logger.debug(
+                    '[%s] Unable to flush spool: %s' % (
+                        self.__class__.__name__, ex))
+
+                return False
+
+            self.posted += 1
+
+            os.unlink(path)
+
+        return True
+
+    def processBatch(self, batch):
+        batch = self.dedup(batch)
+
+        if not self.flushSpool():
+            # Keep ordering: new documents go behind the spooled ones
+            self.spool(batch)
+
+            return
+
+        for n, document in enumerate(batch):
+            try:
+                self._poster(self._applicationName, document)
+            except Exception as ex:
+                # Documents posted so far are not sent again
+                self._logger.error(
+                    '[%s] Unable to post application data, spooling %d'
+                    ' document(s): %s' % (
+                        self.__class__.__name__, len(batch) - n, ex))
+
+                self.spool(batch[n:])
+
+                return
+
+            self.posted += 1
+
+    def run(self):
+        """
+        Run until stop() is called or every source reached end of file
+        (directory and FIFO sources never do).
+        """
+
+        for t in self._sources:
+            t.start()
+
+        while not self._stopEvent.is_set():
+            self.processBatch(self.__nextBatch())
+
+            if self._sources and \
+                    self._endedSources == len(self._sources):
+                break
+
+        self._stopEvent.set()
+
+    def stop(self):
+        self._stopEvent.set()
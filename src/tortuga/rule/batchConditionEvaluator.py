@@ -0,0 +1,237 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bisect
+import logging
+
+from tortuga.rule.metricValue import OPERATORS, compareValues, isNodeSet, \
+    isUndefined, toNumber
+from tortuga.rule.substitutionTemplate import SubstitutionTemplate
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class _ConditionGroup(object):
+    """
+    Conditions comparing one metric with one operator against numeric
+    trigger values, across all rules.
+    """
+
+    __slots__ = ('xPath', 'operator', 'triggerValues', 'triggerStrings',
+                 'ruleIndexes', 'sortedTriggerValues', 'sortedRuleIndexes')
+
+    def __init__(self, xPath, operator_):
+        self.xPath = xPath
+        self.operator = operator_
+        self.triggerValues = []
+        self.triggerStrings = []
+        self.ruleIndexes = []
+        self.sortedTriggerValues = None
+        self.sortedRuleIndexes = None
+
+    def add(self, triggerValue, triggerString, ruleIndex):
+        self.triggerValues.append(triggerValue)
+        self.triggerStrings.append(triggerString)
+        self.ruleIndexes.append(ruleIndex)
+
+    def freeze(self):
+        if numpy is not None:
+            self.triggerValues = numpy.array(
+                self.triggerValues, dtype=numpy.float64)
+            self.ruleIndexes = numpy.array(
+                self.ruleIndexes, dtype=numpy.intp)
+        else:
+            order = sorted(range(len(self.triggerValues)),
+                           key=self.triggerValues.__getitem__)
+
+            self.sortedTriggerValues = [
+                self.triggerValues[index] for index in order]
+            self.sortedRuleIndexes = [
+                self.ruleIndexes[index] for index in order]
+
+    def getPassingRuleIndexes(self, metric):
+        """
+        Returns:
+            rule indexes of the conditions met by numeric 'metric'
+        """
+
+        if numpy is not None:
+            return self.ruleIndexes[
+                OPERATORS[self.operator](metric, self.triggerValues)]
+
+        values = self.sortedTriggerValues
+        indexes = self.sortedRuleIndexes
+
+        # 'metric op trigger' expressed as a slice of the sorted triggers
+        if self.operator == '>':
+            return indexes[:bisect.bisect_left(values, metric)]
+
+        if self.operator == '>=':
+            return indexes[:bisect.bisect_right(values, metric)]
+
+        if self.operator == '<':
+            return indexes[bisect.bisect_right(values, metric):]
+
+        if self.operator == '<=':
+            return indexes[bisect.bisect_left(values, metric):]
+
+        lo = bisect.bisect_left(values, metric)
+        hi = bisect.bisect_right(values, metric)
+
+        if self.operator in ('=', '=='):
+            return indexes[lo:hi]
+
+        return indexes[:lo] + indexes[hi:]
+
+    def getPassingRuleIndexesByValue(self, metric):
+        """
+        Returns:
+            rule indexes of the conditions met by a non-numeric 'metric'
+            (string or node set), compared one by one
+        """
+
+        return [
+            ruleIndex for ruleIndex, triggerString in zip(
+                self.ruleIndexes, self.triggerStrings)
+            if compareValues(metric, self.operator, triggerString)]
+
+
+class BatchConditionEvaluator(object):
+    """
+    Evaluates the conditions of all receive rules of an application in one
+    pass over a document.
+
+    Conditions are grouped by (metric, operator) across rules. The metric
+    of a group is evaluated once per document and compared against all
+    trigger values of the group at once: a NumPy array comparison when
+    NumPy is installed, a bisection of the sorted trigger values
+    otherwise. Conditions that do not fit a group (trigger values that are
+    not numeric constants, metrics combining several XPath variables,
+    unknown operators) are left to a per-condition callback.
+    """
+
+    def __init__(self, rules):
+        self._logger = logging.getLogger(
+            'tortuga.rule.%s' % self.__class__.__name__)
+
+        self.rules = list(rules)
+
+        self._conditionCounts = [len(rule.conditions) for rule in self.rules]
+        self._groups = {}
+        self._scalarConditions = []
+
+        for ruleIndex, rule in enumerate(self.rules):
+            variables = dict(rule.xPathVariables)
+
+            for condition in rule.conditions:
+                group = self.__getGroup(condition, variables)
+
+                if group is None:
+                    self._scalarConditions.append((ruleIndex, condition))
+
+                    continue
+
+                group.add(
+                    toNumber(condition.triggerValue), condition.triggerValue,
+                    ruleIndex)
+
+        for group in self._groups.values():
+            group.freeze()
+
+    def __getGroup(self, condition, variables):
+        if condition.evaluationOperator not in OPERATORS:
+            return None
+
+        if toNumber(condition.triggerValue) is None:
+            return None
+
+        metricTemplate = SubstitutionTemplate(
+            condition.metricXPath, variables)
+
+        name = metricTemplate.getSingleVariable()
+
+        if name is not None:
+            xPath = variables[name]
+        elif metricTemplate.hasVariables():
+            # Expression over variables
+            return None
+        else:
+            # Not a variable, evaluated as XPath
+            xPath = condition.metricXPath
+
+        key = (xPath, condition.evaluationOperator)
+
+        if key not in self._groups:
+            self._groups[key] = _ConditionGroup(*key)
+
+        return self._groups[key]
+
+    def evaluate(self, getMetric, evaluateCondition):
+        """
+        'getMetric' is a callable returning the (cached) value of an XPath
+        expression for the document; 'evaluateCondition' is a callable
+        taking (rule, condition) and returning whether the condition is
+        met.
+
+            Returns:
+                [rule] for rules whose conditions are all met
+        """
+
+        ruleCount = len(self.rules)
+
+        if numpy is not None:
+            passCounts = numpy.zeros(ruleCount, dtype=numpy.intp)
+        else:
+            passCounts = [0] * ruleCount
+
+        for group in self._groups.values():
+            try:
+                value = getMetric(group.xPath)
+            except Exception as ex:
+                self._logger.error(
+                    '[%s] Could not evaluate metric [%s]: %s' % (
+                        self.__class__.__name__, group.xPath, ex))
+
+                continue
+
+            if isUndefined(value):
+                # Metric not defined, none of the conditions are met
+                continue
+
+            metric = None if isNodeSet(value) else toNumber(value)
+
+            if metric is not None:
+                passing = group.getPassingRuleIndexes(metric)
+            else:
+                passing = group.getPassingRuleIndexesByValue(value)
+
+            if numpy is not None:
+                passCounts += numpy.bincount(
+                    numpy.asarray(passing, dtype=numpy.intp),
+                    minlength=ruleCount)
+            else:
+                for ruleIndex in passing:
+                    passCounts[ruleIndex] += 1
+
+        for ruleIndex, condition in self._scalarConditions:
+            if evaluateCondition(self.rules[ruleIndex], condition):
+                passCounts[ruleIndex] += 1
+
+        return [
+            rule for rule, passCount, conditionCount in zip(
+                self.rules, passCounts, self._conditionCounts)
+            if passCount == conditionCount]
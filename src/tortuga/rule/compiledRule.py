@@ -0,0 +1,402 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import array
+import time
+
+from tortuga.objects.tortugaObject import TortugaObjectList
+from tortuga.objects.xPathVariable import XPathVariable
+from .actionBatcher import BatchPolicy
+from .adaptivePollPeriod import AdaptivePollPeriod
+from .actionPolicy import ActionPolicy
+from .inFlightTracker import InFlightPolicy
+from .metricValue import MetricExpression
+from .queryCache import getQueryMaxAge
+from .ruleChain import ChainPolicy
+from .objects.applicationMonitor import ApplicationMonitor
+from .objects.rule import Rule, getRuleId
+from .objects.ruleCondition import RuleCondition
+from .substitutionTemplate import SubstitutionTemplate
+
+
+# Indexes into CompiledRule.counters
+TOTAL_INVOCATIONS = 0
+LAST_INVOCATION_TIME = 1
+TOTAL_QUERY_INVOCATIONS = 2
+SUCCESSFUL_QUERY_INVOCATIONS = 3
+FAILED_QUERY_INVOCATIONS = 4
+LAST_SUCCESSFUL_QUERY_INVOCATION_TIME = 5
+LAST_FAILED_QUERY_INVOCATION_TIME = 6
+TOTAL_ACTION_INVOCATIONS = 7
+SUCCESSFUL_ACTION_INVOCATIONS = 8
+FAILED_ACTION_INVOCATIONS = 9
+LAST_SUCCESSFUL_ACTION_INVOCATION_TIME = 10
+LAST_FAILED_ACTION_INVOCATION_TIME = 11
+DEDUPLICATED_DATA = 12
+SUPPRESSED_ACTIONS = 13
+QUEUED_ACTIONS = 14
+SUPERSEDED_ACTIONS = 15
+SKIPPED_IN_FLIGHT_ACTIONS = 16
+BATCHED_ACTIONS = 17
+CACHED_QUERIES = 18
+CHAINED_OUTPUTS = 19
+
+COUNTER_COUNT = 20
+
+# Counters restored from, and reported as, TortugaObject keys
+_RULE_COUNTER_KEYS = (
+    (TOTAL_INVOCATIONS, 'totalInvocations', int),
+    (LAST_INVOCATION_TIME, 'lastInvocationTime', float),
+)
+
+_MONITOR_COUNTER_KEYS = (
+    (TOTAL_QUERY_INVOCATIONS, 'totalQueryInvocations', int),
+    (SUCCESSFUL_QUERY_INVOCATIONS, 'successfulQueryInvocations', int),
+    (FAILED_QUERY_INVOCATIONS, 'failedQueryInvocations', int),
+    (LAST_SUCCESSFUL_QUERY_INVOCATION_TIME,
+     'lastSuccessfulQueryInvocationTime', float),
+    (LAST_FAILED_QUERY_INVOCATION_TIME,
+     'lastFailedQueryInvocationTime', float),
+    (TOTAL_ACTION_INVOCATIONS, 'totalActionInvocations', int),
+    (SUCCESSFUL_ACTION_INVOCATIONS, 'successfulActionInvocations', int),
+    (FAILED_ACTION_INVOCATIONS, 'failedActionInvocations', int),
+    (LAST_SUCCESSFUL_ACTION_INVOCATION_TIME,
+     'lastSuccessfulActionInvocationTime', float),
+    (LAST_FAILED_ACTION_INVOCATION_TIME,
+     'lastFailedActionInvocationTime', float),
+    (DEDUPLICATED_DATA, 'deduplicatedData', int),
+    (SUPPRESSED_ACTIONS, 'suppressedActions', int),
+    (QUEUED_ACTIONS, 'queuedActions', int),
+    (SUPERSEDED_ACTIONS, 'supersededActions', int),
+    (SKIPPED_IN_FLIGHT_ACTIONS, 'skippedInFlightActions', int),
+    (BATCHED_ACTIONS, 'batchedActions', int),
+    (CACHED_QUERIES, 'cachedQueries', int),
+    (CHAINED_OUTPUTS, 'chainedOutputs', int),
+)
+
+# Counters only reported once the first query/action ran, as the
+# TortugaObject form adds them lazily
+_QUERY_COUNTERS = (
+    TOTAL_QUERY_INVOCATIONS, SUCCESSFUL_QUERY_INVOCATIONS,
+    FAILED_QUERY_INVOCATIONS)
+
+_ACTION_COUNTERS = (
+    TOTAL_ACTION_INVOCATIONS, SUCCESSFUL_ACTION_INVOCATIONS,
+    FAILED_ACTION_INVOCATIONS)
+
+
+def getMetricExpression(template, variableNames):
+    """
+    Returns:
+        MetricExpression for a template combining XPath variables (or a
+        variable and other text), None for a single variable or no
+        variables
+    Throws:
+        ValueError
+    """
+
+    if not template.hasVariables() or \
+            template.getSingleVariable() is not None:
+        return None
+
+    return MetricExpression(template.text, variableNames)
+
+
+class CompiledCondition(object):
+    """
+    Rule condition as evaluated by the engine.
+
+    A metric or trigger value combining XPath variables is arithmetic,
+    evaluated by its MetricExpression; ValueError is raised for one that
+    is not.
+    """
+
+    __slots__ = ('id', 'metricXPath', 'evaluationOperator', 'triggerValue',
+                 'description', 'metricTemplate', 'triggerTemplate',
+                 'metricExpression', 'triggerExpression')
+
+    def __init__(self, condition, variableNames=()):
+        self.id = condition.getId()
+        self.metricXPath = condition.getMetricXPath()
+        self.evaluationOperator = condition.getEvaluationOperator()
+        self.triggerValue = condition.getTriggerValue()
+        self.description = condition.getDescription()
+        self.metricTemplate = SubstitutionTemplate(
+            self.metricXPath, variableNames)
+        self.triggerTemplate = SubstitutionTemplate(
+            self.triggerValue, variableNames)
+        self.metricExpression = getMetricExpression(
+            self.metricTemplate, variableNames)
+        self.triggerExpression = getMetricExpression(
+            self.triggerTemplate, variableNames)
+
+    def __repr__(self):
+        return '%s %s %s' % (
+            self.metricXPath, self.evaluationOperator, self.triggerValue)
+
+    def toCondition(self):
+        condition = RuleCondition(
+            self.metricXPath, self.evaluationOperator, self.triggerValue)
+
+        if self.id is not None:
+            condition.setId(self.id)
+
+        if self.description is not None:
+            condition.setDescription(self.description)
+
+        return condition
+
+
+class CompiledRule(object):
+    """
+    Runtime form of a rule and its application monitor.
+
+    Definition fields are plain attributes, conditions and XPath variables
+    are tuples, strings referring to XPath variables are precompiled into
+    SubstitutionTemplates, and all counters live in one preallocated
+    array, so the engine's hot path does no dict lookups and adds no keys.
+    The TortugaObject form is built by toRule() for API callers and rule
+    files only.
+    """
+
+    __slots__ = (
+        'ruleId', 'id', 'applicationName', 'name', 'description', 'status',
+        'monitorId', 'monitorType', 'monitorDescription', 'pollPeriod',
+        'adaptivePoll',
+        'queryCommand', 'queryProvider', 'queryMaxAge', 'analyzeCommand',
+        'actionCommand',
+        'maxActionInvocations', 'actionPolicy', 'inFlightPolicy',
+        'batchPolicy', 'chainPolicy', 'conditions', 'xPathVariables',
+        'actionTemplate', 'counters', 'history',
+    )
+
+    def __init__(self, rule):
+        self.ruleId = getRuleId(rule.getApplicationName(), rule.getName())
+        self.id = rule.get('id')
+        self.applicationName = rule.getApplicationName()
+        self.name = rule.getName()
+        self.description = rule.getDescription()
+        self.status = rule.getStatus()
+
+        appMonitor = rule.getApplicationMonitor()
+
+        self.monitorId = appMonitor.getId()
+        self.monitorType = appMonitor.getType()
+        self.monitorDescription = appMonitor.getDescription()
+        self.pollPeriod = appMonitor.getPollPeriod()
+        self.adaptivePoll = AdaptivePollPeriod.fromApplicationMonitor(
+            appMonitor) if self.monitorType == 'poll' else None
+        self.queryCommand = appMonitor.getQueryCommand()
+        self.queryProvider = appMonitor.getQueryProvider()
+        self.queryMaxAge = getQueryMaxAge(appMonitor)
+        self.analyzeCommand = appMonitor.getAnalyzeCommand()
+        self.actionCommand = appMonitor.getActionCommand()
+
+        maxActionInvocations = appMonitor.getMaxActionInvocations()
+
+        self.maxActionInvocations = int(maxActionInvocations) \
+            if maxActionInvocations else 0
+
+        self.actionPolicy = ActionPolicy.fromApplicationMonitor(appMonitor)
+        self.inFlightPolicy = InFlightPolicy.fromApplicationMonitor(
+            appMonitor)
+        self.chainPolicy = ChainPolicy.fromApplicationMonitor(appMonitor)
+
+        self.xPathVariables = tuple(
+            (v.getName(), v.getXPath())
+            for v in rule.getXPathVariableList())
+
+        variableNames = [name for name, _ in self.xPathVariables]
+
+        self.conditions = tuple(
+            CompiledCondition(condition, variableNames)
+            for condition in rule.getConditionList())
+
+        self.actionTemplate = SubstitutionTemplate(
+            self.actionCommand, variableNames)
+
+        self.batchPolicy = BatchPolicy.fromApplicationMonitor(
+            appMonitor, variableNames)
+
+        self.counters = array.array('d', bytes(8 * COUNTER_COUNT))
+
+        # RuleHistory, set up by the engine
+        self.history = None
+
+        # Counters persisted in the rule file
+        for index, key, _ in _RULE_COUNTER_KEYS:
+            self.counters[index] = float(rule.get(key) or 0)
+
+        for index, key, _ in _MONITOR_COUNTER_KEYS:
+            self.counters[index] = float(appMonitor.get(key) or 0)
+
+    def __repr__(self):
+        return '%s (type: %s, status: %s)' % (
+            self.ruleId, self.monitorType, self.status)
+
+    def getQuery(self):
+        """
+        Returns:
+            query command or query provider of the rule, None if it has
+            neither
+        """
+
+        return self.queryCommand or self.queryProvider
+
+    def isStatusEnabled(self):
+        return self.status == Rule.ENABLED_STATUS
+
+    def setStatusEnabled(self):
+        self.status = Rule.ENABLED_STATUS
+
+    def ruleInvoked(self):
+        counters = self.counters
+        counters[TOTAL_INVOCATIONS] += 1
+        counters[LAST_INVOCATION_TIME] = time.time()
+
+    def queryInvocationSucceeded(self):
+        counters = self.counters
+        counters[SUCCESSFUL_QUERY_INVOCATIONS] += 1
+        counters[TOTAL_QUERY_INVOCATIONS] += 1
+        counters[LAST_SUCCESSFUL_QUERY_INVOCATION_TIME] = time.time()
+
+    def queryInvocationFailed(self):
+        counters = self.counters
+        counters[FAILED_QUERY_INVOCATIONS] += 1
+        counters[TOTAL_QUERY_INVOCATIONS] += 1
+        counters[LAST_FAILED_QUERY_INVOCATION_TIME] = time.time()
+
+    def actionInvocationSucceeded(self):
+        counters = self.counters
+        counters[SUCCESSFUL_ACTION_INVOCATIONS] += 1
+        counters[TOTAL_ACTION_INVOCATIONS] += 1
+        counters[LAST_SUCCESSFUL_ACTION_INVOCATION_TIME] = time.time()
+
+    def actionInvocationFailed(self):
+        counters = self.counters
+        counters[FAILED_ACTION_INVOCATIONS] += 1
+        counters[TOTAL_ACTION_INVOCATIONS] += 1
+        counters[LAST_FAILED_ACTION_INVOCATION_TIME] = time.time()
+
+    def dataDeduplicated(self):
+        self.counters[DEDUPLICATED_DATA] += 1
+
+    def actionSuppressed(self):
+        self.counters[SUPPRESSED_ACTIONS] += 1
+
+    def actionQueued(self):
+        self.counters[QUEUED_ACTIONS] += 1
+
+    def actionSuperseded(self):
+        self.counters[SUPERSEDED_ACTIONS] += 1
+
+    def actionSkippedInFlight(self):
+        self.counters[SKIPPED_IN_FLIGHT_ACTIONS] += 1
+
+    def actionBatched(self):
+        self.counters[BATCHED_ACTIONS] += 1
+
+    def queryCached(self):
+        self.counters[CACHED_QUERIES] += 1
+
+    def outputChained(self):
+        self.counters[CHAINED_OUTPUTS] += 1
+
+    def getSuccessfulActionInvocations(self):
+        return int(self.counters[SUCCESSFUL_ACTION_INVOCATIONS])
+
+    def getLastSuccessfulActionInvocationTime(self):
+        return self.counters[LAST_SUCCESSFUL_ACTION_INVOCATION_TIME] or None
+
+    def toRule(self):
+        """
+        Returns:
+            Rule (TortugaObject) with the current counters
+        """
+
+        rule = Rule(self.applicationName, self.name, self.description)
+
+        if self.id is not None:
+            rule.setId(self.id)
+
+        rule.setStatus(self.status)
+
+        appMonitor = ApplicationMonitor(
+            self.monitorType, self.monitorDescription, self.pollPeriod)
+
+        if self.monitorId is not None:
+            appMonitor.setId(self.monitorId)
+
+        for key, value in (('queryCommand', self.queryCommand),
+                           ('queryProvider', self.queryProvider),
+                           ('analyzeCommand', self.analyzeCommand),
+                           ('actionCommand', self.actionCommand)):
+            if value is not None:
+                appMonitor[key] = value
+
+        if self.adaptivePoll is not None:
+            appMonitor.update(self.adaptivePoll.getAttributes())
+
+            appMonitor['currentPollPeriod'] = self.adaptivePoll.period
+
+        if self.queryMaxAge is not None:
+            appMonitor.setQueryMaxAge(self.queryMaxAge)
+
+        if self.maxActionInvocations:
+            appMonitor.setMaxActionInvocations(self.maxActionInvocations)
+
+        if self.actionPolicy is not None:
+            appMonitor.update(self.actionPolicy.getAttributes())
+
+        if self.inFlightPolicy is not None:
+            appMonitor.update(self.inFlightPolicy.getAttributes())
+
+        if self.batchPolicy is not None:
+            appMonitor.update(self.batchPolicy.getAttributes())
+
+        if self.chainPolicy is not None:
+            appMonitor.update(self.chainPolicy.getAttributes())
+
+        counters = self.counters
+
+        for index, key, type_ in _RULE_COUNTER_KEYS:
+            if counters[index]:
+                rule[key] = type_(counters[index])
+
+        for index, key, type_ in _MONITOR_COUNTER_KEYS:
+            if counters[index] or \
+                    index in _QUERY_COUNTERS and \
+                    counters[TOTAL_QUERY_INVOCATIONS] or \
+                    index in _ACTION_COUNTERS and \
+                    counters[TOTAL_ACTION_INVOCATIONS]:
+                appMonitor[key] = type_(counters[index])
+
+        rule.setApplicationMonitor(appMonitor)
+
+        rule.setConditionList(TortugaObjectList(
+            [condition.toCondition() for condition in self.conditions]))
+
+        xPathVariables = TortugaObjectList()
+
+        for name, xPath in self.xPathVariables:
+            v = XPathVariable()
+            v.setName(name)
+            v.setXPath(xPath)
+
+            xPathVariables.append(v)
+
+        rule.setXPathVariableList(xPathVariables)
+
+        return rule
+
@@ -0,0 +1,126 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+import threading
+import time
+import urllib.parse
+import zlib
+
+from tortuga.exceptions.tortugaException import TortugaException
+from tortuga.rule.applicationData import SpooledApplicationData
+
+
+# Capture logs are read back by replay, not archived; favour speed
+COMPRESS_LEVEL = 1
+
+
+def getDataBuffer(applicationData):
+    """
+    Returns:
+        the document as a bytes-like object, without copying spooled
+        documents into memory
+    """
+
+    if isinstance(applicationData, SpooledApplicationData):
+        return applicationData.getBuffer() if applicationData.size else b''
+
+    if isinstance(applicationData, str):
+        return applicationData.encode('utf-8')
+
+    return applicationData
+
+
+class CaptureWriter(object):
+    """
+    Appends received application data to a gzip compressed capture log.
+
+    Each record is a header line '<time> <size> <application name>',
+    the application name URL-quoted, followed by the document itself.
+    The stream is flushed after every record, so the log can be read up
+    to the last complete record even if the engine is killed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fp = gzip.open(path, 'ab', compresslevel=COMPRESS_LEVEL)
+
+    def write(self, applicationName, applicationData, time_=None):
+        """
+        Throws:
+            TortugaException
+        """
+
+        data = getDataBuffer(applicationData)
+
+        header = '%.6f %d %s\n' % (
+            time.time() if time_ is None else time_, len(data),
+            urllib.parse.quote(applicationName, safe=''))
+
+        with self._lock:
+            if self._fp is None:
+                return
+
+            try:
+                self._fp.write(header.encode('ascii'))
+                self._fp.write(data)
+                self._fp.flush()
+            except (OSError, ValueError) as ex:
+                raise TortugaException(
+                    'Could not capture data to [%s]: %s' % (self.path, ex))
+
+    def close(self):
+        with self._lock:
+            if self._fp is not None:
+                self._fp.close()
+
+                self._fp = None
+
+
+def readCapture(path):
+    """
+    Read a capture log written by CaptureWriter. A record cut short by
+    the end of the log, as left behind by an engine that was killed, ends
+    it.
+
+        Returns:
+            iterator of (time, application name, data)
+        Throws:
+            TortugaException
+    """
+
+    with gzip.open(path, 'rb') as fp:
+        while True:
+            try:
+                header = fp.readline()
+
+                if not header.endswith(b'\n'):
+                    return
+
+                time_, size, applicationName = \
+                    header.decode('ascii').split(' ', 2)
+
+                data = fp.read(int(size))
+            except (EOFError, zlib.error):
+                return
+            except ValueError:
+                raise TortugaException(
+                    'Invalid record in capture log [%s]' % (path))
+
+            if len(data) < int(size):
+                return
+
+            yield float(time_), \
+                urllib.parse.unquote(applicationName.rstrip('\n')), data
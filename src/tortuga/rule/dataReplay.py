@@ -0,0 +1,205 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import threading
+import time
+
+from tortuga.rule.ruleEngine import RuleEngine
+
+
+def getLatencyStats(values):
+    """
+    Returns:
+        {'count', 'mean', 'p50', 'p95', 'max'} of latencies in seconds,
+        None for all but 'count' if there are none
+    """
+
+    if not values:
+        return {'count': 0, 'mean': None, 'p50': None, 'p95': None,
+                'max': None}
+
+    values = sorted(values)
+
+    def getPercentile(percent):
+        return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+    return {
+        'count': len(values),
+        'mean': round(sum(values) / len(values), 6),
+        'p50': round(getPercentile(50), 6),
+        'p95': round(getPercentile(95), 6),
+        'max': round(values[-1], 6),
+    }
+
+
+class ReplayRuleEngine(RuleEngine):
+    """
+    Threaded rule engine fed from a capture log, recording how long
+    received data waits to be processed, how long its evaluation takes and
+    which actions run.
+
+    Commands are not run: query and action commands return no output
+    after 'actionTime' seconds. Poll rules are not polled and received
+    data is not captured again. Data posted by chained rules is evaluated
+    like received data.
+    """
+
+    def __init__(self, settings=None, actionTime=0.0):
+        # Set up first; the engine calls the hooks while loading rules
+        self._replayLock = threading.Lock()
+        self._actionTime = actionTime
+        self._local = threading.local()
+        # times documents were queued, in queue order
+        self._queueTimes = collections.deque()
+        self._queueLatencies = []
+        self._evaluationLatencies = []
+        self._actionLatencies = []
+        # (time, rule id, command line, succeeded) of actions run
+        self._actions = []
+        self._evaluationCount = 0
+        self._triggerCount = 0
+
+        super().__init__(settings=settings)
+
+    def _schedulePoll(self, rule, delay):
+        pass
+
+    def _captureApplicationData(self, applicationName, applicationData):
+        pass
+
+    def _executeCommand(self, cmd):
+        self._local.command = cmd
+
+        if self._actionTime:
+            time.sleep(self._actionTime)
+
+        return ''
+
+    def _queueApplicationData(self, applicationName, applicationData):
+        with self._replayLock:
+            self._queueTimes.append(time.time())
+
+        super()._queueApplicationData(applicationName, applicationData)
+
+    def _evaluateApplicationData(self, applicationName, applicationData):
+        start = time.time()
+
+        with self._replayLock:
+            queueTime = self._queueTimes.popleft() \
+                if self._queueTimes else start
+
+        triggered = super()._evaluateApplicationData(
+            applicationName, applicationData)
+
+        with self._replayLock:
+            self._queueLatencies.append(start - queueTime)
+            self._evaluationLatencies.append(time.time() - start)
+            self._evaluationCount += 1
+            self._triggerCount += len(triggered)
+
+        return triggered
+
+    def _recordAction(self, rule, start, succeeded, exitStatus=None,
+                      outputSize=None):
+        super()._recordAction(
+            rule, start, succeeded, exitStatus, outputSize)
+
+        with self._replayLock:
+            self._actionLatencies.append(time.time() - start)
+            self._actions.append((
+                start, rule.ruleId, getattr(self._local, 'command', None),
+                succeeded))
+
+    def getReport(self, startTime=0.0):
+        """
+        Returns:
+            {'evaluations', 'triggered', 'latency': {stage: stats},
+             'actions': [{'time', 'rule', 'command', 'succeeded'}]};
+            action times are seconds since 'startTime'
+        """
+
+        with self._replayLock:
+            return {
+                'evaluations': self._evaluationCount,
+                'triggered': self._triggerCount,
+                'latency': {
+                    'queue': getLatencyStats(self._queueLatencies),
+                    'evaluation': getLatencyStats(self._evaluationLatencies),
+                    'action': getLatencyStats(self._actionLatencies),
+                },
+                'actions': [
+                    {
+                        'time': round(actionTime - startTime, 6),
+                        'rule': ruleId,
+                        'command': command,
+                        'succeeded': succeeded,
+                    }
+                    for actionTime, ruleId, command, succeeded in sorted(
+                        self._actions, key=lambda action: action[0])
+                ],
+            }
+
+
+def replayCapture(engine, records, speed=1.0, drainTimeout=60.0):
+    """
+    Feed captured data to a ReplayRuleEngine, 'speed' times as fast as it
+    was received (0: as fast as possible), and wait for the engine to
+    drain.
+
+        Returns:
+            report of the engine (see ReplayRuleEngine.getReport()) with
+            'documents', 'bytes', 'elapsed', 'documentsPerSecond',
+            'bytesPerSecond' and 'drained' added
+    """
+
+    documentCount = 0
+    byteCount = 0
+
+    firstTime = None
+
+    startTime = time.time()
+
+    for time_, applicationName, data in records:
+        if speed > 0:
+            if firstTime is None:
+                firstTime = time_
+
+            delay = startTime + (time_ - firstTime) / speed - time.time()
+
+            if delay > 0:
+                time.sleep(delay)
+
+        engine.receiveApplicationData(applicationName, data)
+
+        documentCount += 1
+        byteCount += len(data)
+
+    drained = engine.drain(drainTimeout)
+
+    elapsed = time.time() - startTime
+
+    report = engine.getReport(startTime)
+
+    report.update({
+        'documents': documentCount,
+        'bytes': byteCount,
+        'elapsed': round(elapsed, 6),
+        'documentsPerSecond':
+            round(documentCount / elapsed, 3) if elapsed else None,
+        'bytesPerSecond': round(byteCount / elapsed, 3) if elapsed else None,
+        'drained': drained,
+    })
+
+    return report
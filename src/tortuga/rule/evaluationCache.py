@@ -0,0 +1,100 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import hashlib
+import threading
+import time
+
+from tortuga.rule.applicationData import SpooledApplicationData
+
+
+def getDataDigest(applicationData):
+    if isinstance(applicationData, str):
+        applicationData = applicationData.encode('utf-8')
+    elif isinstance(applicationData, SpooledApplicationData):
+        applicationData = applicationData.getBuffer()
+
+    return hashlib.sha1(applicationData).digest()
+
+
+class EvaluationCache(object):
+    """
+    Per-application cache of receive rule evaluation outcomes, keyed by
+    the content hash of the application data.
+
+    An outcome is whatever the engine needs to replay an evaluation
+    without parsing the document again; entries expire after 'ttl'
+    seconds. Outcomes for an application must be invalidated whenever its
+    set of receive rules changes.
+    """
+
+    def __init__(self, ttl=300, maxEntriesPerApplication=8):
+        self._ttl = ttl
+        self._maxEntries = maxEntriesPerApplication
+        self._lock = threading.Lock()
+        self._cache = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def isEnabled(self):
+        return self._ttl > 0
+
+    def lookup(self, applicationName, digest):
+        """
+        Returns:
+            {ruleId: outcome} or None
+        """
+
+        if not self.isEnabled():
+            return None
+
+        with self._lock:
+            entries = self._cache.get(applicationName)
+
+            entry = entries.get(digest) if entries else None
+
+            if entry is None or time.time() - entry[0] > self._ttl:
+                self.misses += 1
+
+                return None
+
+            entries.move_to_end(digest)
+
+            self.hits += 1
+
+            return entry[1]
+
+    def store(self, applicationName, digest, outcomes):
+        if not self.isEnabled():
+            return
+
+        with self._lock:
+            entries = self._cache.setdefault(
+                applicationName, collections.OrderedDict())
+
+            entries[digest] = (time.time(), outcomes)
+
+            entries.move_to_end(digest)
+
+            while len(entries) > self._maxEntries:
+                entries.popitem(last=False)
+
+    def invalidate(self, applicationName=None):
+        with self._lock:
+            if applicationName is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(applicationName, None)
@@ -0,0 +1,279 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import multiprocessing
+import pickle
+import queue
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+
+# Rules of each application as built in a worker process, by application
+# name: (generation, built rules)
+_workerRuleDict = {}
+
+
+def installWorkerRules(applicationName, generation, pickledRules, build):
+    """
+    In a worker process, unpickle the rules of an application and pass
+    them to 'build', unless this generation is installed already.
+    """
+
+    entry = _workerRuleDict.get(applicationName)
+
+    if entry is None or entry[0] != generation:
+        _workerRuleDict[applicationName] = \
+            (generation, build(pickle.loads(pickledRules)))
+
+
+def getWorkerRules(applicationName, generation):
+    """
+    In a worker process, the rules of an application as built by
+    installWorkerRules().
+
+        Returns:
+            result of 'build'
+        Throws:
+            KeyError if that generation is not installed
+    """
+
+    entry = _workerRuleDict.get(applicationName)
+
+    if entry is None or entry[0] != generation:
+        raise KeyError(
+            'Rules of [%s] (generation %d) not installed' % (
+                applicationName, generation))
+
+    return entry[1]
+
+
+def _serveWorker(conn, function, build):
+    """
+    Worker process main loop: install rules and run the pool function
+    until the connection is closed.
+    """
+
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            break
+
+        if request is None:
+            break
+
+        try:
+            if request[0] == 'install':
+                _, applicationName, generation, pickledRules = request
+
+                installWorkerRules(
+                    applicationName, generation, pickledRules, build)
+
+                result = None
+            else:
+                _, applicationName, generation, args = request
+
+                result = function(
+                    applicationName,
+                    getWorkerRules(applicationName, generation), *args)
+        except Exception as ex:
+            try:
+                conn.send((False, ex))
+            except Exception:
+                # exception cannot be pickled
+                conn.send((False, RuntimeError('%s' % (ex))))
+
+            continue
+
+        conn.send((True, result))
+
+
+class _Worker(object):
+    """
+    A worker process and the connection to it, with the generation of the
+    rules of each application installed in it.
+    """
+
+    def __init__(self, function, build):
+        context = multiprocessing.get_context('spawn')
+
+        self._conn, childConn = context.Pipe()
+
+        self._process = context.Process(
+            target=_serveWorker, args=(childConn, function, build),
+            name='EvaluationWorker')
+        self._process.daemon = True
+        self._process.start()
+
+        childConn.close()
+
+        # installed generation, by application name
+        self.generations = {}
+
+    def call(self, request):
+        """
+        Returns:
+            result of the request
+        Throws:
+            exception raised in the worker, or BrokenProcessPool if the
+            worker died
+        """
+
+        try:
+            self._conn.send(request)
+
+            ok, result = self._conn.recv()
+        except (EOFError, OSError) as ex:
+            raise BrokenProcessPool(
+                'Evaluation worker terminated: %s' % (ex))
+
+        if not ok:
+            raise result
+
+        return result
+
+    def stop(self):
+        try:
+            self._conn.send(None)
+        except (EOFError, OSError):
+            pass
+
+        self._process.join(5)
+
+        if self._process.is_alive():
+            self._process.terminate()
+
+        self._conn.close()
+
+
+class EvaluationPool(object):
+    """
+    Worker processes evaluating rules against posted documents, so that
+    parsing and XPath evaluation of large documents do not hold the GIL
+    of the web service process.
+
+    The rules of an application are pickled once per generation and sent
+    to each worker once, before its first task for that generation; the
+    worker passes them to 'build' and keeps the result. A task then only
+    carries the application name, the generation and the further
+    arguments of evaluate(); 'function' is called in the worker with the
+    application name, the built rules and those arguments. 'function'
+    and 'build' must be module level functions. Workers are started on
+    first use with the 'spawn' method, as the web service process runs
+    threads; daemonic processes cannot start them.
+    """
+
+    def __init__(self, function, build, workers=None):
+        self._function = function
+        self._build = build
+        self._lock = threading.Lock()
+        # idle workers; None stands for one not started yet
+        self._idle = queue.Queue()
+        # pickled rules, by application name: (generation, bytes)
+        self._pickledRuleDict = {}
+
+        for _ in range(workers or multiprocessing.cpu_count()):
+            self._idle.put(None)
+
+        # rule sets sent to workers
+        self.rulesShipped = 0
+
+    def __getPickledRules(self, applicationName, generation, rules):
+        with self._lock:
+            entry = self._pickledRuleDict.get(applicationName)
+
+            if entry is None or entry[0] != generation:
+                entry = (generation, pickle.dumps(
+                    list(rules), pickle.HIGHEST_PROTOCOL))
+
+                self._pickledRuleDict[applicationName] = entry
+
+            return entry[1]
+
+    def __acquireWorker(self):
+        worker = self._idle.get()
+
+        if worker is not None:
+            return worker
+
+        try:
+            return _Worker(self._function, self._build)
+        except Exception:
+            self._idle.put(None)
+
+            raise
+
+    def evaluate(self, applicationName, generation, rules, *args):
+        """
+        Run the pool function for an application in a worker process and
+        wait for its result.
+
+            Returns:
+                result of the pool function
+            Throws:
+                the exception raised by the pool function, or
+                BrokenProcessPool if the worker died
+        """
+
+        worker = self.__acquireWorker()
+
+        try:
+            if worker.generations.get(applicationName) != generation:
+                worker.call((
+                    'install', applicationName, generation,
+                    self.__getPickledRules(
+                        applicationName, generation, rules)))
+
+                worker.generations[applicationName] = generation
+
+                with self._lock:
+                    self.rulesShipped += 1
+
+            result = worker.call(
+                ('evaluate', applicationName, generation, args))
+        except BrokenProcessPool:
+            # Started again on next use
+            worker.stop()
+
+            self._idle.put(None)
+
+            raise
+        except Exception:
+            self._idle.put(worker)
+
+            raise
+
+        self._idle.put(worker)
+
+        return result
+
+    def shutdown(self):
+        """
+        Stop the idle workers; busy ones are stopped by the next
+        shutdown(). Workers are started again on next use.
+        """
+
+        workers = []
+
+        while True:
+            try:
+                workers.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+        for worker in workers:
+            if worker is not None:
+                worker.stop()
+
+            self._idle.put(None)
@@ -0,0 +1,193 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+from tortuga.exceptions.invalidArgument import InvalidArgument
+
+
+SKIP = 'skip'
+QUEUE = 'queue'
+PARALLEL = 'parallel'
+
+MODES = (SKIP, QUEUE, PARALLEL)
+
+# Actions are tracked per rule or per rendered command line
+KEY_RULE = 'rule'
+KEY_COMMAND = 'command'
+
+KEYS = (KEY_RULE, KEY_COMMAND)
+
+# applicationMonitor attributes overriding the engine defaults
+IN_FLIGHT_ATTRIBUTES = ('inFlightPolicy', 'maxInFlight', 'inFlightKey')
+
+
+class InFlightPolicy(object):
+    """
+    What to do with an action while an action of the same rule (or the
+    same command line) is still running:
+
+      skip      drop it
+      queue     run it once the running action is done; a newer action
+                replaces one already waiting
+      parallel  run up to 'maxInFlight' at a time, drop the rest
+    """
+
+    __slots__ = ('mode', 'maxInFlight', 'key')
+
+    def __init__(self, mode=QUEUE, maxInFlight=1, key=KEY_RULE):
+        if mode not in MODES:
+            raise InvalidArgument(
+                'Invalid in-flight policy [%s], must be one of: %s' % (
+                    mode, ', '.join(MODES)))
+
+        if key not in KEYS:
+            raise InvalidArgument(
+                'Invalid in-flight key [%s], must be one of: %s' % (
+                    key, ', '.join(KEYS)))
+
+        try:
+            maxInFlight = int(maxInFlight)
+        except ValueError:
+            raise InvalidArgument(
+                'Invalid value [%s] for [maxInFlight]' % (maxInFlight))
+
+        if maxInFlight < 1:
+            raise InvalidArgument(
+                'Invalid value [%s] for [maxInFlight]' % (maxInFlight))
+
+        self.mode = mode
+        self.maxInFlight = maxInFlight if mode == PARALLEL else 1
+        self.key = key
+
+    @classmethod
+    def fromApplicationMonitor(cls, appMonitor):
+        """
+        Returns:
+            InFlightPolicy, None if the monitor does not override the
+            engine default
+        Throws:
+            InvalidArgument
+        """
+
+        if not any(appMonitor.get(key) for key in IN_FLIGHT_ATTRIBUTES):
+            return None
+
+        mode = appMonitor.get('inFlightPolicy') or \
+            (PARALLEL if appMonitor.get('maxInFlight') else QUEUE)
+
+        return cls(
+            mode=mode,
+            maxInFlight=appMonitor.get('maxInFlight') or 1,
+            key=appMonitor.get('inFlightKey') or KEY_RULE)
+
+    def getAttributes(self):
+        """
+        Returns:
+            {attribute: value} for the applicationMonitor element
+        """
+
+        result = {'inFlightPolicy': self.mode, 'inFlightKey': self.key}
+
+        if self.mode == PARALLEL:
+            result['maxInFlight'] = self.maxInFlight
+
+        return result
+
+
+class InFlightTracker(object):
+    """
+    Book-keeping of running actions.
+
+    An engine calls acquire() before running an action and, if it may run,
+    release() once it is done; release() hands back the queued action to
+    run next, if any, with the slot still held.
+    """
+
+    def __init__(self, defaultPolicy=None):
+        self._defaultPolicy = defaultPolicy or InFlightPolicy()
+        self._lock = threading.Lock()
+        self._runningDict = {}
+        self._queuedDict = {}
+
+    def __getPolicy(self, rule):
+        return rule.inFlightPolicy or self._defaultPolicy
+
+    def __getKey(self, rule, actionCmd):
+        if self.__getPolicy(rule).key == KEY_COMMAND:
+            return (rule.ruleId, actionCmd)
+
+        return rule.ruleId
+
+    def acquire(self, rule, actionCmd):
+        """
+        Returns:
+            True if the action is to be run now, False if it was dropped
+            or queued
+        """
+
+        policy = self.__getPolicy(rule)
+
+        key = self.__getKey(rule, actionCmd)
+
+        with self._lock:
+            running = self._runningDict.get(key, 0)
+
+            if running < policy.maxInFlight:
+                self._runningDict[key] = running + 1
+
+                return True
+
+            if policy.mode == QUEUE:
+                if key in self._queuedDict:
+                    rule.actionSuperseded()
+
+                self._queuedDict[key] = (rule, actionCmd)
+
+                rule.actionQueued()
+            else:
+                rule.actionSkippedInFlight()
+
+            return False
+
+    def release(self, rule, actionCmd):
+        """
+        Returns:
+            (rule, actionCmd) queued to run next in the released slot, or
+            None
+        """
+
+        key = self.__getKey(rule, actionCmd)
+
+        with self._lock:
+            queued = self._queuedDict.pop(key, None)
+
+            if queued is not None:
+                return queued
+
+            running = self._runningDict.get(key, 0) - 1
+
+            if running > 0:
+                self._runningDict[key] = running
+            else:
+                self._runningDict.pop(key, None)
+
+            return None
+
+    def getRunningCount(self, ruleId=None):
+        with self._lock:
+            return sum(
+                count for key, count in self._runningDict.items()
+                if ruleId is None or key == ruleId or
+                isinstance(key, tuple) and key[0] == ruleId)
@@ -0,0 +1,282 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Typed metric values.
+
+XPath results are kept as returned by libxml2: float for number(),
+str for string(), bool for boolean() and a list of nodes for node sets.
+Conditions compare these values directly; values are only turned into
+text when substituted into an action command. Arithmetic over XPath
+variables in a condition is evaluated by MetricExpression.
+"""
+
+import ast
+import math
+import operator
+
+
+OPERATORS = {
+    '=': operator.eq,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+# Arithmetic accepted in metric expressions
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+
+_UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+
+def isNodeSet(value):
+    return isinstance(value, list)
+
+
+def getNodeValue(node):
+    """
+    Returns:
+        string value of an XPath result node
+    """
+
+    return node.content if hasattr(node, 'content') else '%s' % node
+
+
+def toNumber(value):
+    """
+    Returns:
+        value as float, None if it is not a number
+    """
+
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+
+    return None
+
+
+def isUndefined(value):
+    """
+    Returns:
+        True for metrics that must not trigger an action: missing
+        values, empty strings and node sets, and NaN
+    """
+
+    if value is None or value == '' or value == 'nan':
+        return True
+
+    if isinstance(value, float):
+        return math.isnan(value)
+
+    if isNodeSet(value):
+        return not value
+
+    return False
+
+
+def compareValues(metric, operator_, triggerValue):
+    """
+    Compare as numbers if both sides are numeric, as strings otherwise. A
+    node set satisfies the comparison if any of its nodes does, as in
+    XPath.
+
+        Returns:
+            bool
+        Throws:
+            ValueError (unknown operator)
+    """
+
+    if operator_ not in OPERATORS:
+        raise ValueError('Unknown evaluation operator [%s]' % (operator_))
+
+    if isNodeSet(metric):
+        return any(compareValues(getNodeValue(node), operator_, triggerValue)
+                   for node in metric)
+
+    if isNodeSet(triggerValue):
+        return any(compareValues(metric, operator_, getNodeValue(node))
+                   for node in triggerValue)
+
+    number = toNumber(metric)
+    triggerNumber = toNumber(triggerValue)
+
+    if number is not None and triggerNumber is not None:
+        return OPERATORS[operator_](number, triggerNumber)
+
+    return OPERATORS[operator_](formatValue(metric), formatValue(triggerValue))
+
+
+def formatValue(value):
+    """
+    Returns:
+        value as substituted into action commands
+    """
+
+    if isinstance(value, str):
+        return value
+
+    if isNodeSet(value):
+        return ' '.join(getNodeValue(node) for node in value)
+
+    return '%s' % (value)
+
+
+def _getLiteralNumber(node):
+    """
+    Returns:
+        value of a numeric literal node as float, None for other nodes
+    """
+
+    # ast.Num up to Python 3.7, ast.Constant as of 3.8
+    if type(node).__name__ not in ('Num', 'Constant'):
+        return None
+
+    value = node.value if hasattr(node, 'value') else node.n
+
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+
+    return float(value)
+
+
+class MetricExpression(object):
+    """
+    Arithmetic over XPath variables used as the metric or trigger value of
+    a condition, e.g. '__total__ - __used__'.
+
+    The text is parsed once, when the rule is loaded, and compiled into
+    nested closures; only numbers, XPath variables, parentheses, unary
+    + and - and the operators + - * / // % are accepted. Variables are
+    evaluated as numbers, so the result compares numerically.
+    """
+
+    __slots__ = ('text', 'variableNames', '_evaluate')
+
+    def __init__(self, text, variableNames):
+        """
+        Throws:
+            ValueError
+        """
+
+        self.text = text
+
+        names = set()
+
+        try:
+            tree = ast.parse(text.strip(), mode='eval')
+
+            self._evaluate = self.__compile(
+                tree.body, set(variableNames), names)
+        except (SyntaxError, ValueError):
+            raise ValueError(
+                'Invalid expression [%s]: only numbers, XPath variables,'
+                ' parentheses and the operators + - * / // %% are'
+                ' allowed' % (text))
+
+        self.variableNames = tuple(sorted(names))
+
+    def __reduce__(self):
+        # Compiled again where unpickled, e.g. in evaluation workers
+        return self.__class__, (self.text, self.variableNames)
+
+    def __repr__(self):
+        return '%s' % (self.text)
+
+    def __compile(self, node, variableNames, names):
+        """
+        Returns:
+            callable taking {variable name: float} and returning the
+            value of 'node'
+        Throws:
+            ValueError
+        """
+
+        if isinstance(node, ast.BinOp) and \
+                type(node.op) in _BINARY_OPERATORS:
+            function = _BINARY_OPERATORS[type(node.op)]
+
+            left = self.__compile(node.left, variableNames, names)
+            right = self.__compile(node.right, variableNames, names)
+
+            return lambda values: function(left(values), right(values))
+
+        if isinstance(node, ast.UnaryOp) and \
+                type(node.op) in _UNARY_OPERATORS:
+            function = _UNARY_OPERATORS[type(node.op)]
+
+            operand = self.__compile(node.operand, variableNames, names)
+
+            return lambda values: function(operand(values))
+
+        if isinstance(node, ast.Name) and node.id in variableNames:
+            name = node.id
+
+            names.add(name)
+
+            return lambda values: values[name]
+
+        number = _getLiteralNumber(node)
+
+        if number is None:
+            raise ValueError(type(node).__name__)
+
+        return lambda values: number
+
+    def evaluate(self, valueDict):
+        """
+        Evaluate the expression with the values of XPath variables. A node
+        set of one node is taken as the value of the node.
+
+            Returns:
+                float, None if a variable is missing or not a number, or
+                the arithmetic fails (division by zero)
+        """
+
+        values = {}
+
+        for name in self.variableNames:
+            value = valueDict.get(name)
+
+            if isNodeSet(value) and len(value) == 1:
+                value = getNodeValue(value[0])
+
+            number = toNumber(value)
+
+            if number is None:
+                return None
+
+            values[name] = number
+
+        try:
+            return self._evaluate(values)
+        except ArithmeticError:
+            return None
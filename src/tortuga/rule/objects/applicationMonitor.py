@@ -28,9 +28,15 @@ class ApplicationMonitor(TortugaObject):
                 'description': description,
                 'pollPeriod': pollPeriod,
             },
-            ['type', 'id', 'pollPeriod', 'maxActionInvocations'],
+            ['type', 'id', 'pollPeriod', 'maxActionInvocations',
+             'maxActions', 'maxActionsPeriod', 'cooldown', 'holdCount',
+             'holdTime', 'exclusionGroup', 'exclusionInterval',
+             'inFlightPolicy', 'maxInFlight', 'inFlightKey', 'batchKey',
+             'batchWindow', 'batchMerge', 'queryMaxAge', 'minPollPeriod',
+             'maxPollPeriod', 'currentPollPeriod', 'chainTo', 'chainOutput'],
             ApplicationMonitor.ROOT_TAG, {
                 'queryCommand': 'str',
+                'queryProvider': 'str',
                 'actionCommand': 'str',
             }
         )
@@ -65,6 +71,12 @@ class ApplicationMonitor(TortugaObject):
     def getQueryCommand(self):
         return self.get('queryCommand')
 
+    def setQueryProvider(self, queryProvider):
+        self['queryProvider'] = queryProvider
+
+    def getQueryProvider(self):
+        return self.get('queryProvider')
+
     def setAnalyzeCommand(self, analyzeCommand):
         self['analyzeCommand'] = analyzeCommand
 
@@ -83,6 +95,117 @@ class ApplicationMonitor(TortugaObject):
     def getMaxActionInvocations(self):
         return self.get('maxActionInvocations')
 
+    def setMaxActions(self, maxActions):
+        self['maxActions'] = maxActions
+
+    def getMaxActions(self):
+        return self.get('maxActions')
+
+    def setMaxActionsPeriod(self, maxActionsPeriod):
+        self['maxActionsPeriod'] = maxActionsPeriod
+
+    def getMaxActionsPeriod(self):
+        return self.get('maxActionsPeriod')
+
+    def setCooldown(self, cooldown):
+        self['cooldown'] = cooldown
+
+    def getCooldown(self):
+        return self.get('cooldown')
+
+    def setHoldCount(self, holdCount):
+        self['holdCount'] = holdCount
+
+    def getHoldCount(self):
+        return self.get('holdCount')
+
+    def setHoldTime(self, holdTime):
+        self['holdTime'] = holdTime
+
+    def getHoldTime(self):
+        return self.get('holdTime')
+
+    def setExclusionGroup(self, exclusionGroup):
+        self['exclusionGroup'] = exclusionGroup
+
+    def getExclusionGroup(self):
+        return self.get('exclusionGroup')
+
+    def setExclusionInterval(self, exclusionInterval):
+        self['exclusionInterval'] = exclusionInterval
+
+    def getExclusionInterval(self):
+        return self.get('exclusionInterval')
+
+    def setInFlightPolicy(self, inFlightPolicy):
+        self['inFlightPolicy'] = inFlightPolicy
+
+    def getInFlightPolicy(self):
+        return self.get('inFlightPolicy')
+
+    def setMaxInFlight(self, maxInFlight):
+        self['maxInFlight'] = maxInFlight
+
+    def getMaxInFlight(self):
+        return self.get('maxInFlight')
+
+    def setInFlightKey(self, inFlightKey):
+        self['inFlightKey'] = inFlightKey
+
+    def getInFlightKey(self):
+        return self.get('inFlightKey')
+
+    def setMinPollPeriod(self, minPollPeriod):
+        self['minPollPeriod'] = minPollPeriod
+
+    def getMinPollPeriod(self):
+        return self.get('minPollPeriod')
+
+    def setMaxPollPeriod(self, maxPollPeriod):
+        self['maxPollPeriod'] = maxPollPeriod
+
+    def getMaxPollPeriod(self):
+        return self.get('maxPollPeriod')
+
+    def getCurrentPollPeriod(self):
+        return self.get('currentPollPeriod')
+
+    def setQueryMaxAge(self, queryMaxAge):
+        self['queryMaxAge'] = queryMaxAge
+
+    def getQueryMaxAge(self):
+        return self.get('queryMaxAge')
+
+    def setBatchKey(self, batchKey):
+        self['batchKey'] = batchKey
+
+    def getBatchKey(self):
+        return self.get('batchKey')
+
+    def setBatchWindow(self, batchWindow):
+        self['batchWindow'] = batchWindow
+
+    def getBatchWindow(self):
+        return self.get('batchWindow')
+
+    def setBatchMerge(self, batchMerge):
+        self['batchMerge'] = batchMerge
+
+    def getBatchMerge(self):
+        return self.get('batchMerge')
+
+    def setChainTo(self, chainTo):
+        self['chainTo'] = chainTo
+
+    def getChainTo(self):
+        return self.get('chainTo')
+
+    def setChainOutput(self, chainOutput):
+        self['chainOutput'] = chainOutput
+
+    def getChainOutput(self):
+        return self.get('chainOutput')
+
     def getTotalQueryInvocations(self):
         return self.get('totalQueryInvocations')
 
@@ -157,6 +280,40 @@ class ApplicationMonitor(TortugaObject):
         self['totalActionInvocations'] += 1
         self['lastFailedActionInvocationTime'] = time.time()
 
+    def getDeduplicatedDataCount(self):
+        return self.get('deduplicatedData')
+
+    def dataDeduplicated(self):
+        if not self.get('deduplicatedData'):
+            self['deduplicatedData'] = 0
+        self['deduplicatedData'] += 1
+
+    def getSuppressedActionCount(self):
+        return self.get('suppressedActions')
+
+    def actionSuppressed(self):
+        if not self.get('suppressedActions'):
+            self['suppressedActions'] = 0
+        self['suppressedActions'] += 1
+
+    def getQueuedActionCount(self):
+        return self.get('queuedActions')
+
+    def getSupersededActionCount(self):
+        return self.get('supersededActions')
+
+    def getSkippedInFlightActionCount(self):
+        return self.get('skippedInFlightActions')
+
+    def getBatchedActionCount(self):
+        return self.get('batchedActions')
+
+    def getCachedQueryCount(self):
+        return self.get('cachedQueries')
+
+    def getChainedOutputCount(self):
+        return self.get('chainedOutputs')
+
     @staticmethod
     def getKeys():
         return [
@@ -164,10 +321,30 @@ class ApplicationMonitor(TortugaObject):
             'type',
             'description',
             'pollPeriod',
+            'minPollPeriod',
+            'maxPollPeriod',
+            'currentPollPeriod',
             'queryCommand',
+            'queryProvider',
             'analyzeCommand',
             'actionCommand',
             'maxActionInvocations',
+            'maxActions',
+            'maxActionsPeriod',
+            'cooldown',
+            'holdCount',
+            'holdTime',
+            'exclusionGroup',
+            'exclusionInterval',
+            'inFlightPolicy',
+            'maxInFlight',
+            'inFlightKey',
+            'batchKey',
+            'batchWindow',
+            'batchMerge',
+            'queryMaxAge',
+            'chainTo',
+            'chainOutput',
             'failedQueryInvocations',
             'successfulQueryInvocations',
             'totalQueryInvocations',
@@ -178,4 +355,12 @@ class ApplicationMonitor(TortugaObject):
             'totalActionInvocations',
             'lastFailedActionInvocationTime',
             'lastSuccessfulActionInvocationTime',
+            'deduplicatedData',
+            'suppressedActions',
+            'queuedActions',
+            'supersededActions',
+            'skippedInFlightActions',
+            'batchedActions',
+            'cachedQueries',
+            'chainedOutputs',
         ]
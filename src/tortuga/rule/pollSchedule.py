@@ -0,0 +1,97 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import time
+import zlib
+
+
+def getPhaseOffset(key, pollPeriod):
+    """
+    Returns:
+        offset of polls within the poll period, in seconds, derived from a
+        hash of 'key'
+    """
+
+    return zlib.crc32(key.encode('utf-8')) / float(1 << 32) * pollPeriod
+
+
+class PollSchedule(object):
+    """
+    Delays between polls of poll rules.
+
+    With 'spread' enabled, each rule polls at fixed points in time,
+    'pollPeriod' seconds apart and offset by getPhaseOffset(), rather than
+    'pollPeriod' seconds after it was enabled or last polled. Rules loaded
+    together at startup therefore do not query at the same instant, and
+    slow queries do not make polls drift. The offsets only depend on the
+    key (the rule id, or the query command for rules that can share query
+    output) and period, so they are the same across restarts.
+
+    'jitter' additionally moves every poll by a random amount of up to
+    'jitter' times the poll period, either way.
+    """
+
+    def __init__(self, spread=True, jitter=0.0, random_=None):
+        self.spread = spread
+        self.jitter = jitter
+        self._random = random_ or random.Random()
+
+    def __getJitter(self, pollPeriod):
+        if not self.jitter:
+            return 0.0
+
+        return self._random.uniform(-self.jitter, self.jitter) * pollPeriod
+
+    def __getTimeToSlot(self, key, pollPeriod, now):
+        """
+        Returns:
+            seconds until the next poll slot of the rule, in (0, pollPeriod]
+        """
+
+        return pollPeriod - \
+            (now - getPhaseOffset(key, pollPeriod)) % pollPeriod
+
+    def getInitialDelay(self, key, pollPeriod, now=None):
+        """
+        Returns:
+            seconds until the first poll of a rule being enabled
+        """
+
+        if not self.spread or pollPeriod <= 0:
+            delay = pollPeriod
+        else:
+            delay = self.__getTimeToSlot(
+                key, pollPeriod, time.time() if now is None else now)
+
+        return max(0.0, delay + self.__getJitter(pollPeriod))
+
+    def getNextDelay(self, key, pollPeriod, now=None):
+        """
+        Returns:
+            seconds until the poll following the one that just ran
+        """
+
+        if not self.spread or pollPeriod <= 0:
+            delay = pollPeriod
+        else:
+            delay = self.__getTimeToSlot(
+                key, pollPeriod, time.time() if now is None else now)
+
+            if delay < pollPeriod / 2.0:
+                # Slot is too close to the poll that just ran (early by
+                # jitter, or late after a slow query); take the one after
+                delay += pollPeriod
+
+        return max(0.0, delay + self.__getJitter(pollPeriod))
@@ -0,0 +1,289 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+import os
+import subprocess
+import threading
+import xml.etree.ElementTree as ElementTree
+
+from tortuga.exceptions.invalidArgument import InvalidArgument
+from tortuga.exceptions.tortugaException import TortugaException
+from tortuga.rule.queryProvider import QueryProvider
+
+
+def getJobSlots(jobElement):
+    """
+    Returns:
+        slots requested by a job of 'qstat -xml -j', None if they cannot
+        be determined
+    """
+
+    # Parallel environment job
+    peMax = jobElement.find('JB_pe_range/element/RN_max')
+
+    if peMax is not None:
+        return int(peMax.text)
+
+    jaStructure = jobElement.find('JB_ja_structure')
+
+    if jaStructure is None:
+        return None
+
+    element = jaStructure.find('element')
+
+    if element is None:
+        element = jaStructure.find('task_id_range')
+
+    if element is None:
+        return None
+
+    try:
+        rnMin = float(element.find('RN_min').text)
+        rnMax = float(element.find('RN_max').text)
+        rnStep = float(element.find('RN_step').text)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+    if rnMin == rnMax and rnStep == 1:
+        return int(rnMax)
+
+    return 1 + int(math.ceil(rnMax - rnMin) / rnStep)
+
+
+def iterElements(fp, parentTag, tag):
+    """
+    Parse XML from 'fp' incrementally, yielding each 'tag' element that is
+    a child of a 'parentTag' element once it is complete. Elements are
+    cleared once yielded, so memory use does not grow with the document.
+    """
+
+    stack = []
+
+    for event, element in ElementTree.iterparse(fp, events=('start', 'end')):
+        if event == 'start':
+            stack.append(element.tag)
+
+            continue
+
+        stack.pop()
+
+        if element.tag == tag and stack and stack[-1] == parentTag:
+            yield element
+
+            element.clear()
+
+
+def isQueueRequested(jobElement, queueName):
+    hardQueueList = jobElement.find('JB_hard_queue_list')
+
+    if hardQueueList is None:
+        return False
+
+    return any(queueName in (text or '')
+               for text in hardQueueList.itertext())
+
+
+class GridEngineQueryProvider(QueryProvider):
+    """
+    Resource data of a Grid Engine queue for the cloud bursting example,
+    the same document as 'examples/simple_burst/get-resource-info' prints.
+
+    The details of all jobs are fetched with a single 'qstat -xml -j *'
+    and parsed as they are read, instead of one 'qstat' per pending job,
+    and the Grid Engine environment is read from 'settings.sh' only once.
+
+    Options: queueName, softwareProfile, cellDir (all required) and
+    slotsPerHost (default: 1).
+    """
+
+    NODES_COMMAND = '/opt/tortuga/bin/get-software-profile-nodes'
+
+    def __init__(self, queueName=None, softwareProfile=None, cellDir=None,
+                 slotsPerHost='1', **options):
+        super().__init__(**options)
+
+        if not queueName or not softwareProfile or not cellDir:
+            raise InvalidArgument(
+                '[queueName], [softwareProfile] and [cellDir] are required')
+
+        try:
+            slotsPerHost = int(slotsPerHost)
+        except ValueError:
+            raise InvalidArgument(
+                'Invalid value [%s] for [slotsPerHost]' % (slotsPerHost))
+
+        if slotsPerHost < 1:
+            raise InvalidArgument(
+                'Invalid value [%s] for [slotsPerHost]' % (slotsPerHost))
+
+        self.queueName = queueName
+        self.softwareProfile = softwareProfile
+        self.cellDir = cellDir
+        self.slotsPerHost = slotsPerHost
+
+        self._envLock = threading.Lock()
+        self._env = None
+
+    def __getEnvironment(self):
+        """
+        Returns:
+            environment set up by the cell's 'settings.sh'
+        Throws:
+            TortugaException
+        """
+
+        with self._envLock:
+            if self._env is None:
+                settingsFile = os.path.join(
+                    self.cellDir, 'common', 'settings.sh')
+
+                p = subprocess.run(
+                    ['/bin/bash', '-c', 'source "$0" && env -0',
+                     settingsFile],
+                    stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+                if p.returncode != 0:
+                    raise TortugaException(
+                        'Could not source [%s]: %s' % (
+                            settingsFile,
+                            p.stderr.decode(errors='replace').strip()))
+
+                self._env = dict(
+                    entry.split('=', 1)
+                    for entry in p.stdout.decode(errors='replace').split(
+                        '\0') if '=' in entry)
+
+            return self._env
+
+    def __iterQstat(self, args, parentTag, tag):
+        try:
+            p = subprocess.Popen(
+                ['qstat', '-xml'] + args, stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE, env=self.__getEnvironment())
+        except OSError as ex:
+            raise TortugaException(
+                'Could not run [qstat %s]: %s' % (' '.join(args), ex))
+
+        try:
+            yield from iterElements(p.stdout, parentTag, tag)
+        except ElementTree.ParseError as ex:
+            p.kill()
+
+            raise TortugaException(
+                'Error parsing output of [qstat %s]: %s' % (
+                    ' '.join(args), ex))
+        finally:
+            p.stdout.close()
+
+            stderr = p.stderr.read()
+
+            p.stderr.close()
+
+            retval = p.wait()
+
+        if retval != 0:
+            raise TortugaException(
+                'Command [qstat %s] failed (exit status: %s): %s' % (
+                    ' '.join(args), retval,
+                    stderr.decode(errors='replace').strip()))
+
+    def getPendingJobs(self):
+        """
+        Returns:
+            (number of jobs requesting the queue, slots they request)
+        Throws:
+            TortugaException
+        """
+
+        jobs = 0
+        slots = 0
+
+        for jobElement in self.__iterQstat(
+                ['-j', '*'], 'djob_info', 'element'):
+            if not isQueueRequested(jobElement, self.queueName):
+                continue
+
+            jobSlots = getJobSlots(jobElement)
+
+            if jobSlots is None:
+                continue
+
+            jobs += 1
+
+            slots += jobSlots
+
+        return jobs, slots
+
+    def getRunningJobCount(self):
+        """
+        Returns:
+            number of jobs running in the queue
+        Throws:
+            TortugaException
+        """
+
+        return sum(
+            1 for jobElement in self.__iterQstat(
+                ['-q', self.queueName, '-u', '*', '-s', 'r'],
+                'queue_info', 'job_list')
+            if jobElement.findtext('state', '').strip() == 'r')
+
+    def getNodeCount(self):
+        """
+        Returns:
+            number of nodes in the software profile, 0 if unknown
+        """
+
+        try:
+            p = subprocess.run(
+                [self.NODES_COMMAND, '--software-profile',
+                 self.softwareProfile],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError:
+            return 0
+
+        if p.returncode != 0:
+            return 0
+
+        return len(p.stdout.splitlines())
+
+    def query(self):
+        pendingJobs, slots = self.getPendingJobs()
+
+        queueRunningJobs = self.getRunningJobCount()
+
+        nodesInQueue = self.getNodeCount()
+
+        # Round 'needed slots' up to the next multiple of 'slotsPerHost'
+        neededSlots = math.ceil(
+            float(slots) / self.slotsPerHost) * self.slotsPerHost
+
+        availableSlots = nodesInQueue * self.slotsPerHost
+
+        resourceData = ElementTree.Element(
+            'resourceData', queue=self.queueName)
+
+        for tag, value in (
+                ('pendingJobs', pendingJobs),
+                ('queueRunningJobs', queueRunningJobs),
+                ('totalJobs', pendingJobs + queueRunningJobs),
+                ('nodesInQueue', nodesInQueue),
+                ('neededNodes',
+                 (neededSlots - availableSlots) / self.slotsPerHost),
+                ('extraNodes',
+                 (availableSlots - neededSlots) / self.slotsPerHost)):
+            ElementTree.SubElement(resourceData, tag).text = '%d' % (value)
+
+        return ElementTree.tostring(resourceData, encoding='unicode')
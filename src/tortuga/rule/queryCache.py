@@ -0,0 +1,302 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+import time
+
+from tortuga.exceptions.invalidArgument import InvalidArgument
+
+
+# applicationMonitor attributes of the query cache
+QUERY_CACHE_ATTRIBUTES = ('queryMaxAge',)
+
+
+def getQueryMaxAge(appMonitor):
+    """
+    Returns:
+        max. age in seconds of shared query output the rule accepts, None
+        if the monitor does not set it
+    Throws:
+        InvalidArgument
+    """
+
+    value = appMonitor.get('queryMaxAge')
+
+    if value is None or value == '':
+        return None
+
+    try:
+        maxAge = float(value)
+    except ValueError:
+        raise InvalidArgument('Invalid value [%s] for [queryMaxAge]' % (value))
+
+    if maxAge < 0:
+        raise InvalidArgument('Invalid value [%s] for [queryMaxAge]' % (value))
+
+    return maxAge
+
+
+class QueryResult(object):
+    """
+    Output of one run of a query command, shared by all poll rules with
+    that query command.
+
+    The document parsed from the output is parsed on first use and freed
+    once the result has been replaced by a newer one and is no longer in
+    use; users obtain results from QueryCache.acquire()/store() and hand
+    them back with QueryCache.release().
+    """
+
+    __slots__ = ('queryCmd', 'stdout', 'time', '_document', '_parsed',
+                 '_users', '_retired', '_lock')
+
+    def __init__(self, queryCmd, stdout, now):
+        self.queryCmd = queryCmd
+        self.stdout = stdout
+        self.time = now
+        self._document = None
+        self._parsed = False
+        self._users = 0
+        self._retired = False
+        self._lock = threading.Lock()
+
+    def getDocument(self, parse):
+        """
+        Returns:
+            document parsed from stdout by 'parse', None if it could not
+            be parsed
+        """
+
+        with self._lock:
+            if not self._parsed:
+                self._document = parse(self.stdout)
+                self._parsed = True
+
+            return self._document
+
+
+class QueryCache(object):
+    """
+    Recent query command output, by command string.
+
+    Each poll rule asks for output no older than its own max. age, so rules
+    with the same query command polled within that window share one run.
+    'free' is called with the parsed document of a result that is no
+    longer needed.
+    """
+
+    def __init__(self, free=None):
+        self._free = free
+        self._lock = threading.Lock()
+        self._resultDict = {}
+        self._maxAge = 0.0
+
+    def acquire(self, queryCmd, maxAge=None, now=None):
+        """
+        Returns:
+            QueryResult no older than 'maxAge' seconds (any age if None),
+            None if there is none
+        """
+
+        now = time.time() if now is None else now
+
+        with self._lock:
+            result = self._resultDict.get(queryCmd)
+
+            if result is None or \
+                    maxAge is not None and now - result.time > maxAge:
+                return None
+
+            result._users += 1
+
+            return result
+
+    def retain(self, result):
+        """
+        Take another reference to a result, e.g. one stored by another
+        thread.
+        """
+
+        with self._lock:
+            if result._retired and not result._users:
+                # Document already freed, parse again on use
+                result._parsed = False
+
+            result._users += 1
+
+    def store(self, queryCmd, stdout, maxAge=0.0, now=None):
+        """
+        Store output of a query command just run, replacing any older
+        output of the command.
+
+            Returns:
+                QueryResult, to be released by the caller
+        """
+
+        now = time.time() if now is None else now
+
+        result = QueryResult(queryCmd, stdout, now)
+
+        result._users = 1
+
+        retired = []
+
+        with self._lock:
+            self._maxAge = max(self._maxAge, maxAge)
+
+            previous = self._resultDict.get(queryCmd)
+
+            if previous is not None:
+                retired.append(previous)
+
+            self._resultDict[queryCmd] = result
+
+            # Output nobody could ask for anymore
+            for key, other in list(self._resultDict.items()):
+                if now - other.time > self._maxAge:
+                    del self._resultDict[key]
+
+                    retired.append(other)
+
+            for other in retired:
+                other._retired = True
+
+            toFree = [other for other in retired if not other._users]
+
+        for other in toFree:
+            self.__free(other)
+
+        return result
+
+    def release(self, result):
+        with self._lock:
+            result._users -= 1
+
+            if result._users or not result._retired:
+                return
+
+        self.__free(result)
+
+    def __free(self, result):
+        if result._parsed and result._document is not None and \
+                self._free is not None:
+            self._free(result._document)
+
+        result._document = None
+
+    def invalidate(self):
+        with self._lock:
+            retired = list(self._resultDict.values())
+
+            self._resultDict = {}
+
+            for result in retired:
+                result._retired = True
+
+            toFree = [result for result in retired if not result._users]
+
+        for result in toFree:
+            self.__free(result)
+
+
+class SingleFlight(object):
+    """
+    Concurrent calls for the same key share one execution: the first
+    caller runs the function, later callers wait for and get its outcome.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callDict = {}
+
+    def do(self, key, function):
+        """
+        Returns:
+            (result, shared), 'shared' being True if the result came from
+            a call made by another thread
+        Throws:
+            the exception raised by 'function'
+        """
+
+        with self._lock:
+            call = self._callDict.get(key)
+
+            if call is None:
+                call = self._callDict[key] = [threading.Event(), None, None]
+
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            call[0].wait()
+
+            if call[2] is not None:
+                raise call[2]
+
+            return call[1], True
+
+        try:
+            call[1] = function()
+        except Exception as ex:
+            call[2] = ex
+
+            raise
+        finally:
+            with self._lock:
+                del self._callDict[key]
+
+            call[0].set()
+
+        return call[1], False
+
+
+class AsyncSingleFlight(object):
+    """
+    SingleFlight for coroutines on one event loop.
+    """
+
+    def __init__(self):
+        self._futureDict = {}
+
+    async def do(self, key, coroutineFunction):
+        future = self._futureDict.get(key)
+
+        if future is not None:
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_event_loop().create_future()
+
+        self._futureDict[key] = future
+
+        try:
+            result = await coroutineFunction()
+        except Exception as ex:
+            future.set_exception(ex)
+
+            # Retrieved by waiters, if any
+            future.exception()
+
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self._futureDict[key]
+
+            if not future.done():
+                # Cancelled
+                future.cancel()
+
+        return result, False
@@ -0,0 +1,162 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import importlib
+import shlex
+import threading
+
+from tortuga.exceptions.invalidArgument import InvalidArgument
+
+
+# Query providers shipped with the engine, by name; other providers are
+# referred to by the dotted path of their class
+QUERY_PROVIDERS = {
+    'gridengine':
+        'tortuga.rule.providers.gridEngine.GridEngineQueryProvider',
+}
+
+
+class QueryProvider(object):
+    """
+    Python alternative to the 'queryCommand' of a poll or event rule.
+
+    A rule refers to a provider with a 'queryProvider' element holding the
+    provider name followed by 'key=value' options, which are passed to the
+    constructor as keyword arguments:
+
+        <queryProvider>gridengine queueName=burst.q ...</queryProvider>
+
+    query() returns a document like a query command prints it, and is
+    evaluated by the rule in the same way. It is called from engine
+    threads, possibly concurrently for rules sharing a provider.
+    """
+
+    def __init__(self, **options):
+        if options:
+            raise InvalidArgument(
+                'Unknown query provider option(s): %s' % (
+                    ', '.join(sorted(options))))
+
+    def query(self):
+        """
+        Returns:
+            document (str)
+        Throws:
+            TortugaException
+        """
+
+        raise NotImplementedError
+
+
+def parseQueryProvider(spec):
+    """
+    Returns:
+        (provider name, {option: value})
+    Throws:
+        InvalidArgument
+    """
+
+    try:
+        words = shlex.split(spec)
+    except ValueError as ex:
+        raise InvalidArgument(
+            'Invalid query provider [%s]: %s' % (spec, ex))
+
+    if not words:
+        raise InvalidArgument('Query provider name is required')
+
+    options = {}
+
+    for word in words[1:]:
+        key, sep, value = word.partition('=')
+
+        if not sep or not key:
+            raise InvalidArgument(
+                'Invalid query provider option [%s], expected'
+                ' key=value' % (word))
+
+        options[key] = value
+
+    return words[0], options
+
+
+def getQueryProvider(spec):
+    """
+    Returns:
+        QueryProvider configured by 'spec'
+    Throws:
+        InvalidArgument
+    """
+
+    name, options = parseQueryProvider(spec)
+
+    path = QUERY_PROVIDERS.get(name, name)
+
+    moduleName, _, className = path.rpartition('.')
+
+    try:
+        providerClass = getattr(
+            importlib.import_module(moduleName), className)
+    except (ImportError, AttributeError, ValueError):
+        raise InvalidArgument('Unknown query provider [%s]' % (name))
+
+    if not isinstance(providerClass, type) or \
+            not issubclass(providerClass, QueryProvider):
+        raise InvalidArgument(
+            '[%s] is not a query provider' % (name))
+
+    try:
+        return providerClass(**options)
+    except TypeError as ex:
+        raise InvalidArgument(
+            'Invalid options for query provider [%s]: %s' % (name, ex))
+
+
+class QueryProviders(object):
+    """
+    Query providers in use by the rules of an engine, one per distinct
+    'queryProvider' value.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._providerDict = {}
+
+    def get(self, spec):
+        """
+        Returns:
+            QueryProvider for 'spec', created on first use
+        Throws:
+            InvalidArgument
+        """
+
+        with self._lock:
+            provider = self._providerDict.get(spec)
+
+            if provider is None:
+                provider = getQueryProvider(spec)
+
+                self._providerDict[spec] = provider
+
+            return provider
+
+    def query(self, spec):
+        """
+        Returns:
+            document returned by the provider for 'spec'
+        Throws:
+            InvalidArgument, TortugaException
+        """
+
+        return self.get(spec).query()
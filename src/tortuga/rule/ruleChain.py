@@ -0,0 +1,154 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from tortuga.exceptions.invalidArgument import InvalidArgument
+
+
+OUTPUT_ACTION = 'action'
+OUTPUT_QUERY = 'query'
+
+OUTPUTS = (OUTPUT_ACTION, OUTPUT_QUERY)
+
+# applicationMonitor attributes of rule chaining
+CHAIN_ATTRIBUTES = ('chainTo', 'chainOutput')
+
+
+class ChainPolicy(object):
+    """
+    Output of a rule posted to the "receive" rules of another application
+    by the engine itself, instead of through post-application-data:
+
+      action  stdout of every successful action command
+      query   stdout of every query command run (or taken from the query
+              cache) by the rule, before its own conditions are evaluated
+    """
+
+    __slots__ = ('applicationName', 'output')
+
+    def __init__(self, applicationName, output=OUTPUT_ACTION):
+        if not applicationName:
+            raise InvalidArgument('[chainTo] requires an application name')
+
+        if output not in OUTPUTS:
+            raise InvalidArgument(
+                'Invalid chain output [%s], must be one of: %s' % (
+                    output, ', '.join(OUTPUTS)))
+
+        self.applicationName = applicationName
+        self.output = output
+
+    @classmethod
+    def fromApplicationMonitor(cls, appMonitor):
+        """
+        Returns:
+            ChainPolicy, None if the rule is not chained
+        Throws:
+            InvalidArgument
+        """
+
+        if not any(appMonitor.get(key) for key in CHAIN_ATTRIBUTES):
+            return None
+
+        policy = cls(
+            appMonitor.get('chainTo'),
+            output=appMonitor.get('chainOutput') or OUTPUT_ACTION)
+
+        if policy.output == OUTPUT_QUERY and \
+                not appMonitor.get('queryCommand') and \
+                not appMonitor.get('queryProvider'):
+            raise InvalidArgument(
+                '[chainOutput] "%s" requires a query command or'
+                ' provider' % (OUTPUT_QUERY))
+
+        return policy
+
+    def getAttributes(self):
+        """
+        Returns:
+            {attribute: value} for the applicationMonitor element
+        """
+
+        return {'chainTo': self.applicationName, 'chainOutput': self.output}
+
+
+class ChainGraph(object):
+    """
+    Applications whose "receive" rules post to other applications.
+
+    Data received by an application can only loop back to it through
+    chained "receive" rules; poll and event rules are started by the
+    engine and are never part of a loop, so only "receive" rules are
+    recorded. Not thread-safe; the engine lock is held by callers.
+    """
+
+    def __init__(self):
+        # (source application, target application), by rule id
+        self._edgeDict = {}
+
+    def add(self, ruleId, sourceApplicationName, targetApplicationName):
+        self._edgeDict[ruleId] = (
+            sourceApplicationName, targetApplicationName)
+
+    def remove(self, ruleId):
+        self._edgeDict.pop(ruleId, None)
+
+    def getDependencies(self):
+        """
+        Returns:
+            {application name: sorted names of the applications it posts
+            to}
+        """
+
+        result = {}
+
+        for source, target in self._edgeDict.values():
+            result.setdefault(source, set()).add(target)
+
+        return {
+            source: sorted(targets) for source, targets in result.items()
+        }
+
+    def findCycle(self, sourceApplicationName, targetApplicationName):
+        """
+        Returns:
+            list of application names from 'sourceApplicationName' back
+            to itself, should a "receive" rule of it post to
+            'targetApplicationName'; None if that closes no loop
+        """
+
+        dependencies = self.getDependencies()
+
+        # Depth-first search for a path from the target back to the source
+        stack = [(targetApplicationName, [sourceApplicationName,
+                                          targetApplicationName])]
+
+        visited = set()
+
+        while stack:
+            applicationName, path = stack.pop()
+
+            if applicationName == sourceApplicationName:
+                return path
+
+            if applicationName in visited:
+                continue
+
+            visited.add(applicationName)
+
+            for nextApplicationName in dependencies.get(
+                    applicationName, ()):
+                stack.append(
+                    (nextApplicationName, path + [nextApplicationName]))
+
+        return None
@@ -14,7 +14,6 @@
 
 from tortuga.cli.tortugaCli import TortugaCli
 from tortuga.exceptions.invalidCliRequest import InvalidCliRequest
-from .wsapi.ruleWsApi import RuleWsApi
 
 
 class RuleCli(TortugaCli):
@@ -28,6 +27,10 @@ class RuleCli(TortugaCli):
 
     def get_rule_api(self):
         if not self._rule_api:
+            # Deferred so that loading a rule CLI (and printing its usage)
+            # does not pay for the web service client stack.
+            from .wsapi.ruleWsApi import RuleWsApi
+
             self._rule_api = RuleWsApi(username=self.getUsername(),
                                        password=self.getPassword(),
                                        baseurl=self.getUrl())
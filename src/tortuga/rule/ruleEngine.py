@@ -20,10 +20,11 @@ try:
     import libxml2
 except ImportError:
     pass
-import copy
 import time
 import queue
 import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
 
 from tortuga.rule.ruleEngineInterface import RuleEngineInterface
 from tortuga.exceptions.ruleAlreadyExists import RuleAlreadyExists
@@ -32,16 +33,66 @@ from tortuga.exceptions.ruleAlreadyEnabled import RuleAlreadyEnabled
 from tortuga.exceptions.ruleAlreadyDisabled import RuleAlreadyDisabled
 from tortuga.exceptions.ruleDisabled import RuleDisabled
 from tortuga.exceptions.tortugaException import TortugaException
+from tortuga.exceptions.invalidArgument import InvalidArgument
 from tortuga.config.configManager import ConfigManager
 from tortuga.os_utility import tortugaSubprocess
 from tortuga.os_utility import osUtility
 from tortuga.objects.tortugaObject import TortugaObjectList
 from tortuga.rule.ruleXmlParser import RuleXmlParser
+from tortuga.rule.ruleEngineSettings import RuleEngineSettings
+from tortuga.rule.evaluationCache import EvaluationCache, getDataDigest
+from tortuga.rule.compiledRule import CompiledCondition, CompiledRule
+from tortuga.rule.evaluationPool import EvaluationPool
+from tortuga.rule.actionBatcher import ActionBatcher, BatchPolicy, \
+    getBatchValues
+from tortuga.rule.actionPolicy import ActionPolicy, ExclusionGroups
+from tortuga.rule.applicationData import SpooledApplicationData, \
+    releaseApplicationData
+from tortuga.rule.adaptivePollPeriod import AdaptivePollPeriod, \
+    getTriggerDistance
+from tortuga.rule.inFlightTracker import InFlightPolicy, InFlightTracker
+from tortuga.rule.batchConditionEvaluator import BatchConditionEvaluator
+from tortuga.rule.metricValue import compareValues, formatValue, \
+    isUndefined
+from tortuga.rule.pollSchedule import PollSchedule
+from tortuga.rule.queryCache import QueryCache, SingleFlight, getQueryMaxAge
+from tortuga.rule.queryProvider import QueryProviders
+from tortuga.rule.ruleChain import OUTPUT_ACTION, OUTPUT_QUERY, ChainGraph, \
+    ChainPolicy
+from tortuga.rule.ruleHistory import FAILED, RuleHistory, getDecision
+from tortuga.rule.dataCapture import CaptureWriter, readCapture
+
+
+# Seconds between checks whether the engine is idle while draining
+DRAIN_CHECK_INTERVAL = 0.1
+
+
+def getQueueFileName(settings, rulesDir):
+    """
+    Returns:
+        file data still queued when the engine stops is saved to
+    """
+
+    return settings.get('queueFile') or os.path.join(
+        os.path.dirname(os.path.normpath(rulesDir)),
+        'simple_policy_engine.queue.gz')
 
 
 class RuleEngine(RuleEngineInterface):
-    def __init__(self, minTriggerInterval=60):
+    def __init__(self, minTriggerInterval=60, settings=None,
+                 applicationFilter=None):
+        """
+        'applicationFilter', if given, is a callable taking an application
+        name and returning whether rules of the application are loaded
+        from the rules directory.
+        """
+
+        # first; helpers called below log
+        self._logger = logging.getLogger(
+            'tortuga.rule.%s' % self.__class__.__name__)
         self._cm = ConfigManager()
+        self._settings = settings or RuleEngineSettings()
+        self._applicationFilter = applicationFilter
         self._lock = threading.RLock()
         self._processingLock = threading.RLock()
         self._minTriggerInterval = minTriggerInterval
@@ -49,17 +100,94 @@ class RuleEngine(RuleEngineInterface):
         self._disabledRuleDict = {}  # Used for rules in the disabled state
         self._eventRuleDict = {}  # used for "event" type monitoring
         self._pollTimerDict = {}  # used for "poll" monitoring
+        # polls running their query or action
+        self._pollingCount = 0
+        # set by stop(): data is turned away, polls are not scheduled and
+        # queued data is processed without delay
+        self._stopping = False
+        self._drainEvent = threading.Event()
+        # phase spreading and jitter of "poll" rules
+        self._pollSchedule = PollSchedule(
+            spread=self._settings.getBoolean('pollSpread'),
+            jitter=self._settings.getFloat('pollJitter'))
+        # recent query output shared by "poll" rules, by query command
+        self._queryCache = QueryCache(free=lambda doc: doc.freeDoc())
+        self._queryFlight = SingleFlight()
+        # query providers of "poll" and "event" rules, by queryProvider
+        self._queryProviders = QueryProviders()
         self._receiveRuleDict = {}  # used for "receive" type monitoring
         self._receiveQ = queue.Queue(0)  # infinite size FIFO queue
-        self._rulesDir = self._cm.getRulesDir()
-        self._logger = logging.getLogger(
-            'tortuga.rule.%s' % self.__class__.__name__)
+        # outcomes of recent "receive" evaluations, by data content hash
+        self._evaluationCache = EvaluationCache(
+            ttl=self._settings.getFloat('dedupTtl'))
+        # condition evaluators for "receive" rules, by application
+        self._batchEvaluatorDict = {}
+        # changes of the "receive" rules of each application, by
+        # application
+        self._ruleGenerationDict = {}
+        # worker processes evaluating documents of at least
+        # 'offloadThreshold' bytes
+        self._offloadThreshold = self._settings.getInt('offloadThreshold')
+        self._evaluationPool = self.__getEvaluationPool()
+        # last action per action policy exclusion group
+        self._exclusionGroups = ExclusionGroups()
+        # running and queued actions, by rule (or rule and command line)
+        self._inFlightTracker = InFlightTracker(
+            self.__getDefaultInFlightPolicy())
+        # "receive" actions run on these, so that a slow action neither
+        # holds up processing of further data nor runs twice at once
+        self._actionExecutor = ThreadPoolExecutor(
+            max_workers=self._settings.getInt('actionWorkers'),
+            thread_name_prefix='%s-action' % (self.__class__.__name__))
+        # actions of rules with a batch key, collected before they run
+        self._actionBatcher = ActionBatcher(
+            self._scheduleBatch, self._dispatchAction,
+            defaultWindow=self._settings.getFloat('batchWindow'))
+        # applications posted to by chained "receive" rules
+        self._chainGraph = ChainGraph()
+        # evaluations kept in the history of each rule
+        self._historySize = self._settings.getInt('historySize')
+        self._rulesDir = self._settings.get('rulesDir') or \
+            self._cm.getRulesDir()
+        # data left queued by stop(), queued again by start()
+        self._queueFile = getQueueFileName(self._settings, self._rulesDir)
+        # log of received data, for replay
+        self._capture = self.__getCapture()
         self.__initRules()
 
         # the following are used for "receive" type monitoring
+        self._processingDelay = self._settings.getFloat('processingDelay')
         self._processingTimer = None
         self._processingTimerRunning = False
 
+    def __getCapture(self):
+        path = self._settings.get('captureFile')
+
+        if not path:
+            return None
+
+        try:
+            return CaptureWriter(path)
+        except OSError as ex:
+            self._logger.error(
+                '[%s] Unable to open capture file [%s]: %s' % (
+                    self.__class__.__name__, path, ex))
+
+        return None
+
+    def __getDefaultInFlightPolicy(self):
+        try:
+            return InFlightPolicy(
+                mode=self._settings.get('inFlightPolicy'),
+                maxInFlight=self._settings.get('maxInFlight'),
+                key=self._settings.get('inFlightKey'))
+        except InvalidArgument as ex:
+            self._logger.error(
+                '[%s] Invalid in-flight settings, using defaults: %s' % (
+                    self.__class__.__name__, ex))
+
+        return InFlightPolicy()
+
     def __getRuleDirName(self, applicationName):
         return '%s/%s' % (self._rulesDir, applicationName)
 
@@ -83,6 +211,13 @@ class RuleEngine(RuleEngineInterface):
                                          rule.getName()), 'w') as ruleFile:
             ruleFile.write('%s\n' % (rule.getXmlRep()))
 
+    def __writeCompiledRuleFile(self, compiledRule):
+        rule = compiledRule.toRule()
+
+        rule.encode()
+
+        self.__writeRuleFile(rule)
+
     def __getRuleId(self, applicationName, ruleName):
             # pylint: disable=no-self-use
         return '%s/%s' % (applicationName, ruleName)
@@ -125,6 +260,13 @@ class RuleEngine(RuleEngineInterface):
         for f in fileList:
             try:
                 rule = parser.parse(f)
+
+                if self._applicationFilter is not None and \
+                        not self._applicationFilter(
+                            rule.getApplicationName()):
+                    # Served by another engine
+                    continue
+
                 ruleId = self.__getRuleId(
                     rule.getApplicationName(), rule.getName())
 
@@ -137,115 +279,125 @@ class RuleEngine(RuleEngineInterface):
                     '[%s] Invalid rule file [%s] (Error: %s)' % (
                         self.__class__.__name__, f, ex))
 
-    def __evaluateNumbers(self, metric, operator, triggerValue): \
-            # pylint: disable=exec-used
-        trigger = None
-
-        try:
-            triggerString = '%s %s %s' % (metric, operator, triggerValue)
+    def __parseMonitorData(self, monitorData=''):
+        if not monitorData:
+            return None
 
-            self._logger.debug(
-                '[%s] Evaluating as numbers: %s' % (
-                    self.__class__.__name__, triggerString))
+        self._logger.debug(
+            '[%s] Parsing %d byte(s) of data' % (
+                self.__class__.__name__, len(monitorData)))
 
-            exec('trigger = %s' % triggerString)
+        try:
+            if isinstance(monitorData, SpooledApplicationData):
+                # Parsed from the spool file, not copied into memory
+                return libxml2.parseFile(monitorData.path)
 
-            return trigger
+            return libxml2.parseDoc(monitorData)
         except Exception as ex:
-            self._logger.debug(
-                '[%s] Could not evaluate as numbers: %s' % (
-                    self.__class__.__name__, ex))
+            self._logger.error(
+                '[%s] Could not parse data: %s' % (self.__class__.__name__, ex))
 
         return None
 
-    def __evaluateStrings(self, metric, operator, triggerValue): \
-            # pylint: disable=exec-used
-        trigger = None
+    def __getConditionValue(self, template, xPathReplacementDict): \
+            # pylint: disable=no-self-use
+        """
+        Returns:
+            typed value of an XPath variable if the template is exactly
+            one variable, otherwise the text with variables substituted
+        """
 
-        try:
-            triggerString = '"%s" %s "%s"' % (metric, operator, triggerValue)
+        name = template.getSingleVariable()
 
-            self._logger.debug(
-                '[%s] Evaluating as strings: %s' % (
-                    self.__class__.__name__, triggerString))
+        if name is not None and name in xPathReplacementDict:
+            return xPathReplacementDict[name]
 
-            exec('trigger = %s' % triggerString)
+        return template.render(xPathReplacementDict)
 
-            return trigger
-        except Exception as ex:
-            self._logger.debug(
-                '[%s] Could not evaluate as strings: %s' % (
-                    self.__class__.__name__, ex))
+    def __getTriggerValue(self, condition, xPathReplacementDict):
+        """
+        Returns:
+            trigger value of a condition, None if its expression cannot be
+            evaluated
+        """
 
-        return None
+        if condition.triggerExpression is not None:
+            return condition.triggerExpression.evaluate(xPathReplacementDict)
 
-    def __parseMonitorData(self, monitorData=''):
-        if not monitorData:
-            return None
+        return self.__getConditionValue(
+            condition.triggerTemplate, xPathReplacementDict)
 
-        self._logger.debug(
-            '[%s] Parsing data: %s' % (self.__class__.__name__, monitorData))
+    def __getMetric(self, condition, monitorXmlDoc, xPathReplacementDict):
+        """
+        Returns:
+            metric value of a condition
+        """
 
-        try:
-            return libxml2.parseDoc(monitorData)
-        except Exception as ex:
-            self._logger.error(
-                '[%s] Could not parse data: %s' % (self.__class__.__name__, ex))
+        if condition.metricExpression is not None:
+            return condition.metricExpression.evaluate(xPathReplacementDict)
 
-        return None
+        if condition.metricTemplate.hasVariables():
+            return self.__getConditionValue(
+                condition.metricTemplate, xPathReplacementDict)
 
-    def __evaluateConditions(self, rule, monitorXmlDoc=None,
-                             xPathReplacementDict=None):
-        # Return True if all rule conditions were satisfied.
-        triggerAction = False
+        # No variables, evaluate as xpath.
+        return monitorXmlDoc.xpathEval('%s' % condition.metricXPath)
 
-        try:
-            if monitorXmlDoc is not None:
-                triggerAction = True
-                for condition in rule.getConditionList():
-                    self._logger.debug(
-                        '[%s] Evaluating: [%s]' % (
-                            self.__class__.__name__, condition))
+    def __evaluateCondition(self, condition, monitorXmlDoc,
+                            xPathReplacementDict):
+        """
+        Returns:
+            True if the condition is met
+        """
 
-                    metricXPath = condition.getMetricXPath()
+        self._logger.debug(
+            '[%s] Evaluating: [%s]' % (self.__class__.__name__, condition))
 
-                    metric = self.__replaceXPathVariables(
-                        metricXPath, xPathReplacementDict or {})
+        xPathReplacementDict = xPathReplacementDict or {}
 
-                    if metric == metricXPath:
-                        # No replacement was done, try to evaluate xpath.
-                        metric = monitorXmlDoc.xpathEval('%s' % metricXPath)
+        metric = self.__getMetric(
+            condition, monitorXmlDoc, xPathReplacementDict)
 
-                    self._logger.debug(
-                        '[%s] Got metric: [%s]' % (self.__class__.__name__, metric))
+        self._logger.debug(
+            '[%s] Got metric: [%s]' % (self.__class__.__name__, metric))
 
-                    if metric == "" or metric == "nan":
-                        self._logger.debug(
-                            '[%s] Metric is not defined, will not trigger'
-                            ' action' % (self.__class__.__name__))
+        if isUndefined(metric):
+            self._logger.debug(
+                '[%s] Metric is not defined, will not trigger'
+                ' action' % (self.__class__.__name__))
 
-                        triggerAction = False
+            return False
 
-                        break
+        triggerValue = self.__getTriggerValue(
+            condition, xPathReplacementDict)
+
+        if triggerValue is None:
+            self._logger.debug(
+                '[%s] Trigger value is not defined, will not trigger'
+                ' action' % (self.__class__.__name__))
 
-                    operator = condition.getEvaluationOperator()
+            return False
 
-                    triggerValue = self.__replaceXPathVariables(
-                        condition.getTriggerValue(),
-                        xPathReplacementDict or {})
+        trigger = compareValues(
+            metric, condition.evaluationOperator, triggerValue)
 
-                    trigger = self.__evaluateNumbers(
-                        metric, operator, triggerValue)
+        self._logger.debug(
+            '[%s] Evaluation result: [%s]' % (
+                self.__class__.__name__, trigger))
 
-                    if trigger is None:
-                        trigger = self.__evaluateStrings(
-                            metric, operator, triggerValue)
+        return trigger
 
-                    self._logger.debug(
-                        '[%s] Evaluation result: [%s]' % (
-                            self.__class__.__name__, trigger))
+    def __evaluateConditions(self, rule, monitorXmlDoc=None,
+                             xPathReplacementDict=None):
+        # Return True if all rule conditions were satisfied.
+        triggerAction = False
 
-                    if not trigger:
+        try:
+            if monitorXmlDoc is not None:
+                triggerAction = True
+                for condition in rule.conditions:
+                    if not self.__evaluateCondition(
+                            condition, monitorXmlDoc, xPathReplacementDict):
                         triggerAction = False
                         break
             else:
@@ -265,7 +417,13 @@ class RuleEngine(RuleEngineInterface):
 
         return triggerAction
 
-    def __evaluateXPathVariables(self, xmlDoc, xPathVariableList):
+    def __evaluateXPathVariables(self, xmlDoc, xPathVariableList,
+                                 xPathValueDict=None):
+        """
+        'xPathValueDict', if given, caches XPath results for the document
+        across rules.
+        """
+
         resultDict = {}
 
         if not xmlDoc:
@@ -275,17 +433,21 @@ class RuleEngine(RuleEngineInterface):
             '[%s] xPath variable list: %s' % (
                 self.__class__.__name__, xPathVariableList))
 
-        for v in xPathVariableList:
-            name = v.getName()
-
+        for name, xPath in xPathVariableList:
             value = ''
 
             try:
                 self._logger.debug(
                     '[%s] Evaluating xPath variable %s: %s' % (
-                        self.__class__.__name__, name, v.getXPath()))
+                        self.__class__.__name__, name, xPath))
 
-                value = xmlDoc.xpathEval('%s' % v.getXPath())
+                if xPathValueDict is not None and xPath in xPathValueDict:
+                    value = xPathValueDict[xPath]
+                else:
+                    value = xmlDoc.xpathEval('%s' % xPath)
+
+                    if xPathValueDict is not None:
+                        xPathValueDict[xPath] = value
             except Exception as ex:
                 self._logger.error(
                     '[%s] Could not evaluate xPath variable [%s]: %s' % (
@@ -303,169 +465,1184 @@ class RuleEngine(RuleEngineInterface):
 
         return resultDict
 
-    def __replaceXPathVariables(self, inputString, xPathReplacementDict): \
+    def _evaluateRule(self, rule, monitorXmlDoc):
+        """
+        Evaluate XPath variables and conditions of a rule against parsed
+        monitor data.
+
+            Returns:
+                (invokeAction, actionCmd, actionValues, variableValues),
+                XPath variables substituted in actionCmd if the action is
+                to be invoked; actionValues are the variable values for
+                the action batcher, None unless the rule batches its
+                actions; variableValues those for the rule history, None
+                unless the rule keeps one
+        """
+
+        actionCmd = rule.actionCommand
+
+        actionValues = None
+
+        xPathReplacementDict = self.__evaluateXPathVariables(
+            monitorXmlDoc, rule.xPathVariables)
+
+        invokeAction = self.__evaluateConditions(
+            rule, monitorXmlDoc, xPathReplacementDict)
+
+        if rule.adaptivePoll is not None and monitorXmlDoc is not None:
+            observation, distance = self.__observeMetrics(
+                rule, monitorXmlDoc, xPathReplacementDict)
+
+            rule.adaptivePoll.observe(observation, distance, invokeAction)
+
+        if invokeAction:
+            actionCmd = rule.actionTemplate.render(xPathReplacementDict)
+
+            if rule.batchPolicy is not None:
+                actionValues = getBatchValues(xPathReplacementDict)
+
+        return invokeAction, actionCmd, actionValues, \
+            self.__getVariableValues(rule, xPathReplacementDict)
+
+    def __getVariableValues(self, rule, xPathReplacementDict): \
             # pylint: disable=no-self-use
-        outputString = inputString
+        """
+        Returns:
+            formatted values of the XPath variables of a rule, in order,
+            for its history; None if it keeps none
+        """
+
+        if rule.history is None or not rule.xPathVariables:
+            return None
+
+        return tuple(
+            formatValue(xPathReplacementDict.get(name, ''))
+            for name, _ in rule.xPathVariables)
+
+    def __observeMetrics(self, rule, monitorXmlDoc, xPathReplacementDict):
+        """
+        Returns:
+            (observation, distance): metric values of the rule, and the
+            smallest distance of a metric to its trigger value, for
+            adaptive poll periods
+        """
+
+        observation = [
+            formatValue(xPathReplacementDict.get(name, ''))
+            for name, _ in rule.xPathVariables]
+
+        distance = None
+
+        for condition in rule.conditions:
+            try:
+                metric = self.__getMetric(
+                    condition, monitorXmlDoc, xPathReplacementDict)
+
+                triggerValue = self.__getTriggerValue(
+                    condition, xPathReplacementDict)
+            except Exception:
+                # Already reported by the evaluation
+                continue
+
+            observation.append(formatValue(metric))
+
+            conditionDistance = getTriggerDistance(metric, triggerValue)
+
+            if conditionDistance is not None and \
+                    (distance is None or conditionDistance < distance):
+                distance = conditionDistance
+
+        return tuple(observation), distance
+
+    def _evaluateQueryOutput(self, rule, queryStdOut):
+        """
+        Evaluate rule against the output of its query command.
+
+            Returns:
+                (invokeAction, actionCmd, actionValues, variableValues)
+        """
+
+        monitorXmlDoc = self.__parseMonitorData(queryStdOut)
+
+        try:
+            return self._evaluateRule(rule, monitorXmlDoc)
+        finally:
+            if monitorXmlDoc is not None:
+                monitorXmlDoc.freeDoc()
+
+    def _evaluateQueryResult(self, rule, queryResult):
+        """
+        Evaluate rule against shared query output; the document is parsed
+        once for all rules sharing the output.
+
+            Returns:
+                (invokeAction, actionCmd, actionValues, variableValues)
+        """
+
+        return self._evaluateRule(
+            rule, queryResult.getDocument(self.__parseMonitorData))
+
+    def _getQueryMaxAge(self, rule):
+        """
+        Returns:
+            seconds the rule may reuse output of its query command run for
+            another rule, 0 if it is to run the query itself
+        """
+
+        if rule.queryMaxAge is not None:
+            return rule.queryMaxAge
+
+        maxAge = self._settings.getFloat('queryMaxAge')
+
+        pollPeriod = self._getPollPeriod(rule)
+
+        if pollPeriod:
+            maxAge = min(maxAge, pollPeriod / 2.0)
+
+        return maxAge
+
+    def _getPollPeriod(self, rule):
+        """
+        Returns:
+            current poll period of the rule in seconds, None if it has none
+        """
+
+        if rule.adaptivePoll is not None:
+            return rule.adaptivePoll.period
+
+        if not rule.pollPeriod:
+            return None
+
+        return float(rule.pollPeriod)
+
+    def _getPollKey(self, rule):
+        """
+        Returns:
+            key spreading polls of the rule; rules with the same query
+            command poll together, so they can share its output
+        """
+
+        if rule.getQuery() and self._getQueryMaxAge(rule):
+            return rule.getQuery()
+
+        return rule.ruleId
+
+    def _evaluateApplicationData(self, applicationName, applicationData):
+        """
+        Evaluate all receive rules of an application against posted data.
+
+            Returns:
+                [(rule, ruleId, actionCmd, actionValues)] for rules whose
+                action is to be invoked
+        """
+
+        evaluation = self._beginEvaluation(applicationName, applicationData)
+
+        results = None
+
+        start = time.time()
+
+        pendingRules = evaluation[3]
+
+        if pendingRules:
+            results = self.__evaluatePendingRules(
+                applicationName, pendingRules, applicationData)
+
+        return self._endEvaluation(
+            applicationName, applicationData, evaluation, results, start)
+
+    def _beginEvaluation(self, applicationName, applicationData):
+        """
+        Apply recent outcomes of identical data to the receive rules of an
+        application.
+
+            Returns:
+                (digest, outcomes, triggered, pendingRules); pendingRules
+                are the rules left to evaluate
+        """
+
+        digest = getDataDigest(applicationData)
+
+        cachedOutcomes = self._evaluationCache.lookup(applicationName, digest)
+
+        outcomes = {}
+
+        triggered = []
+
+        # rules not covered by cached outcomes
+        pendingRules = []
+
+        for ruleId in list(self._receiveRuleDict.keys()):
+            rule = self._receiveRuleDict.get(ruleId)
+
+            # Rule might have been cancelled before we use it.
+            if not rule:
+                continue
+
+            # Check if this is appropriate for the data.
+            if rule.applicationName != applicationName:
+                continue
+
+            if cachedOutcomes is not None and ruleId in cachedOutcomes:
+                # Identical data was evaluated recently; reuse the
+                # outcome instead of parsing and evaluating again.
+                invokeAction, actionCmd, actionValues, variableValues = \
+                    cachedOutcomes[ruleId]
+
+                outcomes[ruleId] = cachedOutcomes[ruleId]
+
+                rule.dataDeduplicated()
+
+                self._logger.debug(
+                    '[%s] Reusing evaluation of identical data for'
+                    ' rule [%s]' % (self.__class__.__name__, ruleId))
+
+                if invokeAction:
+                    # Actions triggered by the data fire again, just as
+                    # they would have after a full evaluation.
+                    rule.ruleInvoked()
+
+                allowed = self._applyActionPolicy(rule, invokeAction)
+
+                self._recordEvaluation(
+                    rule, time.time(), getDecision(invokeAction, allowed),
+                    evaluationTime=0.0, variableValues=variableValues,
+                    digest=digest, dataSize=len(applicationData))
+
+                if allowed:
+                    triggered.append((rule, ruleId, actionCmd, actionValues))
+
+                continue
+
+            pendingRules.append(rule)
+
+        return digest, outcomes, triggered, pendingRules
+
+    def _endEvaluation(self, applicationName, applicationData, evaluation,
+                       results, start):
+        """
+        Apply the results of the evaluation of the pending rules of
+        _beginEvaluation(), started at 'start', and keep the outcomes for
+        identical data.
+
+            Returns:
+                [(rule, ruleId, actionCmd, actionValues)] for rules whose
+                action is to be invoked
+        """
+
+        digest, outcomes, triggered, _ = evaluation
+
+        if results is not None:
+            # Rules are evaluated together; each is charged the total
+            evaluationTime = time.time() - start
+
+            for rule, invokeAction, actionCmd, actionValues, \
+                    variableValues in results:
+                outcomes[rule.ruleId] = (
+                    invokeAction, actionCmd, actionValues, variableValues)
+
+                allowed = self._applyActionPolicy(rule, invokeAction)
+
+                self._recordEvaluation(
+                    rule, start, getDecision(invokeAction, allowed),
+                    evaluationTime=evaluationTime,
+                    variableValues=variableValues, digest=digest,
+                    dataSize=len(applicationData))
+
+                if allowed:
+                    triggered.append(
+                        (rule, rule.ruleId, actionCmd, actionValues))
+                else:
+                    self._logger.debug(
+                        '[%s] Will skip action: [%s]' % (
+                            self.__class__.__name__, actionCmd))
+
+        self._evaluationCache.store(applicationName, digest, outcomes)
+
+        return triggered
+
+    def dryRunApplicationData(self, applicationName, applicationData):
+        """
+        Evaluate data against the rules of an application as if it had
+        been received, without running any command or updating rule
+        counters, histories or action policies. Covers "receive" rules and
+        rules with a query, for which the data stands in for the query
+        output. XPath results are shared by all rules, as in a real
+        evaluation.
+
+            Returns:
+                {'applicationName': ..., 'parseTime': seconds,
+                 'rules': [see __dryRunRule()]}, rules sorted by name
+            Throws:
+                InvalidArgument
+        """
+
+        self._lock.acquire()
+
+        try:
+            rules = sorted(
+                (rule for rule in self._ruleDict.values()
+                 if rule.applicationName == applicationName and
+                 (rule.monitorType == 'receive' or rule.getQuery())),
+                key=lambda rule: rule.name)
+        finally:
+            self._lock.release()
+
+        start = time.time()
+
+        monitorXmlDoc = self.__parseMonitorData(applicationData)
+
+        parseTime = time.time() - start
+
+        if monitorXmlDoc is None:
+            raise InvalidArgument('Data is empty or not well-formed XML')
+
+        # XPath results for this document, shared by all rules
+        xPathValueDict = {}
+
+        try:
+            results = [
+                self.__dryRunRule(rule, monitorXmlDoc, xPathValueDict)
+                for rule in rules]
+        finally:
+            monitorXmlDoc.freeDoc()
+
+        return {
+            'applicationName': applicationName,
+            'parseTime': round(parseTime, 6),
+            'rules': results,
+        }
+
+    def __dryRunRule(self, rule, monitorXmlDoc, xPathValueDict):
+        """
+        Evaluate a rule against parsed data. Unlike a real evaluation, all
+        conditions are evaluated, not only those up to the first one not
+        met.
+
+            Returns:
+                {'name', 'type', 'enabled', 'variables': {name: value},
+                 'conditions': [{'metricXPath', 'evaluationOperator',
+                 'triggerValue', 'metric', 'trigger', 'met', 'error'}],
+                 'conditionsMet', 'actionCommand', 'evaluationTime'};
+                actionCommand is the rendered command, None unless the
+                conditions are met
+        """
+
+        start = time.time()
+
+        xPathReplacementDict = self.__evaluateXPathVariables(
+            monitorXmlDoc, rule.xPathVariables, xPathValueDict)
+
+        conditions = []
+
+        for condition in rule.conditions:
+            result = {
+                'metricXPath': condition.metricXPath,
+                'evaluationOperator': condition.evaluationOperator,
+                'triggerValue': condition.triggerValue,
+                'metric': None,
+                'trigger': None,
+                'met': False,
+                'error': None,
+            }
+
+            try:
+                metric = self.__getMetric(
+                    condition, monitorXmlDoc, xPathReplacementDict)
+
+                result['metric'] = formatValue(metric)
+
+                triggerValue = self.__getTriggerValue(
+                    condition, xPathReplacementDict)
+
+                result['trigger'] = formatValue(triggerValue)
+
+                result['met'] = not isUndefined(metric) and \
+                    triggerValue is not None and bool(
+                    compareValues(
+                        metric, condition.evaluationOperator, triggerValue))
+            except Exception as ex:
+                result['error'] = str(ex)
+
+            conditions.append(result)
+
+        conditionsMet = all(result['met'] for result in conditions)
+
+        return {
+            'name': rule.name,
+            'type': rule.monitorType,
+            'enabled': rule.isStatusEnabled(),
+            'variables': dict(
+                (name, formatValue(xPathReplacementDict.get(name, '')))
+                for name, _ in rule.xPathVariables),
+            'conditions': conditions,
+            'conditionsMet': conditionsMet,
+            'actionCommand': rule.actionTemplate.render(xPathReplacementDict)
+            if conditionsMet else None,
+            'evaluationTime': round(time.time() - start, 6),
+        }
+
+    def __getBatchEvaluator(self, applicationName):
+        evaluator = self._batchEvaluatorDict.get(applicationName)
+
+        if evaluator is None:
+            evaluator = BatchConditionEvaluator(
+                rule for rule in list(self._receiveRuleDict.values())
+                if rule.applicationName == applicationName)
+
+            self._batchEvaluatorDict[applicationName] = evaluator
+
+        return evaluator
+
+    def __invalidateEvaluations(self, applicationName):
+        """
+        Drop cached outcomes and condition evaluator of an application
+        after its set of receive rules changed.
+        """
+
+        self._evaluationCache.invalidate(applicationName)
+
+        self._batchEvaluatorDict.pop(applicationName, None)
+
+        self._ruleGenerationDict[applicationName] = \
+            self._ruleGenerationDict.get(applicationName, 0) + 1
+
+    def __getEvaluationPool(self):
+        """
+        Returns:
+            pool of worker processes evaluating large documents; None if
+            offloading is disabled or not possible
+        """
+
+        if self._offloadThreshold <= 0:
+            return None
+
+        if multiprocessing.current_process().daemon:
+            # e.g. a shard of RuleEngineSharded
+            self._logger.warning(
+                '[%s] Evaluating all data in process: daemonic processes'
+                ' cannot start worker processes' % (
+                    self.__class__.__name__))
+
+            return None
+
+        return EvaluationPool(
+            _evaluateInWorker, _DocumentEvaluator,
+            workers=self._settings.getInt('offloadWorkers'))
+
+    def _isOffloaded(self, applicationData):
+        """
+        Returns:
+            True if receive rules are evaluated against the data in a
+            worker process
+        """
+
+        return self._evaluationPool is not None and \
+            len(applicationData) >= self._offloadThreshold
+
+    def __evaluatePendingRules(self, applicationName, rules,
+                               applicationData):
+        """
+        Evaluate receive rules against posted data, in a worker process if
+        the data is large.
+
+            Returns:
+                [(rule, invokeAction, actionCmd, actionValues,
+                  variableValues)]
+        """
+
+        if not self._isOffloaded(applicationData):
+            return self._evaluateReceiveRules(
+                applicationName, rules, applicationData)
+
+        return self._getOffloadResults(
+            applicationName, rules, applicationData,
+            self._runOffloadRequest(self._getOffloadRequest(
+                applicationName, rules, applicationData)))
+
+    def _getOffloadRequest(self, applicationName, rules, applicationData):
+        """
+        Returns:
+            arguments of EvaluationPool.evaluate() evaluating receive rules
+            against posted data
+        """
+
+        generation = self._ruleGenerationDict.get(applicationName, 0)
+
+        # All rules of the application make up its condition evaluator
+        applicationRules = [
+            rule for rule in list(self._receiveRuleDict.values())
+            if rule.applicationName == applicationName]
+
+        self._logger.debug(
+            '[%s] Evaluating %d byte(s) of data for [%s] in worker'
+            ' process' % (
+                self.__class__.__name__, len(applicationData),
+                applicationName))
+
+        return (
+            applicationName, generation, applicationRules,
+            [rule.ruleId for rule in rules], applicationData)
+
+    def _runOffloadRequest(self, request):
+        """
+        Wait for a worker process to evaluate posted data. Touches no
+        engine state, so may run on any thread.
+
+            Returns:
+                results of _evaluateInWorker(); None if the data could not
+                be evaluated in a worker process
+        """
+
+        try:
+            return self._evaluationPool.evaluate(*request)
+        except Exception as ex:
+            self._logger.error(
+                '[%s] Could not evaluate data in worker process, evaluating'
+                ' here: %s' % (self.__class__.__name__, ex))
+
+            return None
+
+    def _getOffloadResults(self, applicationName, rules, applicationData,
+                           workerResults):
+        """
+        Map the results of a worker process to the rules; evaluate the
+        rules here if there are none.
+
+            Returns:
+                [(rule, invokeAction, actionCmd, actionValues,
+                  variableValues)]
+        """
+
+        if workerResults is None:
+            return self._evaluateReceiveRules(
+                applicationName, rules, applicationData)
+
+        ruleDict = dict((rule.ruleId, rule) for rule in rules)
+
+        results = []
+
+        for ruleId, invokeAction, actionCmd, actionValues, variableValues \
+                in workerResults:
+            rule = ruleDict[ruleId]
+
+            rule.ruleInvoked()
+
+            results.append(
+                (rule, invokeAction, actionCmd, actionValues, variableValues))
+
+        return results
+
+    def _evaluateReceiveRules(self, applicationName, rules,
+                              applicationData):
+        """
+        Evaluate receive rules against posted data, conditions of all
+        rules of the application in one batch. XPath variables are only
+        evaluated for rules whose conditions are met.
+
+            Returns:
+                [(rule, invokeAction, actionCmd, actionValues,
+                  variableValues)]
+        """
+
+        monitorXmlDoc = self.__parseMonitorData(applicationData)
+
+        if monitorXmlDoc is None:
+            self._logger.debug(
+                '[%s] No monitor xml doc, will not trigger action' % (
+                    self.__class__.__name__))
+
+        # XPath results for this document, shared by all rules
+        xPathValueDict = {}
+
+        def getMetric(xPath):
+            if xPath not in xPathValueDict:
+                xPathValueDict[xPath] = monitorXmlDoc.xpathEval(
+                    '%s' % xPath)
+
+            return xPathValueDict[xPath]
+
+        def evaluateCondition(rule, condition):
+            try:
+                return self.__evaluateCondition(
+                    condition, monitorXmlDoc, self.__evaluateXPathVariables(
+                        monitorXmlDoc, rule.xPathVariables, xPathValueDict))
+            except Exception as ex:
+                self._logger.error(
+                    '[%s] Could not evaluate data: %s' % (
+                        self.__class__.__name__, ex))
+
+                return False
+
+        try:
+            if monitorXmlDoc is not None:
+                firedRules = set(
+                    id(rule) for rule in
+                    self.__getBatchEvaluator(applicationName).evaluate(
+                        getMetric, evaluateCondition))
+            else:
+                firedRules = set()
+
+            results = []
 
-        #self._logger.debug('Original string: %s' % inputString)
+            for rule in rules:
+                self._logger.debug(
+                    '[%s] Processing data using rule [%s]' % (
+                        self.__class__.__name__, rule.ruleId))
+
+                rule.ruleInvoked()
+
+                actionCmd = rule.actionCommand
+
+                actionValues = None
+
+                variableValues = None
+
+                invokeAction = id(rule) in firedRules
+
+                if invokeAction:
+                    xPathReplacementDict = self.__evaluateXPathVariables(
+                        monitorXmlDoc, rule.xPathVariables, xPathValueDict)
+
+                    actionCmd = rule.actionTemplate.render(
+                        xPathReplacementDict)
+
+                    if rule.batchPolicy is not None:
+                        actionValues = getBatchValues(xPathReplacementDict)
+
+                    variableValues = self.__getVariableValues(
+                        rule, xPathReplacementDict)
+
+                results.append((
+                    rule, invokeAction, actionCmd, actionValues,
+                    variableValues))
+
+            return results
+        finally:
+            if monitorXmlDoc is not None:
+                monitorXmlDoc.freeDoc()
+
+    def _applyActionPolicy(self, rule, invokeAction):
+        """
+        Account for an evaluation of the rule in its action policy.
+
+            Returns:
+                True if the action is to be invoked
+        """
+
+        policy = rule.actionPolicy
+
+        if policy is None:
+            return invokeAction
+
+        allowed, reason = policy.check(
+            invokeAction, time.time(),
+            rule.getLastSuccessfulActionInvocationTime(), rule.ruleId,
+            self._exclusionGroups)
+
+        if invokeAction and not allowed:
+            rule.actionSuppressed()
+
+            self._logger.debug(
+                '[%s] Action of rule [%s] suppressed by policy: %s' % (
+                    self.__class__.__name__, rule.ruleId, reason))
+
+        return allowed
+
+    def _getCommandLine(self, cmd):
+        return 'source %s/tortuga.sh && ' % (self._cm.getEtcDir()) + cmd
+
+    def __runQuery(self, rule, queryCmd):
+        self._logger.debug(
+            '[%s] About to invoke: [%s]' % (
+                self.__class__.__name__, queryCmd))
+
+        try:
+            stdout = self.__runQueryCommand(rule, queryCmd)
+
+            rule.queryInvocationSucceeded()
+
+            return stdout
+        except Exception:
+            rule.queryInvocationFailed()
+            raise
+
+    def _executeCommand(self, cmd):
+        """
+        Run a query or action command in a shell with the Tortuga
+        environment.
+
+            Returns:
+                stdout
+            Throws:
+                TortugaException
+        """
+
+        p = tortugaSubprocess.executeCommand(self._getCommandLine(cmd))
+
+        return p.getStdOut()
+
+    def __runQueryCommand(self, rule, queryCmd):
+        if rule.queryProvider is not None:
+            return self._queryProviders.query(rule.queryProvider)
+
+        return self._executeCommand(queryCmd)
+
+    def __getQueryResult(self, rule, queryCmd, maxAge):
+        """
+        Returns:
+            QueryResult of the query command no older than 'maxAge'
+            seconds, from the query cache or a run shared with other rules
+            polling at the same time; to be released by the caller
+        """
+
+        queryResult = self._queryCache.acquire(queryCmd, maxAge)
+
+        if queryResult is not None:
+            rule.queryCached()
 
-        for key in xPathReplacementDict:
-            #self._logger.debug('Replacing: %s' % key)
+            self._logger.debug(
+                '[%s] Reusing output of [%s] from %.1f second(s) ago' % (
+                    self.__class__.__name__, queryCmd,
+                    time.time() - queryResult.time))
+
+            return queryResult
+
+        self._logger.debug(
+            '[%s] About to invoke: [%s]' % (
+                self.__class__.__name__, queryCmd))
+
+        try:
+            queryResult, shared = self._queryFlight.do(
+                queryCmd, lambda: self._queryCache.store(
+                    queryCmd, self.__runQueryCommand(rule, queryCmd),
+                    maxAge))
+        except Exception:
+            rule.queryInvocationFailed()
+            raise
+
+        if shared:
+            self._queryCache.retain(queryResult)
+
+            rule.queryCached()
+        else:
+            rule.queryInvocationSucceeded()
+
+        return queryResult
 
-            outputString = outputString.replace(
-                key, '%s' % xPathReplacementDict[key])
+    def __runAction(self, rule, actionCmd):
+        self._logger.debug(
+            '[%s] About to invoke: [%s]' % (
+                self.__class__.__name__, actionCmd))
+
+        start = time.time()
+
+        try:
+            stdout = self._executeCommand(actionCmd)
 
-        #self._logger.debug('New string: %s' % outputString)
+            rule.actionInvocationSucceeded()
+
+            self._recordAction(
+                rule, start, True, 0, len(stdout) if stdout else 0)
+
+            self._logger.debug(
+                '[%s] Done with command: [%s]' % (
+                    self.__class__.__name__, actionCmd))
 
-        return outputString
+            return stdout
+        except Exception:
+            rule.actionInvocationFailed()
+
+            # The exit status is not reported by tortugaSubprocess
+            self._recordAction(rule, start, False)
+
+            raise
+
+    def _checkMaxActionInvocations(self, rule, ruleId):
+        """
+        Disable rule once it reached its maximum number of successful
+        action invocations.
+
+            Returns:
+                True if the rule is disabled, False otherwise
+        """
+
+        if not rule.isStatusEnabled():
+            # Disabled meanwhile, e.g. by a concurrent action of the rule
+            return True
+
+        maxActionInvocations = rule.maxActionInvocations
+
+        if maxActionInvocations and \
+                maxActionInvocations <= \
+                rule.getSuccessfulActionInvocations():
+            # Rule must be disabled.
+            self._logger.debug(
+                '[%s] Max. number of successful invocations (%s)'
+                ' reached for rule [%s]' % (
+                    self.__class__.__name__, maxActionInvocations, ruleId))
+
+            try:
+                self.disableRule(rule.applicationName, rule.name)
+            except RuleAlreadyDisabled:
+                pass
+
+            return True
+
+        return False
+
+    def _getNextPollPeriod(self, rule, ruleId):
+        """
+        Returns:
+            seconds until the next poll of the rule, None if the rule is
+            not to be polled again
+        """
+
+        if not self.hasRule(ruleId):
+            # Rule is already deleted.
+            return None
+
+        # Check if we need to stop invoking this rule.
+        if self._checkMaxActionInvocations(rule, ruleId):
+            return None
+
+        pollPeriod = self._getPollPeriod(rule) or self._minTriggerInterval
+
+        nextPollPeriod = None
+
+        # Make sure we do not fire too often.
+        lastSuccessfulActionTime = \
+            rule.getLastSuccessfulActionInvocationTime()
+
+        if lastSuccessfulActionTime:
+            now = time.time()
+
+            possibleNewSuccessfulActionTime = \
+                now + pollPeriod - lastSuccessfulActionTime
+
+            if possibleNewSuccessfulActionTime < self._minTriggerInterval:
+                nextPollPeriod = self._minTriggerInterval
+
+                self._logger.debug(
+                    '[%s] Increasing poll period to [%s] for'
+                    ' rule [%s]' % (
+                        self.__class__.__name__, nextPollPeriod, ruleId))
+
+        if nextPollPeriod is None and rule.adaptivePoll is not None:
+            # Changes every poll, so not aligned to phase slots
+            nextPollPeriod = pollPeriod
+
+            self._logger.debug(
+                '[%s] Adaptive poll period of rule [%s] is [%s]' % (
+                    self.__class__.__name__, ruleId, pollPeriod))
+        elif nextPollPeriod is None:
+            nextPollPeriod = self._pollSchedule.getNextDelay(
+                self._getPollKey(rule), pollPeriod)
+
+        return nextPollPeriod
 
     def __poll(self, rule):
-        ruleId = self.__getRuleId(rule.getApplicationName(), rule.getName())
+        ruleId = rule.ruleId
 
         self._logger.debug('[%s] Begin poll timer for [%s]' % (
             self.__class__.__name__, ruleId))
 
-        if not self.hasRule(ruleId):
+        if not self.hasRule(ruleId) or not self._pollStarted():
             self._logger.debug(
                 '[%s] Timer execution cancelled for [%s]' % (
                     self.__class__.__name__, ruleId))
 
             return
 
-        rule.ruleInvoked()
-
         self._logger.debug(
             '[%s] Timer execution started for [%s]' % (
                 self.__class__.__name__, ruleId))
 
-        appMonitor = rule.getApplicationMonitor()
+        try:
+            self.__invoke(rule)
+        finally:
+            self._pollFinished()
+
+        pollPeriod = self._getNextPollPeriod(rule, ruleId)
+
+        if pollPeriod is not None:
+            self._logger.debug(
+                '[%s] Scheduling new timer for rule [%s] in'
+                ' [%s] seconds' % (self.__class__.__name__, ruleId, pollPeriod))
+
+            self._schedulePoll(rule, pollPeriod)
+        else:
+            self._logger.debug(
+                '[%s] Will not schedule new timer for rule [%s]' % (
+                    self.__class__.__name__, rule))
+
+    def __invoke(self, rule):
+        """
+        Run query command (if any), evaluate conditions and run action
+        command of a poll or event rule.
+        """
+
+        rule.ruleInvoked()
 
-        queryCmd = appMonitor.getQueryCommand()
+        queryCmd = rule.getQuery()
 
         self._logger.debug(
             '[%s] Query command: %s' % (self.__class__.__name__, queryCmd))
 
-        actionCmd = appMonitor.getActionCommand()
+        actionCmd = rule.actionCommand
 
         self._logger.debug(
             '[%s] Action command: %s' % (self.__class__.__name__, actionCmd))
 
-        xPathReplacementDict = {}
+        start = time.time()
+
+        queryTime = evaluationTime = variableValues = dataSize = None
+
+        decision = FAILED
 
         try:
             invokeAction = True
-            queryStdOut = None
 
-            if queryCmd:
-                self._logger.debug(
-                    '[%s] About to invoke: [%s]' % (
-                        self.__class__.__name__, queryCmd))
+            actionValues = {}
+
+            maxAge = self._getQueryMaxAge(rule)
+
+            if queryCmd and maxAge:
+                queryResult = self.__getQueryResult(rule, queryCmd, maxAge)
+
+                queryTime = time.time() - start
+
+                dataSize = len(queryResult.stdout or '')
+
+                try:
+                    self._chainOutput(rule, OUTPUT_QUERY, queryResult.stdout)
+
+                    invokeAction, actionCmd, actionValues, variableValues = \
+                        self._evaluateQueryResult(rule, queryResult)
+                finally:
+                    self._queryCache.release(queryResult)
+
+                evaluationTime = time.time() - start - queryTime
+            elif queryCmd:
+                queryStdOut = self.__runQuery(rule, queryCmd)
+
+                queryTime = time.time() - start
+
+                dataSize = len(queryStdOut or '')
+
+                self._chainOutput(rule, OUTPUT_QUERY, queryStdOut)
+
+                invokeAction, actionCmd, actionValues, variableValues = \
+                    self._evaluateQueryOutput(rule, queryStdOut)
+
+                evaluationTime = time.time() - start - queryTime
+
+            allowed = self._applyActionPolicy(rule, invokeAction)
+
+            decision = getDecision(invokeAction, allowed)
+
+            self._recordEvaluation(
+                rule, start, decision, queryTime, evaluationTime,
+                variableValues, dataSize=dataSize)
+
+            invokeAction = allowed
+
+            if invokeAction:
+                if rule.batchPolicy is not None:
+                    self._actionBatcher.add(rule, actionValues)
+                elif self._inFlightTracker.acquire(rule, actionCmd):
+                    self.__runTrackedAction(rule, actionCmd)
+                else:
+                    self._logger.debug(
+                        '[%s] Action of rule [%s] already running' % (
+                            self.__class__.__name__, rule.ruleId))
+            else:
+                self._logger.debug(
+                    '[%s] Will skip action: [%s]' % (
+                        self.__class__.__name__, actionCmd))
+        except TortugaException as ex:
+            if decision == FAILED:
+                self._recordEvaluation(
+                    rule, start, FAILED, queryTime, evaluationTime,
+                    dataSize=dataSize)
+
+            self._logger.error('[%s] %s' % (self.__class__.__name__, ex))
+
+    def _recordEvaluation(self, rule, start, decision, queryTime=None,
+                          evaluationTime=None, variableValues=None,
+                          digest=None, dataSize=None): \
+            # pylint: disable=no-self-use
+        """
+        Add an evaluation started at 'start' to the history of the rule.
+        """
+
+        if rule.history is not None:
+            rule.history.record(
+                start, decision, queryTime, evaluationTime, variableValues,
+                digest, dataSize)
+
+    def _recordAction(self, rule, start, succeeded, exitStatus=None,
+                      outputSize=None): \
+            # pylint: disable=no-self-use
+        """
+        Add an action started at 'start' to the history of the rule.
+        """
+
+        if rule.history is not None:
+            rule.history.actionFinished(
+                time.time() - start, succeeded, exitStatus, outputSize)
+
+    def __runTrackedAction(self, rule, actionCmd):
+        """
+        Run an action admitted by the in-flight tracker, then any action
+        of the rule queued meanwhile.
+        """
+
+        while True:
+            try:
+                # Rule may have been disabled while the action was queued
+                if rule.isStatusEnabled():
+                    actionStdOut = self.__runAction(rule, actionCmd)
+
+                    self._checkMaxActionInvocations(rule, rule.ruleId)
+
+                    self._chainOutput(rule, OUTPUT_ACTION, actionStdOut)
+            except TortugaException as ex:
+                # Failure already accounted for
+                self._logger.error('[%s] %s' % (self.__class__.__name__, ex))
+            except Exception:
+                self._logger.exception(
+                    '[%s] Error running action of rule [%s]' % (
+                        self.__class__.__name__, rule.ruleId))
+            finally:
+                queued = self._inFlightTracker.release(rule, actionCmd)
+
+            if queued is None:
+                break
+
+            rule, actionCmd = queued
+
+    def _chainOutput(self, rule, output, stdout):
+        """
+        Post the query or action output of a chained rule to the "receive"
+        rules of its target application, in process.
+        """
+
+        chainPolicy = rule.chainPolicy
+
+        if chainPolicy is None or chainPolicy.output != output:
+            return
+
+        if not stdout or not stdout.strip():
+            self._logger.debug(
+                '[%s] No %s output of rule [%s] to chain' % (
+                    self.__class__.__name__, output, rule.ruleId))
+
+            return
+
+        self._logger.debug(
+            '[%s] Chaining %s output of rule [%s] to [%s]' % (
+                self.__class__.__name__, output, rule.ruleId,
+                chainPolicy.applicationName))
+
+        try:
+            self._queueApplicationData(chainPolicy.applicationName, stdout)
+        except TortugaException as ex:
+            self._logger.error('[%s] %s' % (self.__class__.__name__, ex))
+
+            return
+
+        rule.outputChained()
+
+    def _dispatchAction(self, rule, actionCmd):
+        """
+        Run action of a "receive" rule, or a batched action, on an action
+        worker thread, subject to the rule's in-flight policy.
+        """
+
+        if not self._inFlightTracker.acquire(rule, actionCmd):
+            self._logger.debug(
+                '[%s] Action of rule [%s] already running' % (
+                    self.__class__.__name__, rule.ruleId))
 
-                try:
-                    p = tortugaSubprocess.executeCommand(
-                        'source %s/tortuga.sh && ' % (
-                            self._cm.getEtcDir()) + queryCmd)
+            return
 
-                    queryStdOut = p.getStdOut()
+        self._actionExecutor.submit(self.__runTrackedAction, rule, actionCmd)
 
-                    appMonitor.queryInvocationSucceeded()
-                except Exception as ex:
-                    appMonitor.queryInvocationFailed()
-                    raise
+    def _scheduleBatch(self, delay, callback, *args):
+        """
+        Run 'callback' of the action batcher after 'delay' seconds, or
+        right away while stopping.
+        """
 
-                monitorXmlDoc = self.__parseMonitorData(queryStdOut)
+        t = threading.Timer(
+            0 if self._stopping else delay, callback, args=args)
 
-                xPathReplacementDict = self.__evaluateXPathVariables(
-                    monitorXmlDoc, rule.getXPathVariableList())
+        t.daemon = True
 
-                invokeAction = self.__evaluateConditions(
-                    rule, monitorXmlDoc, xPathReplacementDict)
+        t.start()
 
-            if invokeAction:
-                try:
-                    actionCmd = self.__replaceXPathVariables(
-                        actionCmd, xPathReplacementDict)
+    def _schedulePoll(self, rule, delay):
+        """
+        Run poll of rule after 'delay' seconds.
+        """
 
-                    self._logger.debug(
-                        '[%s] About to invoke: [%s]' % (
-                            self.__class__.__name__, actionCmd))
+        if self._stopping:
+            return
 
-                    p = tortugaSubprocess.executeCommand(
-                        'source %s/tortuga.sh && ' % (
-                            self._cm.getEtcDir()) + actionCmd)
+        ruleId = rule.ruleId
 
-                    appMonitor.actionInvocationSucceeded()
+        t = threading.Timer(delay, self.__poll, args=[rule])
 
-                    self._logger.debug(
-                        '[%s] Done with command: [%s]' % (
-                            self.__class__.__name__, actionCmd))
-                except Exception as ex:
-                    appMonitor.actionInvocationFailed()
-                    raise
-            else:
-                self._logger.debug(
-                    '[%s] Will skip action: [%s]' % (
-                        self.__class__.__name__, actionCmd))
-        except TortugaException as ex:
-            self._logger.error('[%s] %s' % (self.__class__.__name__, ex))
+        t.daemon = True
 
-        scheduleTimer = True
+        self.__runPollTimer(ruleId, t)
 
-        if self.hasRule(ruleId):
-            # Check if we need to stop invoking this rule.
-            maxActionInvocations = appMonitor.getMaxActionInvocations()
+    def _cancelPoll(self, ruleId):
+        self.__cancelPollTimer(ruleId)
 
-            successfulActionInvocations = \
-                appMonitor.getSuccessfulActionInvocations()
+    def _pollNow(self, rule):
+        self.__poll(rule)
 
-            if maxActionInvocations:
-                if int(maxActionInvocations) <= successfulActionInvocations:
-                    # Rule must be disabled.
-                    self._logger.debug(
-                        '[%s] Max. number of successful invocations (%s)'
-                        ' reached for rule [%s]' % (
-                            self.__class__.__name__, maxActionInvocations, ruleId))
+    def _pollStarted(self):
+        """
+        Count a poll as running, unless the engine is stopping.
 
-                    scheduleTimer = False
-                    self.disableRule(rule.getApplicationName(), rule.getName())
-        else:
-            # Rule is already deleted.
-            scheduleTimer = False
+            Returns:
+                False if the poll is not to run
+        """
 
-        if scheduleTimer:
-            pollPeriod = float(appMonitor.getPollPeriod())
+        with self._processingLock:
+            if self._stopping:
+                return False
 
-            # Make sure we do not fire too often.
-            lastSuccessfulActionTime = \
-                appMonitor.getLastSuccessfulActionInvocationTime()
+            self._pollingCount += 1
 
-            if lastSuccessfulActionTime:
-                now = time.time()
+        return True
 
-                possibleNewSuccessfulActionTime = \
-                    now + pollPeriod - lastSuccessfulActionTime
+    def _pollFinished(self):
+        with self._processingLock:
+            self._pollingCount -= 1
 
-                if possibleNewSuccessfulActionTime < self._minTriggerInterval:
-                    pollPeriod = self._minTriggerInterval
+    def _cancelPolls(self):
+        """
+        Cancel the poll timers of all rules.
+        """
 
-                    self._logger.debug(
-                        '[%s] Increasing poll period to [%s] for'
-                        ' rule [%s]' % (
-                            self.__class__.__name__, pollPeriod, ruleId))
+        with self._lock:
+            for ruleId in list(self._pollTimerDict):
+                self.__cancelPollTimer(ruleId)
 
-            self._logger.debug(
-                '[%s] Scheduling new timer for rule [%s] in'
-                ' [%s] seconds' % (self.__class__.__name__, ruleId, pollPeriod))
+    def _flushBatches(self):
+        self._actionBatcher.flushAll()
 
-            t = threading.Timer(pollPeriod, self.__poll, args=[rule])
+    def _queueApplicationData(self, applicationName, applicationData):
+        self._receiveQ.put((applicationName, applicationData))
 
-            t.daemon = True
+        self.__runProcessingTimer()
 
-            self.__runPollTimer(ruleId, t)
-        else:
-            self._logger.debug(
-                '[%s] Will not schedule new timer for rule [%s]' % (
-                    self.__class__.__name__, rule))
+    def _executeEventRule(self, rule):
+        self.__execute(rule)
 
     def __runPollTimer(self, ruleId, pollTimer):
         self._pollTimerDict[ruleId] = pollTimer
@@ -496,101 +1673,32 @@ class RuleEngine(RuleEngineInterface):
             '[%s] Begin processing timer' % (self.__class__.__name__))
 
         while True:
-            qSize = self._receiveQ.qsize()
-
             self._logger.debug(
                 '[%s] Current receive Q size: %s' % (
-                    self.__class__.__name__, qSize))
+                    self.__class__.__name__, self._receiveQ.qsize()))
 
-            if qSize == 0:
+            try:
+                # stop() may take the remaining data meanwhile
+                applicationName, applicationData = \
+                    self._receiveQ.get_nowait()
+            except queue.Empty:
                 break
 
-            applicationName, applicationData = self._receiveQ.get()
-
             self._logger.debug(
                 '[%s] Processing data for [%s]' % (
                     self.__class__.__name__, applicationName))
 
-            monitorXmlDoc = self.__parseMonitorData(applicationData)
-
-            for ruleId in self._receiveRuleDict.keys():
-                rule = self._receiveRuleDict.get(ruleId)
-
-                # Rule might have been cancelled before we use it.
-                if not rule:
-                    continue
-
-                # Check if this is appropriate for the data.
-                if rule.getApplicationName() != applicationName:
-                    continue
-
-                self._logger.debug(
-                    '[%s] Processing data using rule [%s]' % (
-                        self.__class__.__name__, ruleId))
-
-                rule.ruleInvoked()
-
-                appMonitor = rule.getApplicationMonitor()
-
-                actionCmd = appMonitor.getActionCommand()
-
-                self._logger.debug('[%s] Action command: [%s]' % (
-                    self.__class__.__name__, actionCmd))
+            try:
+                triggered = self._evaluateApplicationData(
+                    applicationName, applicationData)
+            finally:
+                releaseApplicationData(applicationData)
 
-                try:
-                    xPathReplacementDict = self.__evaluateXPathVariables(
-                        monitorXmlDoc, rule.getXPathVariableList())
-
-                    invokeAction = self.__evaluateConditions(
-                        rule, monitorXmlDoc, xPathReplacementDict)
-
-                    if invokeAction:
-                        try:
-                            actionCmd = self.__replaceXPathVariables(
-                                actionCmd, xPathReplacementDict)
-
-                            self._logger.debug(
-                                '[%s] About to invoke: [%s]' % (
-                                    self.__class__.__name__, actionCmd))
-
-                            tortugaSubprocess.executeCommand(
-                                'source %s/tortuga.sh && ' % (
-                                    self._cm.getEtcDir()) + actionCmd)
-
-                            appMonitor.actionInvocationSucceeded()
-
-                            self._logger.debug(
-                                '[%s] Done with command: [%s]' % (
-                                    self.__class__.__name__, actionCmd))
-
-                            maxActionInvocations = \
-                                appMonitor.getMaxActionInvocations()
-
-                            successfulActionInvocations = \
-                                appMonitor.getSuccessfulActionInvocations()
-
-                            if maxActionInvocations:
-                                if int(maxActionInvocations) <= \
-                                        successfulActionInvocations:
-                                    # Rule must be disabled.
-                                    self._logger.debug(
-                                        '[%s] Max. number of successful'
-                                        ' invocations (%s) reached for'
-                                        ' rule [%s]' % (
-                                            self.__class__.__name__,
-                                            maxActionInvocations, ruleId))
-
-                                    self.disableRule(
-                                        rule.getApplicationName(),
-                                        rule.getName())
-                        except Exception as ex:
-                            appMonitor.actionInvocationFailed()
-                    else:
-                        self._logger.debug(
-                            '[%s] Will skip action: [%s]' % (
-                                self.__class__.__name__, actionCmd))
-                except TortugaException as ex:
-                    self._logger.error('[%s] %s' % (self.__class__.__name__, ex))
+            for rule, _, actionCmd, actionValues in triggered:
+                if rule.batchPolicy is not None:
+                    self._actionBatcher.add(rule, actionValues)
+                else:
+                    self._dispatchAction(rule, actionCmd)
 
             self._logger.debug(
                 '[%s] No more rules appropriate for [%s]' % (
@@ -601,6 +1709,12 @@ class RuleEngine(RuleEngineInterface):
 
         self.__cancelProcessingTimer()
 
+    def __delayProcessing(self):
+        # stop() cuts the delay short
+        self._drainEvent.wait(self._processingDelay)
+
+        self.__process()
+
     def __runProcessingTimer(self):
         self._processingLock.acquire()
 
@@ -609,7 +1723,9 @@ class RuleEngine(RuleEngineInterface):
                 self._logger.debug(
                     '[%s] Starting processing timer' % (self.__class__.__name__))
 
-                self._processingTimer = threading.Timer(5, self.__process)
+                self._processingTimer = threading.Thread(
+                    target=self.__delayProcessing,
+                    name='%s-processing' % (self.__class__.__name__))
                 self._processingTimer.daemon = True
                 self._processingTimer.start()
                 self._processingTimerRunning = True
@@ -628,6 +1744,11 @@ class RuleEngine(RuleEngineInterface):
 
             self._logger.debug(
                 '[%s] Processing timer stopped' % (self.__class__.__name__))
+
+            # Data queued after the timer found the queue empty, but
+            # before it stopped, would otherwise wait for the next post
+            if not self._receiveQ.empty():
+                self.__runProcessingTimer()
         finally:
             self._processingLock.release()
 
@@ -650,12 +1771,36 @@ class RuleEngine(RuleEngineInterface):
 
         self.__checkRuleDoesNotExist(ruleId)
 
+        # Reject invalid action policies before the rule is stored
+        ActionPolicy.fromApplicationMonitor(rule.getApplicationMonitor())
+        InFlightPolicy.fromApplicationMonitor(rule.getApplicationMonitor())
+        BatchPolicy.fromApplicationMonitor(rule.getApplicationMonitor())
+        getQueryMaxAge(rule.getApplicationMonitor())
+        AdaptivePollPeriod.fromApplicationMonitor(rule.getApplicationMonitor())
+        self.__checkQueryProvider(rule)
+        self.__checkChainPolicy(ruleId, rule)
+        self.__checkConditions(rule)
+
         # Write rule file.
         self.__writeRuleFile(rule)
 
         rule.decode()
 
+        # The engine works on the compact form from here on
+        rule = CompiledRule(rule)
+
+        if self._historySize > 0:
+            rule.history = RuleHistory(
+                self._historySize,
+                [name for name, _ in rule.xPathVariables])
+
         self._ruleDict[ruleId] = rule
+
+        if rule.chainPolicy is not None and rule.monitorType == 'receive':
+            self._chainGraph.add(
+                ruleId, rule.applicationName,
+                rule.chainPolicy.applicationName)
+
         if rule.isStatusEnabled():
             self.__enableRule(rule)
         else:
@@ -664,15 +1809,112 @@ class RuleEngine(RuleEngineInterface):
 
         return ruleId
 
+    def __checkQueryProvider(self, rule):
+        """
+        Set up the query provider of a rule, if any.
+
+            Throws:
+                InvalidArgument
+        """
+
+        appMonitor = rule.getApplicationMonitor()
+
+        queryProvider = appMonitor.getQueryProvider()
+
+        if not queryProvider:
+            return
+
+        if appMonitor.getQueryCommand():
+            raise InvalidArgument(
+                '[queryCommand] and [queryProvider] are mutually exclusive')
+
+        self._queryProviders.get(queryProvider)
+
+    def __checkConditions(self, rule): \
+            # pylint: disable=no-self-use
+        """
+        Reject conditions combining XPath variables other than by
+        arithmetic.
+
+            Throws:
+                InvalidArgument
+        """
+
+        variableNames = [
+            variable.getName() for variable in rule.getXPathVariableList()]
+
+        for condition in rule.getConditionList():
+            try:
+                CompiledCondition(condition, variableNames)
+            except ValueError as ex:
+                raise InvalidArgument(
+                    'Invalid condition [%s %s %s]: %s' % (
+                        condition.getMetricXPath(),
+                        condition.getEvaluationOperator(),
+                        condition.getTriggerValue(), ex))
+
+    def __checkChainPolicy(self, ruleId, rule):
+        """
+        Reject rules posting their output to an application this engine
+        does not serve, or feeding data back into their own application.
+
+            Throws:
+                InvalidArgument
+        """
+
+        chainPolicy = ChainPolicy.fromApplicationMonitor(
+            rule.getApplicationMonitor())
+
+        if chainPolicy is None:
+            return
+
+        targetApplicationName = chainPolicy.applicationName
+
+        if self._applicationFilter is not None and \
+                not self._applicationFilter(targetApplicationName):
+            raise InvalidArgument(
+                'Rule [%s] chains to application [%s] served by another'
+                ' engine' % (ruleId, targetApplicationName))
+
+        if rule.getApplicationMonitor().getType() != 'receive':
+            return
+
+        cycle = self._chainGraph.findCycle(
+            rule.getApplicationName(), targetApplicationName)
+
+        if cycle is not None:
+            raise InvalidArgument(
+                'Rule [%s] would chain applications in a loop: %s' % (
+                    ruleId, ' -> '.join(cycle)))
+
+    def __scheduleFirstPoll(self, rule):
+        """
+        Schedule the first poll of a poll rule in its slot of the poll
+        schedule (see PollSchedule), as when the rule is loaded.
+        """
+
+        pollPeriod = self._getPollPeriod(rule)
+
+        if not pollPeriod:
+            pollPeriod = self._minTriggerInterval
+
+        delay = self._pollSchedule.getInitialDelay(
+            self._getPollKey(rule), float(pollPeriod))
+
+        self._logger.debug(
+            '[%s] Preparing poll timer with period %s second(s),'
+            ' first poll in %.1f second(s)' % (
+                self.__class__.__name__, pollPeriod, delay))
+
+        self._schedulePoll(rule, delay)
+
     def __enableRule(self, rule):
-        ruleId = self.__getRuleId(rule.getApplicationName(), rule.getName())
+        ruleId = rule.ruleId
 
         self._logger.debug(
             '[%s] Enabling rule: [%s]' % (self.__class__.__name__, ruleId))
 
-        appMonitor = rule.getApplicationMonitor()
-
-        monitorType = appMonitor.getType()
+        monitorType = rule.monitorType
 
         rule.setStatusEnabled()
 
@@ -680,23 +1922,14 @@ class RuleEngine(RuleEngineInterface):
             self._logger.debug(
                 '[%s] [%s] is poll rule' % (self.__class__.__name__, ruleId))
 
-            pollPeriod = appMonitor.getPollPeriod()
-
-            if not pollPeriod:
-                pollPeriod = self._minTriggerInterval
-
-            self._logger.debug(
-                '[%s] Preparing poll timer with period %s second(s)' % (
-                    self.__class__.__name__, pollPeriod))
-
-            t = threading.Timer(float(pollPeriod), self.__poll, args=[rule])
-            t.daemon = True
-            self.__runPollTimer(ruleId, t)
+            self.__scheduleFirstPoll(rule)
         elif monitorType == 'receive':
             self._logger.debug(
                 '[%s] [%s] is receive rule' % (self.__class__.__name__, ruleId))
 
             self._receiveRuleDict[ruleId] = rule
+
+            self.__invalidateEvaluations(rule.applicationName)
         else:
             # assume this is 'event' rule
             self._logger.debug(
@@ -728,11 +1961,7 @@ class RuleEngine(RuleEngineInterface):
 
             self.__enableRule(rule)
 
-            rule.encode()
-
-            self.__writeRuleFile(rule)
-
-            rule.decode()
+            self.__writeCompiledRuleFile(rule)
         finally:
             self._lock.release()
 
@@ -760,6 +1989,8 @@ class RuleEngine(RuleEngineInterface):
 
         del self._ruleDict[ruleId]
 
+        self._chainGraph.remove(ruleId)
+
         osUtility.removeFile(
             self.__getRuleFileName(applicationName, ruleName))
 
@@ -785,30 +2016,26 @@ class RuleEngine(RuleEngineInterface):
 
             self.__disableRule(rule)
 
-            rule.encode()
-
-            self.__writeRuleFile(rule)
-
-            rule.decode()
+            self.__writeCompiledRuleFile(rule)
         finally:
             self._lock.release()
 
     def __disableRule(self, rule, status='disabled by administrator'):
-        ruleId = self.__getRuleId(rule.getApplicationName(), rule.getName())
+        ruleId = rule.ruleId
 
         self._logger.debug(
             '[%s] Disabling rule [%s]' % (self.__class__.__name__, ruleId))
 
-        appMonitor = rule.getApplicationMonitor()
-
-        monitorType = appMonitor.getType()
+        monitorType = rule.monitorType
 
-        rule.setStatus(status)
+        rule.status = status
 
         if monitorType == 'poll':
-            self.__cancelPollTimer(ruleId)
+            self._cancelPoll(ruleId)
         elif monitorType == 'receive':
             del self._receiveRuleDict[ruleId]
+
+            self.__invalidateEvaluations(rule.applicationName)
         else:
             del self._eventRuleDict[ruleId]
 
@@ -827,7 +2054,33 @@ class RuleEngine(RuleEngineInterface):
 
         self.__checkRuleExists(ruleId)
 
-        return copy.deepcopy(self._ruleDict[ruleId])
+        return self._ruleDict[ruleId].toRule()
+
+    def getRuleHistory(self, applicationName, ruleName):
+        """
+        Recent evaluations of a rule, see RuleHistory.getEntries().
+
+            Returns:
+                [{field: value}], oldest first
+            Throws:
+                RuleNotFound
+        """
+
+        self._lock.acquire()
+
+        try:
+            ruleId = self.__getRuleId(applicationName, ruleName)
+
+            self.__checkRuleExists(ruleId)
+
+            rule = self._ruleDict[ruleId]
+        finally:
+            self._lock.release()
+
+        if rule.history is None:
+            return []
+
+        return rule.history.getEntries()
 
     def getRuleList(self):
         self._lock.acquire()
@@ -840,7 +2093,7 @@ class RuleEngine(RuleEngineInterface):
         ruleList = TortugaObjectList()
 
         for ruleId in self._ruleDict.keys():
-            ruleList.append(copy.deepcopy(self._ruleDict[ruleId]))
+            ruleList.append(self._ruleDict[ruleId].toRule())
 
         return ruleList
 
@@ -857,9 +2110,34 @@ class RuleEngine(RuleEngineInterface):
             '[%s] Received data for [%s]' % (
                 self.__class__.__name__, applicationName))
 
-        self._receiveQ.put((applicationName, applicationData))
+        self.__checkNotStopping()
 
-        self.__runProcessingTimer()
+        self._captureApplicationData(applicationName, applicationData)
+
+        self._queueApplicationData(applicationName, applicationData)
+
+    def __checkNotStopping(self):
+        """
+        Raises:
+            TortugaException
+        """
+
+        if self._stopping:
+            raise TortugaException('Rule engine is stopping')
+
+    def _captureApplicationData(self, applicationName, applicationData):
+        """
+        Append received data to the capture log, if capturing. Data
+        posted by chained rules is not captured; replay chains it again.
+        """
+
+        if self._capture is None:
+            return
+
+        try:
+            self._capture.write(applicationName, applicationData)
+        except TortugaException as ex:
+            self._logger.error('[%s] %s' % (self.__class__.__name__, ex))
 
     def executeRule(self, applicationName, ruleName, applicationData):
         self._lock.acquire()
@@ -886,125 +2164,283 @@ class RuleEngine(RuleEngineInterface):
         if ruleId in self._disabledRuleDict:
             raise RuleDisabled('Rule [%s] is disabled.' % (ruleId))
 
-        rule = self._ruleDict[ruleId]
+        self.__checkNotStopping()
 
-        appMonitor = rule.getApplicationMonitor()
+        rule = self._ruleDict[ruleId]
 
-        monitorType = appMonitor.getType()
+        monitorType = rule.monitorType
 
         if monitorType == 'poll':
             self._logger.debug(
                 '[%s] [%s] is poll rule' % (self.__class__.__name__, ruleId))
 
-            self.__cancelPollTimer(ruleId)
+            self._cancelPoll(ruleId)
 
-            self.__poll(rule)
+            self._pollNow(rule)
         elif monitorType == 'receive':
             self._logger.debug(
                 '[%s] [%s] is receive rule' % (self.__class__.__name__, ruleId))
 
-            self._receiveQ.put((applicationName, applicationData))
-
-            self.__runProcessingTimer()
+            self._queueApplicationData(applicationName, applicationData)
         else:
             # assume this is 'event' rule
             self._logger.debug(
                 '[%s] [%s] is event rule' % (self.__class__.__name__, ruleId))
 
-            self.__execute(rule)
+            self._executeEventRule(rule)
 
     def __execute(self, rule):
-        ruleId = self.__getRuleId(rule.getApplicationName(), rule.getName())
+        ruleId = rule.ruleId
 
         self._logger.debug(
             '[%s] Begin execution for [%s]' % (self.__class__.__name__, ruleId))
 
-        rule.ruleInvoked()
+        self.__invoke(rule)
 
-        appMonitor = rule.getApplicationMonitor()
+        if self.hasRule(ruleId):
+            self._checkMaxActionInvocations(rule, ruleId)
 
-        queryCmd = appMonitor.getQueryCommand()
+    def isIdle(self):
+        """
+        Returns:
+            True if no data is queued or being processed and no poll or
+            action is running or waiting in a batch
+        """
 
-        self._logger.debug(
-            '[%s] Query command: [%s]' % (self.__class__.__name__, queryCmd))
+        return not self._processingTimerRunning and \
+            self._receiveQ.empty() and \
+            self._pollingCount == 0 and \
+            self._inFlightTracker.getRunningCount() == 0 and \
+            self._actionBatcher.getPendingCount() == 0
+
+    def drain(self, timeout):
+        """
+        Wait up to 'timeout' seconds for all data to be processed and all
+        polls and actions to complete.
+
+            Returns:
+                True if the engine drained
+        """
 
-        actionCmd = appMonitor.getActionCommand()
+        deadline = time.time() + timeout
 
-        self._logger.debug(
-            '[%s] Action command: [%s]' % (self.__class__.__name__, actionCmd))
+        while time.time() < deadline:
+            if self.isIdle():
+                # Actions may post chained data or flush batches on
+                # completion; make sure nothing followed
+                time.sleep(DRAIN_CHECK_INTERVAL)
+
+                if self.isIdle():
+                    return True
+
+            time.sleep(DRAIN_CHECK_INTERVAL)
+
+        return False
+
+    def start(self):
+        """
+        Accept data again after stop() and queue the data saved by the
+        last stop().
+        """
+
+        with self._lock:
+            restarted = self._stopping
+
+            self._stopping = False
+
+            self._drainEvent.clear()
+
+            if self._capture is None:
+                self._capture = self.__getCapture()
+
+            if restarted:
+                # stop() cancelled all poll timers; spread the first polls
+                # like at startup rather than run them all at once
+                for ruleId, rule in self._ruleDict.items():
+                    if rule.monitorType == 'poll' and \
+                            ruleId not in self._disabledRuleDict:
+                        self.__scheduleFirstPoll(rule)
+
+        self._restoreQueue()
+
+    def stop(self, drainTimeout=None):
+        """
+        Stop the engine without losing data or interrupting actions: turn
+        away further data, cancel poll timers, process queued data and
+        wait for running polls and actions for up to 'drainTimeout'
+        seconds ('drainTimeout' setting if None), then save data still
+        queued to the queue file and the rule counters to the rule files.
+        """
+
+        if drainTimeout is None:
+            drainTimeout = self._settings.getFloat('drainTimeout')
 
-        xPathReplacementDict = {}
+        with self._lock:
+            if self._stopping:
+                return
+
+            self._stopping = True
+
+        self._logger.info(
+            '[%s] Stopping, draining for up to %s second(s)' % (
+                self.__class__.__name__, drainTimeout))
+
+        self._cancelPolls()
+
+        # Process queued data without the processing delay and run
+        # batched actions without waiting for their windows
+        self._drainEvent.set()
+
+        self._flushBatches()
+
+        if not self.drain(drainTimeout):
+            self._logger.warning(
+                '[%s] Engine did not drain within %s second(s)' % (
+                    self.__class__.__name__, drainTimeout))
+
+        running = self._inFlightTracker.getRunningCount()
+
+        if running:
+            self._logger.warning(
+                '[%s] %d action(s) still running' % (
+                    self.__class__.__name__, running))
+
+        self._saveQueue(self._takeQueuedApplicationData())
+
+        if self._evaluationPool is not None:
+            self._evaluationPool.shutdown()
+
+        self._checkpointRules()
+
+        with self._lock:
+            if self._capture is not None:
+                self._capture.close()
+
+                self._capture = None
+
+        self._logger.info('[%s] Stopped' % (self.__class__.__name__))
+
+    def _takeQueuedApplicationData(self):
+        """
+        Returns:
+            [(applicationName, applicationData)] taken off the receive
+            queue
+        """
+
+        items = []
+
+        while True:
+            try:
+                items.append(self._receiveQ.get_nowait())
+            except queue.Empty:
+                return items
+
+    def _saveQueue(self, items):
+        """
+        Append data taken off the receive queue to the queue file.
+        """
+
+        if not items:
+            return
 
         try:
-            invokeAction = True
-            queryStdOut = None
+            writer = CaptureWriter(self._queueFile)
+        except OSError as ex:
+            self._logger.error(
+                '[%s] Unable to save %d queued document(s) to [%s]: %s' % (
+                    self.__class__.__name__, len(items), self._queueFile,
+                    ex))
 
-            if queryCmd:
-                self._logger.debug(
-                    '[%s] About to invoke: [%s]' % (
-                        self.__class__.__name__, queryCmd))
+            return
 
+        try:
+            for applicationName, applicationData in items:
                 try:
-                    p = tortugaSubprocess.executeCommand(
-                        'source %s/tortuga.sh && ' % (
-                            self._cm.getEtcDir()) + queryCmd)
+                    writer.write(applicationName, applicationData)
+                finally:
+                    releaseApplicationData(applicationData)
+        except TortugaException as ex:
+            self._logger.error('[%s] %s' % (self.__class__.__name__, ex))
+        finally:
+            writer.close()
 
-                    queryStdOut = p.getStdOut()
+        self._logger.info(
+            '[%s] Saved %d queued document(s) to [%s]' % (
+                self.__class__.__name__, len(items), self._queueFile))
 
-                    appMonitor.queryInvocationSucceeded()
-                except Exception as ex:
-                    appMonitor.queryInvocationFailed()
-                    raise
+    def _restoreQueue(self):
+        """
+        Queue the data saved to the queue file by the last stop() and
+        remove the file.
+        """
 
-                monitorXmlDoc = self.__parseMonitorData(queryStdOut)
+        if not os.path.exists(self._queueFile):
+            return
 
-                xPathReplacementDict = self.__evaluateXPathVariables(
-                    monitorXmlDoc, rule.getXPathVariableList())
+        try:
+            items = [
+                (applicationName, data)
+                for _, applicationName, data in readCapture(self._queueFile)
+            ]
 
-                invokeAction = self.__evaluateConditions(
-                    rule, monitorXmlDoc, xPathReplacementDict)
+            os.unlink(self._queueFile)
+        except (OSError, TortugaException) as ex:
+            self._logger.error(
+                '[%s] Unable to restore queued data from [%s]: %s' % (
+                    self.__class__.__name__, self._queueFile, ex))
 
-            if invokeAction:
-                try:
-                    actionCmd = self.__replaceXPathVariables(
-                        actionCmd, xPathReplacementDict)
+            return
 
-                    self._logger.debug(
-                        '[%s] About to invoke: [%s]' % (
-                            self.__class__.__name__, actionCmd))
+        self._logger.info(
+            '[%s] Restoring %d queued document(s) from [%s]' % (
+                self.__class__.__name__, len(items), self._queueFile))
 
-                    p = tortugaSubprocess.executeCommand(
-                        'source %s/tortuga.sh && ' % (
-                            self._cm.getEtcDir()) + actionCmd)
+        for applicationName, applicationData in items:
+            self._queueApplicationData(applicationName, applicationData)
 
-                    appMonitor.actionInvocationSucceeded()
+    def _checkpointRules(self):
+        """
+        Save the counters of all rules to their rule files.
+        """
 
-                    self._logger.debug(
-                        '[%s] Done with command: [%s]' % (
-                            self.__class__.__name__, actionCmd))
+        with self._lock:
+            for ruleId, rule in self._ruleDict.items():
+                try:
+                    self.__writeCompiledRuleFile(rule)
                 except Exception as ex:
-                    appMonitor.actionInvocationFailed()
-                    raise
-            else:
-                self._logger.debug(
-                    '[%s] Will skip action: [%s]' % (
-                        self.__class__.__name__, actionCmd))
-        except TortugaException as ex:
-            self._logger.error('[%s] %s' % (self.__class__.__name__, ex))
+                    self._logger.error(
+                        '[%s] Unable to save rule [%s]: %s' % (
+                            self.__class__.__name__, ruleId, ex))
 
-        if self.hasRule(ruleId):
-            # Check if we need to stop invoking this rule.
-            maxActionInvocations = appMonitor.getMaxActionInvocations()
 
-            successfulActionInvocations = \
-                appMonitor.getSuccessfulActionInvocations()
+class _DocumentEvaluator(RuleEngine):
+    """
+    Receive rule evaluation of RuleEngine, without rule files, timers or
+    actions, in EvaluationPool worker processes.
+    """
 
-            if maxActionInvocations:
-                if int(maxActionInvocations) <= successfulActionInvocations:
-                    # Rule must be disabled.
-                    self._logger.debug(
-                        '[%s] Max. number of successful invocations (%s)'
-                        ' reached for rule [%s]' % (
-                            self.__class__.__name__, maxActionInvocations, ruleId))
+    def __init__(self, rules):     # pylint: disable=super-init-not-called
+        self._logger = logging.getLogger(
+            'tortuga.rule.%s' % self.__class__.__name__)
+        self._receiveRuleDict = dict((rule.ruleId, rule) for rule in rules)
+        self._batchEvaluatorDict = {}
+
+
+def _evaluateInWorker(applicationName, evaluator, ruleIds, applicationData):
+    """
+    EvaluationPool function evaluating receive rules of an application
+    with the _DocumentEvaluator built from its rules.
+
+        Returns:
+            [(ruleId, invokeAction, actionCmd, actionValues,
+              variableValues)]
+    """
+
+    rules = [evaluator._receiveRuleDict[ruleId] for ruleId in ruleIds]
 
-                    self.disableRule(rule.getApplicationName(), rule.getName())
+    return [
+        (rule.ruleId, invokeAction, actionCmd, actionValues, variableValues)
+        for rule, invokeAction, actionCmd, actionValues, variableValues in
+        evaluator._evaluateReceiveRules(
+            applicationName, rules, applicationData)
+    ]
@@ -0,0 +1,490 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+import time
+
+from tortuga.exceptions.tortugaException import TortugaException
+from tortuga.rule.applicationData import releaseApplicationData
+from tortuga.rule.queryCache import AsyncSingleFlight
+from tortuga.rule.ruleChain import OUTPUT_ACTION, OUTPUT_QUERY
+from tortuga.rule.ruleEngine import RuleEngine
+from tortuga.rule.ruleEngineSettings import RuleEngineSettings
+from tortuga.rule.ruleHistory import FAILED, getDecision
+
+
+class RuleEngineAsync(RuleEngine):
+    """
+    Rule engine running on an asyncio event loop in a dedicated thread.
+
+    Poll rules are loop timers, receive data goes through an asyncio.Queue
+    and query/action commands are run with asyncio.create_subprocess_exec,
+    so any number of rules and in-flight commands are served by a single
+    thread. Rule management is inherited from RuleEngine; its public
+    methods remain callable from any thread and hand scheduling work over
+    to the loop without waiting for it.
+    """
+
+    def __init__(self, minTriggerInterval=60, settings=None,
+                 applicationFilter=None):
+        settings = settings or RuleEngineSettings()
+
+        self._pollHandleDict = {}
+        # set while a document taken off the queue is evaluated
+        self._processingBusy = False
+        self._maxCommands = settings.getInt('asyncMaxCommands')
+        # used by polls as soon as RuleEngine has scheduled them
+        self._asyncQueryFlight = AsyncSingleFlight()
+        self._loop = asyncio.new_event_loop()
+        self._loopReady = threading.Event()
+
+        self._loopThread = threading.Thread(
+            target=self.__runLoop, name=self.__class__.__name__)
+        self._loopThread.daemon = True
+        self._loopThread.start()
+
+        self._loopReady.wait()
+
+        # Rules are loaded (and poll timers scheduled) by RuleEngine
+        super().__init__(
+            minTriggerInterval=minTriggerInterval, settings=settings,
+            applicationFilter=applicationFilter)
+
+        self._loop.call_soon_threadsafe(self.__startProcessing)
+
+    def __runLoop(self):
+        asyncio.set_event_loop(self._loop)
+
+        self._asyncReceiveQ = asyncio.Queue()
+
+        self._commandSemaphore = asyncio.Semaphore(self._maxCommands)
+
+        self._loop.call_soon(self._loopReady.set)
+
+        self._loop.run_forever()
+
+    def __startProcessing(self):
+        self._loop.create_task(self.__process())
+
+    def _schedulePoll(self, rule, delay):
+        self._loop.call_soon_threadsafe(self.__schedulePoll, rule, delay)
+
+    def __schedulePoll(self, rule, delay):
+        if self._stopping:
+            return
+
+        ruleId = rule.ruleId
+
+        self.__cancelPoll(ruleId)
+
+        self._pollHandleDict[ruleId] = self._loop.call_later(
+            delay, self.__startPoll, rule)
+
+    def _cancelPoll(self, ruleId):
+        self._loop.call_soon_threadsafe(self.__cancelPoll, ruleId)
+
+    def __cancelPoll(self, ruleId):
+        handle = self._pollHandleDict.pop(ruleId, None)
+
+        if handle is not None:
+            self._logger.debug(
+                '[%s] Stopping poll timer for [%s]' % (
+                    self.__class__.__name__, ruleId))
+
+            handle.cancel()
+
+    def _cancelPolls(self):
+        self._loop.call_soon_threadsafe(self.__cancelPolls)
+
+    def __cancelPolls(self):
+        for ruleId in list(self._pollHandleDict):
+            self.__cancelPoll(ruleId)
+
+    def _pollNow(self, rule):
+        self._loop.call_soon_threadsafe(self.__startPoll, rule)
+
+    def __startPoll(self, rule):
+        self._pollHandleDict.pop(rule.ruleId, None)
+
+        self._loop.create_task(self.__poll(rule))
+
+    def _queueApplicationData(self, applicationName, applicationData):
+        self._loop.call_soon_threadsafe(
+            self._asyncReceiveQ.put_nowait,
+            (applicationName, applicationData))
+
+    def _executeEventRule(self, rule):
+        self._loop.call_soon_threadsafe(
+            self._loop.create_task, self.__execute(rule))
+
+    def _scheduleBatch(self, delay, callback, *args):
+        self._loop.call_soon_threadsafe(
+            self._loop.call_later, 0 if self._stopping else delay,
+            callback, *args)
+
+    def _flushBatches(self):
+        self._loop.call_soon_threadsafe(self._actionBatcher.flushAll)
+
+    def _dispatchAction(self, rule, actionCmd):
+        # Called on the loop
+        if self._inFlightTracker.acquire(rule, actionCmd):
+            self._loop.create_task(self.__runTrackedAction(rule, actionCmd))
+
+    async def __spawn(self, cmd):
+        """
+        Run command in a shell with the Tortuga environment.
+
+            Returns:
+                (exit status, stdout, stderr)
+        """
+
+        self._logger.debug(
+            '[%s] About to invoke: [%s]' % (self.__class__.__name__, cmd))
+
+        async with self._commandSemaphore:
+            proc = await asyncio.create_subprocess_exec(
+                '/bin/bash', '-c', self._getCommandLine(cmd),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE)
+
+            stdout, stderr = await proc.communicate()
+
+        return proc.returncode, stdout, stderr
+
+    def __getCommandOutput(self, cmd, returncode, stdout, stderr):
+        """
+        Returns:
+            stdout
+        Throws:
+            TortugaException
+        """
+
+        if returncode != 0:
+            raise TortugaException(
+                'Command [%s] failed (exit status: %s): %s' % (
+                    cmd, returncode,
+                    stderr.decode(errors='replace').strip()))
+
+        self._logger.debug(
+            '[%s] Done with command: [%s]' % (self.__class__.__name__, cmd))
+
+        return stdout.decode(errors='replace')
+
+    async def __runCommand(self, cmd):
+        """
+        Run command in a shell with the Tortuga environment.
+
+            Returns:
+                stdout
+            Throws:
+                TortugaException
+        """
+
+        return self.__getCommandOutput(cmd, *await self.__spawn(cmd))
+
+    async def __runQueryCommand(self, rule, queryCmd):
+        if rule.queryProvider is not None:
+            # Providers block; run them off the loop
+            return await self._loop.run_in_executor(
+                None, self._queryProviders.query, rule.queryProvider)
+
+        return await self.__runCommand(queryCmd)
+
+    async def __runQuery(self, rule, queryCmd):
+        try:
+            stdout = await self.__runQueryCommand(rule, queryCmd)
+        except Exception:
+            rule.queryInvocationFailed()
+            raise
+
+        rule.queryInvocationSucceeded()
+
+        return stdout
+
+    async def __getQueryResult(self, rule, queryCmd, maxAge):
+        queryResult = self._queryCache.acquire(queryCmd, maxAge)
+
+        if queryResult is not None:
+            rule.queryCached()
+
+            return queryResult
+
+        async def runQuery():
+            return self._queryCache.store(
+                queryCmd, await self.__runQueryCommand(rule, queryCmd),
+                maxAge)
+
+        try:
+            queryResult, shared = await self._asyncQueryFlight.do(
+                queryCmd, runQuery)
+        except Exception:
+            rule.queryInvocationFailed()
+            raise
+
+        if shared:
+            self._queryCache.retain(queryResult)
+
+            rule.queryCached()
+        else:
+            rule.queryInvocationSucceeded()
+
+        return queryResult
+
+    async def __runAction(self, rule, actionCmd):
+        start = time.time()
+
+        returncode = None
+
+        try:
+            returncode, stdout, stderr = await self.__spawn(actionCmd)
+
+            stdout = self.__getCommandOutput(
+                actionCmd, returncode, stdout, stderr)
+        except Exception:
+            rule.actionInvocationFailed()
+
+            self._recordAction(rule, start, False, returncode)
+
+            raise
+
+        rule.actionInvocationSucceeded()
+
+        self._recordAction(
+            rule, start, True, returncode, len(stdout) if stdout else 0)
+
+        return stdout
+
+    async def __invoke(self, rule):
+        rule.ruleInvoked()
+
+        queryCmd = rule.getQuery()
+
+        actionCmd = rule.actionCommand
+
+        start = time.time()
+
+        queryTime = evaluationTime = variableValues = dataSize = None
+
+        decision = FAILED
+
+        try:
+            invokeAction = True
+
+            actionValues = {}
+
+            maxAge = self._getQueryMaxAge(rule)
+
+            if queryCmd and maxAge:
+                queryResult = await self.__getQueryResult(
+                    rule, queryCmd, maxAge)
+
+                queryTime = time.time() - start
+
+                dataSize = len(queryResult.stdout or '')
+
+                try:
+                    self._chainOutput(rule, OUTPUT_QUERY, queryResult.stdout)
+
+                    invokeAction, actionCmd, actionValues, variableValues = \
+                        self._evaluateQueryResult(rule, queryResult)
+                finally:
+                    self._queryCache.release(queryResult)
+
+                evaluationTime = time.time() - start - queryTime
+            elif queryCmd:
+                queryStdOut = await self.__runQuery(rule, queryCmd)
+
+                queryTime = time.time() - start
+
+                dataSize = len(queryStdOut or '')
+
+                self._chainOutput(rule, OUTPUT_QUERY, queryStdOut)
+
+                invokeAction, actionCmd, actionValues, variableValues = \
+                    self._evaluateQueryOutput(rule, queryStdOut)
+
+                evaluationTime = time.time() - start - queryTime
+
+            allowed = self._applyActionPolicy(rule, invokeAction)
+
+            decision = getDecision(invokeAction, allowed)
+
+            self._recordEvaluation(
+                rule, start, decision, queryTime, evaluationTime,
+                variableValues, dataSize=dataSize)
+
+            invokeAction = allowed
+
+            if invokeAction:
+                if rule.batchPolicy is not None:
+                    self._actionBatcher.add(rule, actionValues)
+                elif self._inFlightTracker.acquire(rule, actionCmd):
+                    await self.__runTrackedAction(rule, actionCmd)
+            else:
+                self._logger.debug(
+                    '[%s] Will skip action: [%s]' % (
+                        self.__class__.__name__, actionCmd))
+        except Exception as ex:
+            if decision == FAILED:
+                self._recordEvaluation(
+                    rule, start, FAILED, queryTime, evaluationTime,
+                    dataSize=dataSize)
+
+            if isinstance(ex, TortugaException):
+                self._logger.error(
+                    '[%s] %s' % (self.__class__.__name__, ex))
+            else:
+                self._logger.exception(
+                    '[%s] Error invoking rule [%s]' % (
+                        self.__class__.__name__, rule.ruleId))
+
+    async def __poll(self, rule):
+        ruleId = rule.ruleId
+
+        if not self.hasRule(ruleId) or not self._pollStarted():
+            self._logger.debug(
+                '[%s] Timer execution cancelled for [%s]' % (
+                    self.__class__.__name__, ruleId))
+
+            return
+
+        self._logger.debug(
+            '[%s] Timer execution started for [%s]' % (
+                self.__class__.__name__, ruleId))
+
+        try:
+            await self.__invoke(rule)
+        finally:
+            self._pollFinished()
+
+            # Whatever the outcome, or the rule stops polling for good
+            pollPeriod = self._getNextPollPeriod(rule, ruleId)
+
+            if pollPeriod is not None and rule.isStatusEnabled():
+                self.__schedulePoll(rule, pollPeriod)
+
+    async def __execute(self, rule):
+        ruleId = rule.ruleId
+
+        await self.__invoke(rule)
+
+        if self.hasRule(ruleId):
+            self._checkMaxActionInvocations(rule, ruleId)
+
+    async def __runTrackedAction(self, rule, actionCmd):
+        while True:
+            try:
+                if rule.isStatusEnabled():
+                    actionStdOut = await self.__runAction(rule, actionCmd)
+
+                    self._checkMaxActionInvocations(rule, rule.ruleId)
+
+                    self._chainOutput(rule, OUTPUT_ACTION, actionStdOut)
+            except TortugaException as ex:
+                self._logger.error('[%s] %s' % (self.__class__.__name__, ex))
+            except Exception:
+                self._logger.exception(
+                    '[%s] Error running action of rule [%s]' % (
+                        self.__class__.__name__, rule.ruleId))
+            finally:
+                queued = self._inFlightTracker.release(rule, actionCmd)
+
+            if queued is None:
+                break
+
+            rule, actionCmd = queued
+
+    async def __process(self):
+        while True:
+            applicationName, applicationData = \
+                await self._asyncReceiveQ.get()
+
+            self._logger.debug(
+                '[%s] Processing data for [%s]' % (
+                    self.__class__.__name__, applicationName))
+
+            self._processingBusy = True
+
+            try:
+                if self._isOffloaded(applicationData):
+                    triggered = await self.__evaluateOffloaded(
+                        applicationName, applicationData)
+                else:
+                    triggered = self._evaluateApplicationData(
+                        applicationName, applicationData)
+            except Exception:
+                self._logger.exception(
+                    '[%s] Error processing data for [%s]' % (
+                        self.__class__.__name__, applicationName))
+
+                self._processingBusy = False
+
+                continue
+            finally:
+                releaseApplicationData(applicationData)
+
+            for rule, _, actionCmd, actionValues in triggered:
+                if rule.batchPolicy is not None:
+                    self._actionBatcher.add(rule, actionValues)
+                else:
+                    self._dispatchAction(rule, actionCmd)
+
+            self._processingBusy = False
+
+    async def __evaluateOffloaded(self, applicationName, applicationData):
+        """
+        _evaluateApplicationData() for large data: only the wait for the
+        worker process runs off the loop, rules and engine state are
+        updated on it.
+        """
+
+        evaluation = self._beginEvaluation(applicationName, applicationData)
+
+        results = None
+
+        start = time.time()
+
+        pendingRules = evaluation[3]
+
+        if pendingRules:
+            workerResults = await self._loop.run_in_executor(
+                None, self._runOffloadRequest, self._getOffloadRequest(
+                    applicationName, pendingRules, applicationData))
+
+            results = self._getOffloadResults(
+                applicationName, pendingRules, applicationData,
+                workerResults)
+
+        return self._endEvaluation(
+            applicationName, applicationData, evaluation, results, start)
+
+    def isIdle(self):
+        return not self._processingBusy and \
+            self._asyncReceiveQ.empty() and \
+            self._pollingCount == 0 and \
+            self._inFlightTracker.getRunningCount() == 0 and \
+            self._actionBatcher.getPendingCount() == 0
+
+    def _takeQueuedApplicationData(self):
+        return asyncio.run_coroutine_threadsafe(
+            self.__takeQueuedApplicationData(), self._loop).result()
+
+    async def __takeQueuedApplicationData(self):
+        items = []
+
+        while not self._asyncReceiveQ.empty():
+            items.append(self._asyncReceiveQ.get_nowait())
+
+        return items
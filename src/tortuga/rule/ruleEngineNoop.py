@@ -100,3 +100,24 @@ class RuleEngineNoop(object):
         """
         raise AbstractMethod('receiveApplicationData() has to be'
                              ' implemented in the concrete API class.')
+
+    def start(self):
+        """
+        Start (or restart after stop()) background work of the engine;
+        called when the web service starts.
+
+            Returns:
+                None
+        """
+        pass
+
+    def stop(self, drainTimeout=None): \
+            # pylint: disable=unused-argument
+        """
+        Stop the engine, finishing or saving pending work for up to
+        'drainTimeout' seconds; called when the web service stops.
+
+            Returns:
+                None
+        """
+        pass
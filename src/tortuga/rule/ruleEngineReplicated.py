@@ -0,0 +1,393 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import array
+import os
+import socket
+import threading
+import time
+import uuid
+
+from tortuga.exceptions.tortugaException import TortugaException
+from tortuga.os_utility import osUtility
+from tortuga.rule.compiledRule import COUNTER_COUNT
+from tortuga.rule.ruleEngine import RuleEngine
+from tortuga.rule.ruleStateStore import RuleStateStore
+from tortuga.rule.ruleXmlParser import RuleXmlParser
+
+
+class RuleEngineReplicated(RuleEngine):
+    """
+    Rule engine of an active/standby pair.
+
+    Both instances load and compile all rules; the one holding the lease
+    in the shared state store is active and polls, processes receive data
+    and runs actions. Every 'leaseTtl' / 3 seconds each instance renews or
+    tries to take the lease, and picks up rules added, deleted, enabled
+    or disabled through the other instance from the shared rules
+    directory.
+
+    The active instance records the next poll time of every poll rule and
+    the rule counters in the store. An instance taking over loads the
+    counters and resumes each poll rule at its recorded time; polls that
+    became due during the failover are spread across their poll period
+    like at startup (see PollSchedule) rather than run all at once.
+    """
+
+    def __init__(self, minTriggerInterval=60, settings=None,
+                 applicationFilter=None):
+        self._active = False
+        # poll rules to be polled when (or while) active, by rule id
+        self._pollRuleDict = {}
+        self._ruleFileTimes = {}
+        self._holder = '%s:%d:%s' % (
+            socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+        self._stopped = threading.Event()
+
+        super().__init__(
+            minTriggerInterval=minTriggerInterval, settings=settings,
+            applicationFilter=applicationFilter)
+
+        self._leaseTtl = self._settings.getFloat('leaseTtl')
+
+        self._store = RuleStateStore(self.__getStorePath())
+
+        self.__checkRuleFiles()
+
+        self.__renewLease()
+
+        self.__startLeaseThread()
+
+    def __startLeaseThread(self):
+        self._leaseThread = threading.Thread(
+            target=self.__runLease, name='%s-lease' % (
+                self.__class__.__name__))
+        self._leaseThread.daemon = True
+        self._leaseThread.start()
+
+    def __getStorePath(self):
+        path = self._settings.get('stateStore')
+
+        if path:
+            return path
+
+        return os.path.join(
+            os.path.dirname(os.path.normpath(self._rulesDir)),
+            'simple_policy_engine.db')
+
+    def isActive(self):
+        return self._active
+
+    def __runLease(self):
+        while not self._stopped.wait(self._leaseTtl / 3.0):
+            try:
+                self.__checkRuleFiles()
+
+                self.__renewLease()
+            except Exception:
+                self._logger.exception(
+                    '[%s] Error renewing engine lease' % (
+                        self.__class__.__name__))
+
+    def __renewLease(self):
+        active = self._store.acquireLease(self._holder, self._leaseTtl)
+
+        with self._lock:
+            if active and not self._active:
+                self.__takeOver()
+            elif not active and self._active:
+                self.__standBy()
+
+            if self._active:
+                self._store.saveCounters({
+                    ruleId: rule.counters.tobytes()
+                    for ruleId, rule in self._ruleDict.items()
+                })
+
+    def __takeOver(self):
+        self._logger.info(
+            '[%s] Engine [%s] is active' % (
+                self.__class__.__name__, self._holder))
+
+        ruleStates = self._store.getRuleStates()
+
+        for ruleId, rule in self._ruleDict.items():
+            _, counters = ruleStates.get(ruleId, (None, None))
+
+            if counters is not None and \
+                    len(counters) <= 8 * COUNTER_COUNT:
+                # Counters added since are kept at 0
+                rule.counters = array.array(
+                    'd', counters + bytes(8 * COUNTER_COUNT - len(counters)))
+
+        self._active = True
+
+        now = time.time()
+
+        for ruleId, rule in list(self._pollRuleDict.items()):
+            if self._ruleDict.get(ruleId) is not rule or \
+                    not rule.isStatusEnabled():
+                # Deleted or disabled since
+                del self._pollRuleDict[ruleId]
+
+                continue
+
+            nextPoll, _ = ruleStates.get(ruleId, (None, None))
+
+            if nextPoll is not None and nextPoll > now:
+                delay = nextPoll - now
+            else:
+                # Due during failover (or never polled), next free slot
+                delay = self._pollSchedule.getInitialDelay(
+                    self._getPollKey(rule), float(
+                        self._getPollPeriod(rule) or
+                        self._minTriggerInterval), now)
+
+            self._logger.debug(
+                '[%s] Resuming rule [%s], next poll in %.1f second(s)' % (
+                    self.__class__.__name__, ruleId, delay))
+
+            self._schedulePoll(rule, delay)
+
+        # Data the previous active instance left queued when it stopped
+        self._restoreQueue()
+
+    def __standBy(self):
+        self._logger.warning(
+            '[%s] Engine [%s] lost the lease, standing by' % (
+                self.__class__.__name__, self._holder))
+
+        self._active = False
+
+        for ruleId in list(self._pollRuleDict):
+            super()._cancelPoll(ruleId)
+
+    def __checkRuleFiles(self):
+        """
+        Bring the rules in memory in line with the rules directory, which
+        is changed by the other instance too. Only files changed since the
+        last check are parsed.
+        """
+
+        fileTimes = {}
+
+        for fileName in osUtility.findFiles(self._rulesDir):
+            try:
+                fileTimes[fileName] = os.stat(fileName).st_mtime
+            except OSError:
+                # Deleted meanwhile
+                pass
+
+        parser = RuleXmlParser()
+
+        with self._lock:
+            ruleIds = set()
+
+            for fileName, fileTime in fileTimes.items():
+                knownTime, ruleId = self._ruleFileTimes.get(
+                    fileName, (None, None))
+
+                if knownTime == fileTime:
+                    if ruleId is not None:
+                        ruleIds.add(ruleId)
+
+                    continue
+
+                try:
+                    rule = parser.parse(fileName)
+                except Exception as ex:
+                    # Possibly being written; keep the rule for now
+                    self._logger.error(
+                        '[%s] Invalid rule file [%s] (Error: %s)' % (
+                            self.__class__.__name__, fileName, ex))
+
+                    if ruleId is not None:
+                        ruleIds.add(ruleId)
+
+                    continue
+
+                applicationName = rule.getApplicationName()
+
+                if self._applicationFilter is not None and \
+                        not self._applicationFilter(applicationName):
+                    self._ruleFileTimes[fileName] = (fileTime, None)
+
+                    continue
+
+                ruleId = '%s/%s' % (applicationName, rule.getName())
+
+                ruleIds.add(ruleId)
+
+                try:
+                    self.__updateRule(ruleId, rule)
+                except Exception as ex:
+                    self._logger.error(
+                        '[%s] Error updating rule [%s] (Error: %s)' % (
+                            self.__class__.__name__, ruleId, ex))
+
+                # Time after the update, which may have rewritten the file
+                try:
+                    self._ruleFileTimes[fileName] = (
+                        os.stat(fileName).st_mtime, ruleId)
+                except OSError:
+                    pass
+
+            for fileName in list(self._ruleFileTimes):
+                if fileName not in fileTimes:
+                    del self._ruleFileTimes[fileName]
+
+            for ruleId in list(self._ruleDict):
+                if ruleId not in ruleIds:
+                    self.__forgetRule(ruleId)
+
+    def __updateRule(self, ruleId, rule):
+        applicationName = rule.getApplicationName()
+        ruleName = rule.getName()
+
+        if ruleId not in self._ruleDict:
+            self._logger.debug(
+                '[%s] Found new rule [%s]' % (
+                    self.__class__.__name__, ruleId))
+
+            self.addRule(rule)
+
+            return
+
+        enabled = rule.isStatusEnabled()
+
+        if enabled == self._ruleDict[ruleId].isStatusEnabled():
+            return
+
+        self._logger.debug(
+            '[%s] Rule [%s] %s by other engine' % (
+                self.__class__.__name__, ruleId,
+                'enabled' if enabled else 'disabled'))
+
+        if enabled:
+            self.enableRule(applicationName, ruleName)
+        else:
+            self.disableRule(applicationName, ruleName)
+
+    def __forgetRule(self, ruleId):
+        self._logger.debug(
+            '[%s] Rule [%s] deleted by other engine' % (
+                self.__class__.__name__, ruleId))
+
+        applicationName, ruleName = ruleId.split('/', 1)
+
+        try:
+            self.deleteRule(applicationName, ruleName)
+        except (OSError, TortugaException):
+            # Rule file already removed
+            pass
+
+    def deleteRule(self, applicationName, ruleName):
+        ruleId = '%s/%s' % (applicationName, ruleName)
+
+        try:
+            return super().deleteRule(applicationName, ruleName)
+        finally:
+            if not self.hasRule(ruleId):
+                self._store.deleteRuleState(ruleId)
+
+    def _schedulePoll(self, rule, delay):
+        self._pollRuleDict[rule.ruleId] = rule
+
+        if not self._active:
+            # Scheduled on takeover
+            return
+
+        self._store.setNextPoll(rule.ruleId, time.time() + delay)
+
+        super()._schedulePoll(rule, delay)
+
+    def __checkActive(self):
+        if not self._active:
+            raise TortugaException(
+                'Rule engine [%s] is standing by; active engine is [%s]' % (
+                    self._holder, self._store.getLeaseHolder()))
+
+    def _pollNow(self, rule):
+        self.__checkActive()
+
+        super()._pollNow(rule)
+
+    def _captureApplicationData(self, applicationName, applicationData):
+        # Data rejected by the standby is not captured
+        if self._active:
+            super()._captureApplicationData(
+                applicationName, applicationData)
+
+    def _queueApplicationData(self, applicationName, applicationData):
+        self.__checkActive()
+
+        super()._queueApplicationData(applicationName, applicationData)
+
+    def _executeEventRule(self, rule):
+        self.__checkActive()
+
+        super()._executeEventRule(rule)
+
+    def _restoreQueue(self):
+        # Instances share the queue file; the active one processes it
+        if self._active:
+            super()._restoreQueue()
+
+    def _checkpointRules(self):
+        # The standby's counters are stale
+        if self._active:
+            super()._checkpointRules()
+
+    def start(self):
+        """
+        Start the engine (see RuleEngine.start()) and, after stop(),
+        compete for the lease again.
+        """
+
+        super().start()
+
+        if not self._stopped.is_set():
+            return
+
+        # The lease thread of the last run has ended
+        self._leaseThread.join()
+
+        self._stopped.clear()
+
+        self.__checkRuleFiles()
+
+        self.__renewLease()
+
+        self.__startLeaseThread()
+
+    def stop(self, drainTimeout=None):
+        """
+        Drain the engine (see RuleEngine.stop()), stop polling and hand
+        the lease over to the standby.
+        """
+
+        super().stop(drainTimeout)
+
+        self._stopped.set()
+
+        with self._lock:
+            if self._active:
+                self._store.saveCounters({
+                    ruleId: rule.counters.tobytes()
+                    for ruleId, rule in self._ruleDict.items()
+                })
+
+                self.__standBy()
+
+            self._store.releaseLease(self._holder)
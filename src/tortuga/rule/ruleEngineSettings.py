@@ -0,0 +1,165 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import configparser
+import logging
+import os
+
+
+class RuleEngineSettings(object):
+    """
+    Simple Policy Engine tunables.
+
+    Settings are read from the [engine] section of
+    $TORTUGA_ROOT/etc/simple_policy_engine.conf. Missing settings (or a
+    missing file) fall back to the defaults below.
+    """
+
+    SECTION = 'engine'
+
+    CONFIG_FILE_NAME = 'simple_policy_engine.conf'
+
+    DEFAULTS = {
+        # Seconds an evaluation outcome is reused for identical receive
+        # data; 0 disables the cache.
+        'dedupTtl': '300',
+
+        # Rule engine implementation: 'threaded', 'asyncio', 'sharded' or
+        # 'replicated'
+        'engine': 'threaded',
+
+        # Number of engine processes of the 'sharded' engine (0: one per
+        # CPU) and the engine implementation each of them runs
+        'shards': '0',
+        'shardEngine': 'threaded',
+
+        # State store (SQLite database) shared by the instances of the
+        # 'replicated' engine; empty for simple_policy_engine.db next to
+        # the rules directory. The active instance renews its lease every
+        # 'leaseTtl' / 3 seconds; the standby takes over 'leaseTtl'
+        # seconds after the last renewal.
+        'stateStore': '',
+        'leaseTtl': '10',
+
+        # Maximum number of query/action commands the asyncio engine runs
+        # concurrently
+        'asyncMaxCommands': '512',
+
+        # What to do with an action while the previous action of the rule
+        # is still running ('skip', 'queue' or 'parallel'), unless the
+        # rule's applicationMonitor says otherwise; see InFlightPolicy
+        'inFlightPolicy': 'queue',
+        'maxInFlight': '1',
+        'inFlightKey': 'rule',
+
+        # Posted documents of at least this many bytes are spooled to a
+        # temporary file that the XML parser reads, instead of memory
+        'dataSpoolSize': '1048576',
+
+        # Receive data of at least this many bytes is parsed and evaluated
+        # in one of 'offloadWorkers' worker processes (0: one per CPU),
+        # leaving the web service process responsive; 0 disables
+        'offloadThreshold': '0',
+        'offloadWorkers': '0',
+
+        # Seconds the threaded engine waits for more data before it
+        # processes received data
+        'processingDelay': '5',
+
+        # Threads running "receive" rule actions (threaded engine)
+        'actionWorkers': '16',
+
+        # Seconds actions with the same batch key are collected before
+        # they run as one command, unless the rule sets 'batchWindow'
+        'batchWindow': '5',
+
+        # Spread polls of poll rules with the same period across the period
+        # by a hash of the rule id, instead of polling all of them at once
+        'pollSpread': 'true',
+
+        # Random shift of each poll, as a fraction of the poll period
+        'pollJitter': '0.05',
+
+        # Seconds poll rules with the same query command share its output,
+        # at most half the rule's poll period, unless the rule sets
+        # 'queryMaxAge'; 0 runs the query for every poll
+        'queryMaxAge': '30',
+
+        # Evaluations kept per rule for 'get-rule --history'; 0 disables
+        'historySize': '32',
+
+        # Gzip compressed log all received data is appended to, for
+        # 'replay-application-data'; empty disables
+        'captureFile': '',
+
+        # Directory rules are loaded from and saved to; empty for the
+        # Tortuga rules directory
+        'rulesDir': '',
+
+        # Seconds the engine waits, when the web service stops, for queued
+        # data to be processed and running commands to complete
+        'drainTimeout': '30',
+
+        # Gzip compressed file data still queued at the end of the drain is
+        # saved to and loaded from on the next start; empty for
+        # simple_policy_engine.queue.gz next to the rules directory
+        'queueFile': '',
+    }
+
+    def __init__(self, configFile=None, overrides=None):
+        self._logger = logging.getLogger(
+            'tortuga.rule.%s' % self.__class__.__name__)
+
+        self._parser = configparser.ConfigParser()
+        self._parser.optionxform = str
+        self._parser.read_dict({self.SECTION: self.DEFAULTS})
+
+        if configFile is None:
+            from tortuga.config.configManager import ConfigManager
+
+            configFile = os.path.join(
+                ConfigManager().getEtcDir(), self.CONFIG_FILE_NAME)
+
+        if os.path.exists(configFile):
+            try:
+                self._parser.read(configFile)
+            except configparser.Error as ex:
+                self._logger.error(
+                    '[%s] Unable to read [%s], using defaults: %s' % (
+                        self.__class__.__name__, configFile, ex))
+
+        if overrides:
+            self._parser.read_dict({
+                self.SECTION: {
+                    key: str(value) for key, value in overrides.items()}})
+
+    def get(self, key):
+        return self._parser.get(self.SECTION, key, fallback=None)
+
+    def getDict(self):
+        """
+        Returns:
+            {setting: value} of all settings, as strings
+        """
+
+        return dict(self._parser.items(self.SECTION))
+
+    def getInt(self, key):
+        return self._parser.getint(self.SECTION, key)
+
+    def getFloat(self, key):
+        return self._parser.getfloat(self.SECTION, key)
+
+    def getBoolean(self, key):
+        return self._parser.getboolean(self.SECTION, key)
@@ -0,0 +1,374 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import importlib
+import logging
+import multiprocessing
+import os
+import threading
+import zlib
+
+from tortuga.config.configManager import ConfigManager
+from tortuga.exceptions.tortugaException import TortugaException
+from tortuga.objects.tortugaObject import TortugaObjectList
+from tortuga.rule.applicationData import SpooledApplicationData
+from tortuga.rule.dataCapture import CaptureWriter
+from tortuga.rule.ruleEngine import getQueueFileName
+from tortuga.rule.ruleEngineInterface import RuleEngineInterface
+from tortuga.rule.ruleEngineSettings import RuleEngineSettings
+
+
+def getShardIndex(applicationName, shardCount):
+    """
+    Returns:
+        index of the shard serving the rules of an application; stable
+        across processes and restarts
+    """
+
+    return zlib.crc32(applicationName.encode('utf-8')) % shardCount
+
+
+def _getException(moduleName, className, message):
+    """
+    Returns:
+        exception raised in a shard, rebuilt in this process
+    """
+
+    try:
+        exceptionClass = getattr(
+            importlib.import_module(moduleName), className)
+
+        if issubclass(exceptionClass, Exception):
+            return exceptionClass(message)
+    except Exception:
+        pass
+
+    return TortugaException(message)
+
+
+def _serveShard(conn, shardIndex, shardCount, settingsDict):
+    """
+    Main loop of a shard process: runs a rule engine for the applications
+    of the shard and serves the engine calls forwarded by
+    RuleEngineSharded.
+    """
+
+    from tortuga.rule.ruleObjectFactory import ENGINE_CLASSES
+
+    # Each shard saves the data left queued when it stops to its own file
+    settingsDict = dict(settingsDict, queueFile='%s.%d' % (
+        settingsDict['queueFile'], shardIndex))
+
+    settings = RuleEngineSettings(overrides=settingsDict)
+
+    moduleName, className = ENGINE_CLASSES[
+        settings.get('shardEngine')].rsplit('.', 1)
+
+    engineClass = getattr(importlib.import_module(moduleName), className)
+
+    engine = engineClass(
+        settings=settings,
+        applicationFilter=lambda applicationName: getShardIndex(
+            applicationName, shardCount) == shardIndex)
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+
+        if request is None:
+            break
+
+        method, args = request
+
+        try:
+            conn.send((True, getattr(engine, method)(*args)))
+        except Exception as ex:
+            conn.send((False, (
+                ex.__class__.__module__, ex.__class__.__name__, '%s' % ex)))
+
+
+class _Shard(object):
+    """
+    A shard process and the connection to it. Calls are serialized; the
+    process is started again if it died.
+    """
+
+    def __init__(self, index, count, settingsDict):
+        self.index = index
+        self._count = count
+        self._settingsDict = settingsDict
+        self._lock = threading.Lock()
+        self._process = None
+        self._conn = None
+
+    def start(self):
+        context = multiprocessing.get_context('spawn')
+
+        self._conn, childConn = context.Pipe()
+
+        self._process = context.Process(
+            target=_serveShard,
+            args=(childConn, self.index, self._count, self._settingsDict),
+            name='RuleEngineShard-%d' % (self.index))
+        self._process.daemon = True
+        self._process.start()
+
+        childConn.close()
+
+    def send(self, method, *args):
+        """
+        Forward a call to the shard; the caller must hold the shard lock
+        and receive the reply with receive().
+        """
+
+        if self._process is None or not self._process.is_alive():
+            self.start()
+
+        self._conn.send((method, args))
+
+    def receive(self):
+        """
+        Returns:
+            result of the forwarded call
+        Throws:
+            exception raised by the call
+        """
+
+        try:
+            ok, result = self._conn.recv()
+        except (EOFError, OSError):
+            self._process = None
+
+            raise TortugaException(
+                'Rule engine shard [%d] terminated' % (self.index))
+
+        if not ok:
+            raise _getException(*result)
+
+        return result
+
+    def call(self, method, *args):
+        with self._lock:
+            self.send(method, *args)
+
+            return self.receive()
+
+    def stop(self):
+        with self._lock:
+            if self._process is None:
+                return
+
+            try:
+                self._conn.send(None)
+            except (EOFError, OSError):
+                pass
+
+            self._process.join(5)
+
+            if self._process.is_alive():
+                self._process.terminate()
+
+            self._process = None
+
+
+class RuleEngineSharded(RuleEngineInterface):
+    """
+    Rule engine spreading applications across several engine processes.
+
+    Each shard process runs a regular engine ('shardEngine' setting) for
+    the applications whose name hashes to it, so parsing of posted data,
+    condition evaluation and actions of different applications run on
+    different CPUs. Calls are forwarded to the shard of the application;
+    rule lists are merged from all shards.
+    """
+
+    def __init__(self, settings=None):
+        self._settings = settings or RuleEngineSettings()
+        self._logger = logging.getLogger(
+            'tortuga.rule.%s' % self.__class__.__name__)
+
+        shardCount = self._settings.getInt('shards') or os.cpu_count() or 1
+
+        self._logger.debug(
+            '[%s] Starting %d rule engine shard(s)' % (
+                self.__class__.__name__, shardCount))
+
+        settingsDict = self._settings.getDict()
+
+        # set by stop(): data is turned away
+        self._stopping = False
+
+        # Data is captured here, in arrival order, rather than by shards
+        self._captureFile = settingsDict.get('captureFile')
+        self._capture = None
+
+        if self._captureFile:
+            self._capture = CaptureWriter(self._captureFile)
+
+            settingsDict['captureFile'] = ''
+
+        settingsDict['queueFile'] = getQueueFileName(
+            self._settings,
+            settingsDict.get('rulesDir') or ConfigManager().getRulesDir())
+
+        self._shards = [
+            _Shard(index, shardCount, settingsDict)
+            for index in range(shardCount)]
+
+        for shard in self._shards:
+            shard.start()
+
+    def __getShard(self, applicationName):
+        return self._shards[getShardIndex(applicationName, len(self._shards))]
+
+    def hasRule(self, ruleId):
+        applicationName = ruleId.split('/', 1)[0]
+
+        return self.__getShard(applicationName).call('hasRule', ruleId)
+
+    def addRule(self, rule):
+        return self.__getShard(rule.getApplicationName()).call(
+            'addRule', rule)
+
+    def deleteRule(self, applicationName, ruleName):
+        return self.__getShard(applicationName).call(
+            'deleteRule', applicationName, ruleName)
+
+    def enableRule(self, applicationName, ruleName):
+        return self.__getShard(applicationName).call(
+            'enableRule', applicationName, ruleName)
+
+    def disableRule(self, applicationName, ruleName):
+        return self.__getShard(applicationName).call(
+            'disableRule', applicationName, ruleName)
+
+    def getRule(self, applicationName, ruleName):
+        return self.__getShard(applicationName).call(
+            'getRule', applicationName, ruleName)
+
+    def dryRunApplicationData(self, applicationName, applicationData):
+        if isinstance(applicationData, SpooledApplicationData):
+            applicationData = applicationData.read()
+
+        return self.__getShard(applicationName).call(
+            'dryRunApplicationData', applicationName, applicationData)
+
+    def getRuleHistory(self, applicationName, ruleName):
+        return self.__getShard(applicationName).call(
+            'getRuleHistory', applicationName, ruleName)
+
+    def __callAll(self, method, *args):
+        """
+        Forward a call to all shards, which serve it in parallel.
+
+            Returns:
+                [result of each shard]
+            Throws:
+                first exception raised by a shard
+        """
+
+        results = []
+        error = None
+
+        for shard in self._shards:
+            shard._lock.acquire()
+
+        try:
+            for shard in self._shards:
+                shard.send(method, *args)
+
+            for shard in self._shards:
+                try:
+                    results.append(shard.receive())
+                except Exception as ex:
+                    error = error or ex
+        finally:
+            for shard in self._shards:
+                shard._lock.release()
+
+        if error is not None:
+            raise error
+
+        return results
+
+    def getRuleList(self):
+        ruleList = TortugaObjectList()
+
+        for shardRuleList in self.__callAll('getRuleList'):
+            ruleList.extend(shardRuleList)
+
+        return ruleList
+
+    def receiveApplicationData(self, applicationName, applicationData):
+        if self._stopping:
+            raise TortugaException('Rule engine is stopping')
+
+        if self._capture is not None:
+            try:
+                self._capture.write(applicationName, applicationData)
+            except TortugaException as ex:
+                self._logger.error(
+                    '[%s] %s' % (self.__class__.__name__, ex))
+
+        if isinstance(applicationData, SpooledApplicationData):
+            # The spool file is removed once this returns
+            applicationData = applicationData.read()
+
+        return self.__getShard(applicationName).call(
+            'receiveApplicationData', applicationName, applicationData)
+
+    def executeRule(self, applicationName, ruleName, applicationData):
+        if self._stopping:
+            raise TortugaException('Rule engine is stopping')
+
+        return self.__getShard(applicationName).call(
+            'executeRule', applicationName, ruleName, applicationData)
+
+    def start(self):
+        """
+        Accept data again after stop() and have the shards queue the data
+        they saved when last stopped.
+        """
+
+        self._stopping = False
+
+        if self._capture is None and self._captureFile:
+            self._capture = CaptureWriter(self._captureFile)
+
+        self.__callAll('start')
+
+    def stop(self, drainTimeout=None):
+        """
+        Drain all shards in parallel (see RuleEngine.stop()) and stop
+        their processes.
+        """
+
+        self._stopping = True
+
+        try:
+            self.__callAll('stop', drainTimeout)
+        except Exception as ex:
+            self._logger.error(
+                '[%s] Error stopping rule engine shard: %s' % (
+                    self.__class__.__name__, ex))
+
+        for shard in self._shards:
+            shard.stop()
+
+        if self._capture is not None:
+            self._capture.close()
+
+            self._capture = None
@@ -0,0 +1,203 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import array
+import math
+import threading
+
+
+# Outcome of an evaluation
+SKIPPED = 0         # conditions not met
+TRIGGERED = 1       # action to be run
+SUPPRESSED = 2      # conditions met, action held back by the action policy
+FAILED = 3          # query or evaluation failed
+
+DECISIONS = ('skipped', 'triggered', 'suppressed', 'failed')
+
+# State of the action of a triggered evaluation
+NO_ACTION = 0
+ACTION_PENDING = 1
+ACTION_SUCCEEDED = 2
+ACTION_FAILED = 3
+
+ACTION_STATES = (None, 'pending', 'succeeded', 'failed')
+
+# Stored for durations not measured and exit statuses not known
+_NO_DURATION = float('nan')
+_NO_EXIT_STATUS = -1
+_NO_SIZE = -1
+
+
+def getDecision(conditionsMet, invokeAction):
+    """
+    Returns:
+        decision of an evaluation, from whether the rule's conditions were
+        met and whether its action policy let the action run
+    """
+
+    if invokeAction:
+        return TRIGGERED
+
+    return SUPPRESSED if conditionsMet else SKIPPED
+
+
+def _getDuration(value):
+    return None if math.isnan(value) else round(value, 6)
+
+
+class RuleHistory(object):
+    """
+    Ring buffer of the most recent evaluations of a rule.
+
+    Each column is a preallocated array, so recording an evaluation
+    allocates nothing but the tuple of XPath variable values. The action
+    run for a triggered evaluation, which completes later and possibly on
+    another thread, is recorded on the latest triggered entry by
+    actionFinished(). Pickled copies, as shipped to evaluation worker
+    processes, are empty.
+    """
+
+    __slots__ = ('size', 'count', 'variableNames', '_time', '_queryTime',
+                 '_evaluationTime', '_actionTime', '_decision',
+                 '_actionState', '_exitStatus', '_dataSize', '_outputSize',
+                 '_digest', '_values', '_pending', '_lock')
+
+    def __init__(self, size, variableNames=()):
+        self.size = size
+        # evaluations recorded so far; entry n is in slot n % size
+        self.count = 0
+        self.variableNames = tuple(variableNames)
+        self._time = array.array('d', bytes(8 * size))
+        self._queryTime = array.array('f', [_NO_DURATION]) * size
+        self._evaluationTime = array.array('f', [_NO_DURATION]) * size
+        self._actionTime = array.array('f', [_NO_DURATION]) * size
+        self._decision = array.array('b', bytes(size))
+        self._actionState = array.array('b', bytes(size))
+        self._exitStatus = array.array('i', [_NO_EXIT_STATUS]) * size
+        # characters of evaluated data (query output or posted data) and
+        # of action output
+        self._dataSize = array.array('q', [_NO_SIZE]) * size
+        self._outputSize = array.array('q', [_NO_SIZE]) * size
+        # leading 8 bytes of the digest of "receive" data
+        self._digest = array.array('Q', bytes(8 * size))
+        self._values = [None] * size
+        # entry number of the latest triggered evaluation awaiting its
+        # action, -1 if none
+        self._pending = -1
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        return self.__class__, (self.size, self.variableNames)
+
+    def record(self, time_, decision, queryTime=None, evaluationTime=None,
+               values=None, digest=None, dataSize=None):
+        """
+        Record an evaluation started at 'time_'. 'values' are the
+        formatted values of the rule's XPath variables, in order;
+        'digest' the digest of evaluated "receive" data; 'dataSize' the
+        size of the evaluated data.
+        """
+
+        with self._lock:
+            slot = self.count % self.size
+
+            self._time[slot] = time_
+            self._queryTime[slot] = \
+                _NO_DURATION if queryTime is None else queryTime
+            self._evaluationTime[slot] = \
+                _NO_DURATION if evaluationTime is None else evaluationTime
+            self._actionTime[slot] = _NO_DURATION
+            self._decision[slot] = decision
+            self._exitStatus[slot] = _NO_EXIT_STATUS
+            self._dataSize[slot] = _NO_SIZE if dataSize is None else dataSize
+            self._outputSize[slot] = _NO_SIZE
+            self._digest[slot] = \
+                int.from_bytes(digest[:8], 'big') if digest else 0
+            self._values[slot] = values
+
+            if decision == TRIGGERED:
+                self._actionState[slot] = ACTION_PENDING
+
+                self._pending = self.count
+            else:
+                self._actionState[slot] = NO_ACTION
+
+            self.count += 1
+
+    def actionFinished(self, duration, succeeded, exitStatus=None,
+                       outputSize=None):
+        """
+        Record the action of the latest triggered evaluation, unless it
+        has left the buffer or already has its action recorded.
+        """
+
+        with self._lock:
+            # entries before count - size have been overwritten
+            if self._pending < 0 or self._pending < self.count - self.size:
+                return
+
+            slot = self._pending % self.size
+
+            self._actionTime[slot] = duration
+            self._actionState[slot] = \
+                ACTION_SUCCEEDED if succeeded else ACTION_FAILED
+
+            if exitStatus is not None:
+                self._exitStatus[slot] = exitStatus
+
+            if outputSize is not None:
+                self._outputSize[slot] = outputSize
+
+            self._pending = -1
+
+    def getEntries(self):
+        """
+        Returns:
+            [{field: value}], oldest entry first
+        """
+
+        entries = []
+
+        with self._lock:
+            for n in range(max(0, self.count - self.size), self.count):
+                slot = n % self.size
+
+                values = self._values[slot]
+
+                exitStatus = self._exitStatus[slot]
+
+                dataSize = self._dataSize[slot]
+
+                outputSize = self._outputSize[slot]
+
+                entries.append({
+                    'time': self._time[slot],
+                    'decision': DECISIONS[self._decision[slot]],
+                    'queryTime': _getDuration(self._queryTime[slot]),
+                    'evaluationTime':
+                        _getDuration(self._evaluationTime[slot]),
+                    'actionTime': _getDuration(self._actionTime[slot]),
+                    'action': ACTION_STATES[self._actionState[slot]],
+                    'exitStatus': exitStatus
+                    if exitStatus != _NO_EXIT_STATUS else None,
+                    'dataSize': dataSize if dataSize != _NO_SIZE else None,
+                    'outputSize':
+                        outputSize if outputSize != _NO_SIZE else None,
+                    'data': '%016x' % (self._digest[slot])
+                    if self._digest[slot] else None,
+                    'values': dict(zip(self.variableNames, values))
+                    if values is not None else None,
+                })
+
+        return entries
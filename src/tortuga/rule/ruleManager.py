@@ -37,6 +37,14 @@ class RuleManager(TortugaObjectManager):
         finally:
             RuleManager.__instanceLock.release()
 
+    def getRuleHistory(self, applicationName, ruleName):
+        """ Get recent evaluations of a rule. """
+        RuleManager.__instanceLock.acquire()
+        try:
+            return self._engine.getRuleHistory(applicationName, ruleName)
+        finally:
+            RuleManager.__instanceLock.release()
+
     def getRuleList(self):
         """ Get all known rules. """
 
@@ -91,6 +99,15 @@ class RuleManager(TortugaObjectManager):
         finally:
             RuleManager.__instanceLock.release()
 
+    def dryRunApplicationData(self, applicationName, applicationData):
+        """ Evaluate application data without acting on it. """
+        RuleManager.__instanceLock.acquire()
+        try:
+            return self._engine.\
+                dryRunApplicationData(applicationName, applicationData)
+        finally:
+            RuleManager.__instanceLock.release()
+
     def receiveApplicationData(self, applicationName, applicationData):
         """ Receive applicaton data and pass it to the rule engine. """
         RuleManager.__instanceLock.acquire()
@@ -99,3 +116,17 @@ class RuleManager(TortugaObjectManager):
                 receiveApplicationData(applicationName, applicationData)
         finally:
             RuleManager.__instanceLock.release()
+
+    def start(self):
+        """ Start the rule engine. """
+        RuleManager.__instanceLock.acquire()
+        try:
+            self._engine.start()
+        finally:
+            RuleManager.__instanceLock.release()
+
+    def stop(self, drainTimeout=None):
+        """ Drain and stop the rule engine. """
+        # Not serialized with other calls: the engine turns data away
+        # while it drains rather than have requests wait for the drain
+        self._engine.stop(drainTimeout)
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import importlib
 import logging
 import pkgutil
 
@@ -23,6 +24,15 @@ from tortuga.rule.ruleXmlParserNoop import RuleXmlParserNoop
 from .objects.rule import Rule
 
 
+# Rule engine implementations selectable through the 'engine' setting
+ENGINE_CLASSES = {
+    'threaded': 'tortuga.rule.ruleEngine.RuleEngine',
+    'asyncio': 'tortuga.rule.ruleEngineAsync.RuleEngineAsync',
+    'sharded': 'tortuga.rule.ruleEngineSharded.RuleEngineSharded',
+    'replicated': 'tortuga.rule.ruleEngineReplicated.RuleEngineReplicated',
+}
+
+
 def __look_for_subclass(modulename, cls):
     module = __import__(modulename)
 
@@ -82,6 +92,9 @@ class RuleObjectFactory(object):
 
     def getEngine(self):
         """ Get rule engine. """
+        if not self._engine:
+            self._engine = self.__getConfiguredEngine()
+
         if not self._engine:
             subclass = find_subclass(
                 path=tortuga.rule.__path__,
@@ -96,6 +109,37 @@ class RuleObjectFactory(object):
 
         return self._engine
 
+    def __getConfiguredEngine(self):
+        """
+        Instantiate the engine named by the 'engine' setting.
+
+            Returns:
+                engine or None
+        """
+
+        from tortuga.rule.ruleEngineSettings import RuleEngineSettings
+
+        settings = RuleEngineSettings()
+
+        engineName = settings.get('engine')
+
+        if engineName not in ENGINE_CLASSES:
+            self._logger.error(
+                '[%s] Unknown rule engine [%s]' % (
+                    self.__class__.__name__, engineName))
+
+            return None
+
+        moduleName, className = ENGINE_CLASSES[engineName].rsplit('.', 1)
+
+        self._logger.debug(
+            '[%s] Using [%s] rule engine' % (
+                self.__class__.__name__, engineName))
+
+        engineClass = getattr(importlib.import_module(moduleName), className)
+
+        return engineClass(settings=settings)
+
     def getParser(self):
         """ Get rule object parser. """
         if not self._parser:
@@ -0,0 +1,147 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sqlite3
+import threading
+import time
+
+
+class RuleStateStore(object):
+    """
+    Engine state shared by rule engine instances through an SQLite
+    database: the lease deciding which instance is active, and per rule
+    the time of the next poll and the counters reported by get-rule.
+
+    Rule definitions themselves are shared through the rules directory.
+    """
+
+    LEASE_NAME = 'engine'
+
+    def __init__(self, path, timeout=30.0):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None,
+            check_same_thread=False)
+
+        with self._lock:
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS lease ('
+                'name TEXT PRIMARY KEY, holder TEXT, expires REAL)')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS rule_state ('
+                'ruleId TEXT PRIMARY KEY, nextPoll REAL, counters BLOB)')
+
+    def acquireLease(self, holder, ttl, now=None):
+        """
+        Take or renew the lease for 'ttl' seconds, unless another holder
+        has a lease that has not expired.
+
+            Returns:
+                True if 'holder' holds the lease
+        """
+
+        now = time.time() if now is None else now
+
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+
+            try:
+                row = self._db.execute(
+                    'SELECT holder, expires FROM lease WHERE name = ?',
+                    (self.LEASE_NAME,)).fetchone()
+
+                if row is not None and row[0] != holder and row[1] > now:
+                    return False
+
+                self._db.execute(
+                    'INSERT OR REPLACE INTO lease (name, holder, expires)'
+                    ' VALUES (?, ?, ?)', (self.LEASE_NAME, holder, now + ttl))
+
+                return True
+            finally:
+                self._db.execute('COMMIT')
+
+    def releaseLease(self, holder):
+        with self._lock:
+            self._db.execute(
+                'DELETE FROM lease WHERE name = ? AND holder = ?',
+                (self.LEASE_NAME, holder))
+
+    def getLeaseHolder(self, now=None):
+        """
+        Returns:
+            holder of the lease, None if it is not held
+        """
+
+        now = time.time() if now is None else now
+
+        with self._lock:
+            row = self._db.execute(
+                'SELECT holder FROM lease WHERE name = ? AND expires > ?',
+                (self.LEASE_NAME, now)).fetchone()
+
+        return row[0] if row is not None else None
+
+    def setNextPoll(self, ruleId, nextPoll):
+        with self._lock:
+            self._db.execute(
+                'INSERT OR IGNORE INTO rule_state (ruleId) VALUES (?)',
+                (ruleId,))
+            self._db.execute(
+                'UPDATE rule_state SET nextPoll = ? WHERE ruleId = ?',
+                (nextPoll, ruleId))
+
+    def saveCounters(self, counterDict):
+        """
+        Store counters, {ruleId: bytes}, of any number of rules.
+        """
+
+        with self._lock:
+            self._db.execute('BEGIN')
+
+            try:
+                for ruleId, counters in counterDict.items():
+                    self._db.execute(
+                        'INSERT OR IGNORE INTO rule_state (ruleId)'
+                        ' VALUES (?)', (ruleId,))
+                    self._db.execute(
+                        'UPDATE rule_state SET counters = ?'
+                        ' WHERE ruleId = ?', (counters, ruleId))
+            finally:
+                self._db.execute('COMMIT')
+
+    def getRuleStates(self):
+        """
+        Returns:
+            {ruleId: (nextPoll, counters)}, either None if not stored
+        """
+
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT ruleId, nextPoll, counters FROM rule_state').fetchall()
+
+        return {
+            ruleId: (nextPoll, bytes(counters) if counters is not None
+                     else None)
+            for ruleId, nextPoll, counters in rows
+        }
+
+    def deleteRuleState(self, ruleId):
+        with self._lock:
+            self._db.execute(
+                'DELETE FROM rule_state WHERE ruleId = ?', (ruleId,))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -26,6 +26,12 @@ from tortuga.kit.kitApi import KitApi
 from tortuga.kit.utils import format_kit_descriptor
 from tortuga.objects.xPathVariable import XPathVariable
 from tortuga.utility import xmlParserUtility
+from .actionBatcher import BATCH_ATTRIBUTES
+from .adaptivePollPeriod import ADAPTIVE_POLL_ATTRIBUTES
+from .actionPolicy import POLICY_ATTRIBUTES
+from .inFlightTracker import IN_FLIGHT_ATTRIBUTES
+from .queryCache import QUERY_CACHE_ATTRIBUTES
+from .ruleChain import CHAIN_ATTRIBUTES
 from .objects.applicationMonitor import ApplicationMonitor
 from .objects.rule import Rule
 from .objects.ruleCondition import RuleCondition
@@ -128,6 +134,19 @@ class RuleXmlParser(RuleXmlParserInterface):
 
                 appMonitor.setMaxActionInvocations(maxActionInvocations)
 
+            # Action policy
+            for key, _ in POLICY_ATTRIBUTES:
+                if appMonitorNode.hasAttribute(key):
+                    appMonitor[key] = xmlParserUtility.getOptionalAttribute(
+                        appMonitorNode, key)
+
+            for key in IN_FLIGHT_ATTRIBUTES + BATCH_ATTRIBUTES + \
+                    QUERY_CACHE_ATTRIBUTES + ADAPTIVE_POLL_ATTRIBUTES + \
+                    CHAIN_ATTRIBUTES:
+                if appMonitorNode.hasAttribute(key):
+                    appMonitor[key] = xmlParserUtility.getOptionalAttribute(
+                        appMonitorNode, key)
+
             desc = xmlParserUtility.getOptionalTextElement(
                 appMonitorNode, 'description')
 
@@ -139,6 +158,12 @@ class RuleXmlParser(RuleXmlParserInterface):
             if queryCommand != '':
                 appMonitor.setQueryCommand(queryCommand)
 
+            queryProvider = xmlParserUtility.getOptionalTextElement(
+                appMonitorNode, 'queryProvider')
+
+            if queryProvider != '':
+                appMonitor.setQueryProvider(queryProvider)
+
             analyzeCommand = xmlParserUtility.getOptionalTextElement(
                 appMonitorNode, 'analyzeCommand')
 
@@ -16,7 +16,6 @@
 
 from tortuga.exceptions.invalidCliRequest import InvalidCliRequest
 from ..ruleCli import RuleCli
-from ..ruleObjectFactory import RuleObjectFactory
 
 
 class AddRuleCli(RuleCli):
@@ -41,6 +40,8 @@ Description:
             raise InvalidCliRequest(
                 _('Missing required --desc-file argument'))
 
+        from ..ruleObjectFactory import RuleObjectFactory
+
         parser = RuleObjectFactory().getParser()
         rule = parser.parse(self.getOptions().descriptionFile)
         self.get_rule_api().addRule(rule)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os.path
+
+from tortuga.exceptions.fileNotFound import FileNotFound
+from tortuga.exceptions.invalidCliRequest import InvalidCliRequest
+from ..ruleCli import RuleCli
+
+
+class EvaluateApplicationDataCli(RuleCli):
+    """
+    Evaluate app. data command line interface.
+    """
+    def __init__(self):
+        super().__init__()
+        self.addOption('--app-name', dest='applicationName',
+                       help=_('Application name'))
+        self.addOption('--data-file', dest='dataFile',
+                       help=_('Application data file'))
+        self.addOption('--json', action='store_true', default=False,
+                       help=_('Print the result as JSON'))
+
+    def runCommand(self):
+        self.parseArgs(_("""
+    evaluate-application-data --app-name=APPLICATIONNAME --data-file=DATAFILE
+        [--json]
+
+Description:
+    The evaluate-application-data tool evaluates an XML file against the
+    rules of an application in the Tortuga Rule Engine, without running
+    any command or changing rule state, and displays the values of the
+    XPath variables, the result of each condition and the action command
+    of every rule.
+"""))
+        application_name = self.getArgs().applicationName
+
+        if not application_name:
+            raise InvalidCliRequest(_('Missing application name.'))
+
+        data_file = self.getArgs().dataFile
+
+        if not data_file:
+            raise InvalidCliRequest(_('Missing application data file.'))
+
+        if not os.path.exists(data_file):
+            raise FileNotFound(_('Invalid application data file: %s.') % data_file)
+
+        with open(data_file, 'rb') as f:
+            application_data = f.read()
+
+        if not len(application_data):
+            raise InvalidCliRequest(_('Empty application data file.'))
+
+        result = self.get_rule_api().evaluateApplicationData(
+            application_name, application_data)
+
+        if self.getArgs().json:
+            print(json.dumps(result, indent=4, sort_keys=True))
+
+            return
+
+        self.printResult(result)
+
+    def printResult(self, result): \
+            # pylint: disable=no-self-use
+        print(_('Parsed data in %.6fs') % (result['parseTime']))
+
+        for rule in result['rules']:
+            print()
+            print('%s/%s (%s%s): %s in %.6fs' % (
+                result['applicationName'], rule['name'], rule['type'],
+                '' if rule['enabled'] else ', disabled',
+                'TRIGGERED' if rule['conditionsMet'] else 'not triggered',
+                rule['evaluationTime']))
+
+            for name, value in sorted(rule['variables'].items()):
+                print('    %s = %s' % (name, value))
+
+            for condition in rule['conditions']:
+                if condition['error']:
+                    outcome = 'error: %s' % (condition['error'])
+                else:
+                    outcome = '%s %s %s: %s' % (
+                        condition['metric'],
+                        condition['evaluationOperator'],
+                        condition['trigger'],
+                        'met' if condition['met'] else 'not met')
+
+                print('    [%s %s %s] %s' % (
+                    condition['metricXPath'],
+                    condition['evaluationOperator'],
+                    condition['triggerValue'], outcome))
+
+            if rule['actionCommand'] is not None:
+                print('    action: %s' % (rule['actionCommand']))
+
+
+def main():
+    EvaluateApplicationDataCli().run()
@@ -14,9 +14,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import time
+
 from tortuga.rule.ruleCli import RuleCli
 
 
+def formatDuration(value):
+    return '-' if value is None else '%.3f' % (value)
+
+
 class GetRuleCli(RuleCli):
     """
     Get rule command line interface.
@@ -27,19 +33,55 @@ class GetRuleCli(RuleCli):
         self.addOption('--app-name', dest='applicationName',
                        help=_('Application name'))
         self.addOption('--rule-name', dest='ruleName', help=_('Rule name'))
+        self.addOption('--history', action='store_true', default=False,
+                       help=_('Display recent evaluations of the rule'))
 
     def runCommand(self):
         self.parseArgs(_("""
-    get-rule --app-name=APPLICATIONNAME --rule-name=RULENAME
+    get-rule --app-name=APPLICATIONNAME --rule-name=RULENAME [--history]
 
 Description:
     The get-rule tool returns details of a single rule  that  is  in  the
-    Tortuga Rule Engine.
+    Tortuga Rule Engine. With --history, it displays the most recent
+    evaluations of the rule instead.
 """))
         application_name, rule_name = self.getApplicationNameAndRuleName()
+
+        if self.getArgs().history:
+            self.printHistory(
+                self.get_rule_api().getRuleHistory(
+                    application_name, rule_name))
+
+            return
+
         rule = self.get_rule_api().getRule(application_name, rule_name)
         print((rule.getXmlRep()))
 
+    def printHistory(self, history): \
+            # pylint: disable=no-self-use
+        print('%-19s %-10s %9s %9s %9s %-9s %4s %8s %8s  %s' % (
+            'TIME', 'DECISION', 'QUERY', 'EVAL', 'ACTION', 'RESULT',
+            'EXIT', 'DATA', 'OUTPUT', 'VALUES'))
+
+        for entry in history:
+            values = entry['values'] or {}
+
+            print('%-19s %-10s %9s %9s %9s %-9s %4s %8s %8s  %s' % (
+                time.strftime(
+                    '%Y-%m-%d %H:%M:%S', time.localtime(entry['time'])),
+                entry['decision'],
+                formatDuration(entry['queryTime']),
+                formatDuration(entry['evaluationTime']),
+                formatDuration(entry['actionTime']),
+                entry['action'] or '-',
+                '-' if entry['exitStatus'] is None else entry['exitStatus'],
+                '-' if entry.get('dataSize') is None
+                else entry['dataSize'],
+                '-' if entry.get('outputSize') is None
+                else entry['outputSize'],
+                ' '.join('%s=%s' % (name, value)
+                         for name, value in sorted(values.items()))))
+
 
 def main():
     GetRuleCli().run()
@@ -15,6 +15,8 @@
 # limitations under the License.
 
 import os.path
+import sys
+import tempfile
 
 from tortuga.exceptions.fileNotFound import FileNotFound
 from tortuga.exceptions.invalidCliRequest import InvalidCliRequest
@@ -31,19 +33,47 @@ class PostApplicationDataCli(RuleCli):
                        help=_('Application name'))
         self.addOption('--data-file', dest='dataFile',
                        help=_('Application data file'))
+        self.addOption('--agent', action='store_true', default=False,
+                       help=_('Run continuously, posting documents as they'
+                              ' arrive'))
+        self.addOption('--watch-dir', dest='watchDir',
+                       help=_('Agent mode: post files created in this'
+                              ' directory (files are removed once read)'))
+        self.addOption('--fifo', dest='fifo',
+                       help=_('Agent mode: post each document written to'
+                              ' this FIFO'))
+        self.addOption('--spool-dir', dest='spoolDir',
+                       help=_('Agent mode: directory used to buffer'
+                              ' documents while the web service is'
+                              ' unavailable'))
 
     def runCommand(self):
         self.parseArgs(_("""
     post-application-data --app-name=APPLICATIONNAME --data-file=DATAFILE
 
+    post-application-data --app-name=APPLICATIONNAME --agent
+        [--watch-dir=DIR | --fifo=PATH] [--spool-dir=DIR]
+
 Description:
     The  post-application-data tool posts an XML file to the Tortuga Rule
     Engine web service as input for configured rules.
+
+    In agent mode it keeps running and posts documents as they arrive in a
+    directory, on a FIFO or on standard input (NUL separated). Documents
+    identical to the previously posted one are skipped and documents that
+    cannot be posted are buffered in the spool directory until the web
+    service is available again.
 """))
         application_name = self.getArgs().applicationName
 
         if not application_name:
             raise InvalidCliRequest(_('Missing application name.'))
+
+        if self.getArgs().agent:
+            self.runAgent(application_name)
+
+            return
+
         data_file = self.getArgs().dataFile
 
         if not data_file:
@@ -52,7 +82,8 @@ Description:
         if not os.path.exists(data_file):
             raise FileNotFound(_('Invalid application data file: %s.') % data_file)
 
-        f = open(data_file, 'r')
+        # Posted as read, without decoding and encoding again
+        f = open(data_file, 'rb')
         application_data = f.read()
         f.close()
 
@@ -62,6 +93,42 @@ Description:
         self.get_rule_api().postApplicationData(application_name,
                                                 application_data)
 
+    def runAgent(self, application_name):
+        from ..applicationDataAgent import ApplicationDataAgent
+
+        args = self.getArgs()
+
+        if args.watchDir and not os.path.isdir(args.watchDir):
+            raise FileNotFound(_('Invalid watch directory: %s.') %
+                               args.watchDir)
+
+        if args.fifo and not os.path.exists(args.fifo):
+            raise FileNotFound(_('Invalid FIFO: %s.') % args.fifo)
+
+        spool_dir = args.spoolDir or os.path.join(
+            tempfile.gettempdir(), 'post-application-data', application_name)
+
+        # A single API instance keeps its authenticated connection open
+        # for the lifetime of the agent; documents are posted as is, one
+        # per request.
+        agent = ApplicationDataAgent(
+            self.get_rule_api().postApplicationData, application_name,
+            spool_dir)
+
+        if args.watchDir:
+            agent.addDirectorySource(args.watchDir)
+
+        if args.fifo:
+            agent.addFifoSource(args.fifo)
+
+        if not args.watchDir and not args.fifo:
+            agent.addStreamSource(sys.stdin.buffer)
+
+        try:
+            agent.run()
+        except KeyboardInterrupt:
+            agent.stop()
+
 
 def main():
     PostApplicationDataCli().run()
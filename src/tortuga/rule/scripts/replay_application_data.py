@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os.path
+import shutil
+import tempfile
+
+from tortuga.exceptions.fileNotFound import FileNotFound
+from tortuga.exceptions.invalidCliRequest import InvalidCliRequest
+from ..ruleCli import RuleCli
+
+
+def formatLatency(value):
+    return '-' if value is None else '%.6f' % (value)
+
+
+class ReplayApplicationDataCli(RuleCli):
+    """
+    Replay captured app. data command line interface.
+    """
+    def __init__(self):
+        super().__init__()
+        self.addOption('--capture-file', dest='captureFile',
+                       help=_('Capture log written by the engine'))
+        self.addOption('--rules-dir', dest='rulesDir',
+                       help=_('Directory of the rules to replay against'
+                              ' (default: installed rules)'))
+        self.addOption('--speed', dest='speed', type=float, default=1.0,
+                       help=_('Replay this many times as fast as the data'
+                              ' was received, 0 for as fast as possible'))
+        self.addOption('--action-time', dest='actionTime', type=float,
+                       default=0.0,
+                       help=_('Seconds each stubbed command takes'))
+        self.addOption('--processing-delay', dest='processingDelay',
+                       type=float,
+                       help=_('Seconds the engine waits for more data before'
+                              ' processing received data'))
+        self.addOption('--drain-timeout', dest='drainTimeout', type=float,
+                       default=60.0,
+                       help=_('Seconds to wait for processing and actions'
+                              ' after the last document'))
+        self.addOption('--json', action='store_true', default=False,
+                       help=_('Print the report as JSON'))
+
+    def runCommand(self):
+        self.parseArgs(_("""
+    replay-application-data --capture-file=FILE [--rules-dir=DIR]
+        [--speed=FACTOR] [--action-time=SECONDS]
+        [--processing-delay=SECONDS] [--drain-timeout=SECONDS] [--json]
+
+Description:
+    The replay-application-data tool feeds application data captured by the
+    Tortuga Rule Engine (see the 'captureFile' engine setting) through a
+    local rule engine, without running any query or action command, and
+    reports throughput, latencies and the actions the rules fired.
+"""))
+        args = self.getArgs()
+
+        if not args.captureFile:
+            raise InvalidCliRequest(_('Missing capture file.'))
+
+        if not os.path.exists(args.captureFile):
+            raise FileNotFound(_('Invalid capture file: %s.') %
+                               args.captureFile)
+
+        if args.speed < 0:
+            raise InvalidCliRequest(_('Invalid speed: %s.') % args.speed)
+
+        from tortuga.rule.dataCapture import readCapture
+        from tortuga.rule.dataReplay import ReplayRuleEngine, replayCapture
+        from tortuga.rule.ruleEngineSettings import RuleEngineSettings
+
+        rules_dir = args.rulesDir
+
+        if rules_dir is None:
+            from tortuga.config.configManager import ConfigManager
+
+            rules_dir = ConfigManager().getRulesDir()
+
+        if not os.path.isdir(rules_dir):
+            raise FileNotFound(_('Invalid rules directory: %s.') % rules_dir)
+
+        # The engine saves rules it loads; keep the originals untouched
+        work_dir = tempfile.mkdtemp(prefix='replay-application-data-')
+
+        try:
+            replay_rules_dir = os.path.join(work_dir, 'rules')
+
+            shutil.copytree(rules_dir, replay_rules_dir)
+
+            overrides = {
+                'rulesDir': replay_rules_dir,
+                'captureFile': '',
+                'engine': 'threaded',
+            }
+
+            if args.processingDelay is not None:
+                overrides['processingDelay'] = args.processingDelay
+
+            engine = ReplayRuleEngine(
+                settings=RuleEngineSettings(overrides=overrides),
+                actionTime=args.actionTime)
+
+            report = replayCapture(
+                engine, readCapture(args.captureFile), speed=args.speed,
+                drainTimeout=args.drainTimeout)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        if args.json:
+            print(json.dumps(report, indent=4, sort_keys=True))
+
+            return
+
+        self.printReport(report)
+
+    def printReport(self, report): \
+            # pylint: disable=no-self-use
+        print(_('Documents:   %d (%d bytes), %d evaluation(s) including'
+                ' chained data') % (
+                    report['documents'], report['bytes'],
+                    report['evaluations']))
+        print(_('Elapsed:     %.3fs%s') % (
+            report['elapsed'],
+            '' if report['drained'] else _(' (not drained)')))
+        print(_('Throughput:  %.3f documents/s, %.0f bytes/s') % (
+            report['documentsPerSecond'] or 0,
+            report['bytesPerSecond'] or 0))
+        print(_('Triggered:   %d, actions run: %d') % (
+            report['triggered'], len(report['actions'])))
+        print()
+        print('%-12s %7s %10s %10s %10s %10s' % (
+            'STAGE', 'COUNT', 'MEAN', 'P50', 'P95', 'MAX'))
+
+        for stage in ('queue', 'evaluation', 'action'):
+            stats = report['latency'][stage]
+
+            print('%-12s %7d %10s %10s %10s %10s' % (
+                stage, stats['count'], formatLatency(stats['mean']),
+                formatLatency(stats['p50']), formatLatency(stats['p95']),
+                formatLatency(stats['max'])))
+
+        if report['actions']:
+            print()
+
+        for action in report['actions']:
+            print('%10.3f %s%s: %s' % (
+                action['time'], action['rule'],
+                '' if action['succeeded'] else _(' (failed)'),
+                action['command']))
+
+
+def main():
+    ReplayApplicationDataCli().run()
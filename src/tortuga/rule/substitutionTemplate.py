@@ -0,0 +1,85 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+
+from tortuga.rule.metricValue import formatValue
+
+
+class SubstitutionTemplate(object):
+    """
+    String with XPath variable references, split once into segments.
+
+    'segments' alternates literal text and variable names, starting and
+    ending with literal text (possibly empty), so rendering is a single
+    join. Variable names are matched leftmost first and, at the same
+    position, longest first: with variables '__n__' and '__nn__', the
+    text '__nn__' always refers to '__nn__'.
+    """
+
+    __slots__ = ('text', 'segments')
+
+    def __init__(self, text, variableNames=()):
+        self.text = text
+
+        names = sorted(
+            (name for name in set(variableNames) if name),
+            key=lambda name: (-len(name), name))
+
+        if text and names:
+            pattern = re.compile(
+                '(%s)' % '|'.join(re.escape(name) for name in names))
+
+            self.segments = tuple(pattern.split(text))
+        else:
+            self.segments = (text,)
+
+    def __repr__(self):
+        return '%s' % (self.text)
+
+    def hasVariables(self):
+        return len(self.segments) > 1
+
+    def getSingleVariable(self):
+        """
+        Returns:
+            variable name if the template is exactly one variable, None
+            otherwise
+        """
+
+        if len(self.segments) == 3 and \
+                not self.segments[0] and not self.segments[2]:
+            return self.segments[1]
+
+        return None
+
+    def render(self, valueDict):
+        """
+        Returns:
+            text with variables replaced by their formatted values;
+            variables missing from 'valueDict' are left as they are
+        """
+
+        segments = self.segments
+
+        if len(segments) == 1:
+            return segments[0]
+
+        parts = list(segments)
+
+        for index in range(1, len(parts), 2):
+            if parts[index] in valueDict:
+                parts[index] = formatValue(valueDict[parts[index]])
+
+        return ''.join(parts)
@@ -0,0 +1,94 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import urllib.parse
+
+from tortuga.exceptions.tortugaException import TortugaException
+from .httpConnectionPool import AsyncHttpConnectionPool
+from .ruleWsApi import getConnectionSettings, getResponseContent, \
+    getVerify
+
+
+class AsyncRuleWsApi(object):
+    """
+    asyncio variant of RuleWsApi for high-volume application data posting;
+    requires aiohttp.
+
+    Usage:
+
+        api = AsyncRuleWsApi(username=..., password=...)
+        await api.postApplicationDataList('app', documents)
+        await api.close()
+    """
+
+    def __init__(self, username=None, password=None, baseurl=None,
+                 verify=True, maxConnections=8):
+        baseurl, username, password = getConnectionSettings(
+            username, password, baseurl)
+
+        self._pool = AsyncHttpConnectionPool(
+            baseurl, username=username, password=password,
+            verify=getVerify(verify), maxConnections=maxConnections)
+
+    async def postApplicationData(self, applicationName, applicationData):
+        """
+        Send application monitoring data.
+
+            Returns:
+                None
+            Throws:
+                TortugaException
+        """
+
+        url = 'applications/{0}/data'.format(
+            urllib.parse.quote_plus(applicationName))
+
+        if isinstance(applicationData, str):
+            applicationData = applicationData.encode('utf-8')
+
+        try:
+            # Posted as is; the web service reads it into a single buffer
+            response = await self._pool.request(
+                'POST', url, body=applicationData, headers={
+                    'Content-Type': 'application/xml',
+                    'Accept': 'application/json',
+                })
+
+            getResponseContent(response)
+
+        except TortugaException:
+            raise
+
+        except Exception as ex:
+            raise TortugaException(exception=ex)
+
+    async def postApplicationDataList(self, applicationName,
+                                      applicationDataList):
+        """
+        Send several application data documents concurrently, limited by
+        the connection pool size.
+
+            Returns:
+                None
+            Throws:
+                TortugaException
+        """
+
+        await asyncio.gather(*[
+            self.postApplicationData(applicationName, applicationData)
+            for applicationData in applicationDataList])
+
+    async def close(self):
+        await self._pool.close()
@@ -0,0 +1,259 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import http.cookiejar
+import ssl
+import threading
+import urllib.parse
+
+import requests
+import requests.adapters
+
+
+class HttpResponse(object):
+    """
+    Fully read HTTP response.
+    """
+
+    def __init__(self, status, reason, headers, body):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    def getHeader(self, name, default=None):
+        return self.headers.get(name.lower(), default)
+
+
+def _getAuthorization(username, password):
+    if username is None:
+        return None
+
+    token = base64.b64encode(
+        '{0}:{1}'.format(username, password or '').encode('utf-8'))
+
+    return 'Basic ' + token.decode('ascii')
+
+
+def _getBaseUrl(baseurl):
+    url = urllib.parse.urlsplit(baseurl)
+
+    if url.scheme not in ('http', 'https'):
+        raise ValueError('Unsupported URL scheme: {0}'.format(baseurl))
+
+    return baseurl.rstrip('/')
+
+
+def _importAiohttp():
+    # Imported when used; it is optional and slow to import
+    try:
+        import aiohttp
+    except ImportError:
+        raise ImportError(
+            'aiohttp is required for asynchronous posting; install'
+            ' tortuga-simple-policy[async]')
+
+    return aiohttp
+
+
+def _getSslContext(verify):
+    """
+    Returns:
+        SSL context for aiohttp verifying as 'verify' (see
+        ruleWsApi.getVerify()) says
+    """
+
+    if verify is False:
+        return False
+
+    return ssl.create_default_context(
+        cafile=verify if isinstance(verify, str) else None)
+
+
+class HttpConnectionPool(object):
+    """
+    Thread-safe pool of persistent (keep-alive) connections to a single
+    web service endpoint, on a requests.Session.
+
+    Up to 'maxConnections' connections are kept open between requests.
+    Credentials are sent until the server hands out a session cookie;
+    requests then carry only the cookie so the server does not have to
+    re-authenticate every call, and a 401 drops the cookie and the request
+    is retried with the credentials. The cookies are kept by the pool under
+    a lock, not in the cookie jar of the session, which requests reads and
+    updates unguarded. 'verify' is False, a CA bundle or True for the
+    system CAs.
+    """
+
+    def __init__(self, baseurl, username=None, password=None, verify=True,
+                 maxConnections=4, timeout=60):
+        self._baseurl = _getBaseUrl(baseurl)
+        self._timeout = timeout
+        self._authorization = _getAuthorization(username, password)
+        self._lock = threading.Lock()
+        # session cookies handed out by the server, by name
+        self._cookieDict = {}
+
+        self._session = requests.Session()
+        self._session.verify = verify
+        # Cookies are kept in _cookieDict; the session accepts none
+        self._session.cookies.set_policy(
+            http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+        # Proxy settings are looked up in the environment on every request
+        # otherwise; the installer is reached directly, as before
+        self._session.trust_env = False
+
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=maxConnections)
+
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    def getUrl(self, url):
+        return '{0}/{1}'.format(self._baseurl, url.lstrip('/'))
+
+    def request(self, method, url, body=None, headers=None):
+        """
+        Issue request and return HttpResponse. 'url' is relative to the
+        base URL of the pool.
+        """
+
+        with self._lock:
+            cookie = self.__getCookie()
+
+        response = self._request(method, url, body, headers, cookie)
+
+        if response.status == 401 and cookie:
+            # Session expired on the server; authenticate again, unless
+            # another request has done so meanwhile.
+            with self._lock:
+                if self.__getCookie() == cookie:
+                    self._cookieDict.clear()
+
+            response = self._request(method, url, body, headers, None)
+
+        return response
+
+    def __getCookie(self):
+        """
+        Called with the lock held.
+
+            Returns:
+                Cookie header value, None if there are no cookies
+        """
+
+        return '; '.join(
+            '{0}={1}'.format(name, value)
+            for name, value in sorted(self._cookieDict.items())) or None
+
+    def _request(self, method, url, body, headers, cookie):
+        requestHeaders = dict(headers or {})
+
+        if cookie:
+            requestHeaders['Cookie'] = cookie
+        elif self._authorization:
+            requestHeaders['Authorization'] = self._authorization
+
+        resp = self._session.request(
+            method, self.getUrl(url), data=body, headers=requestHeaders,
+            timeout=self._timeout)
+
+        # Cookies of this response only; not shared with other threads
+        cookieDict = resp.cookies.get_dict()
+
+        if cookieDict:
+            with self._lock:
+                self._cookieDict.update(cookieDict)
+
+        return HttpResponse(
+            resp.status_code, resp.reason,
+            {key.lower(): value for key, value in resp.headers.items()},
+            resp.content)
+
+    def close(self):
+        self._session.close()
+
+
+class AsyncHttpConnectionPool(object):
+    """
+    asyncio counterpart of HttpConnectionPool for high-volume clients, on
+    an aiohttp.ClientSession (requires aiohttp).
+
+    At most 'maxConnections' requests are in flight at once; each one runs
+    on an idle keep-alive connection when there is one.
+    """
+
+    def __init__(self, baseurl, username=None, password=None, verify=True,
+                 maxConnections=8, timeout=60):
+        self._aiohttp = _importAiohttp()
+        self._baseurl = _getBaseUrl(baseurl)
+        self._timeout = timeout
+        self._sslContext = _getSslContext(verify)
+        self._authorization = _getAuthorization(username, password)
+        self._maxConnections = maxConnections
+        self._session = None
+
+    def getUrl(self, url):
+        return '{0}/{1}'.format(self._baseurl, url.lstrip('/'))
+
+    def _getSession(self):
+        if self._session is None:
+            # Created lazily so that it binds to the running loop
+            aiohttp = self._aiohttp
+
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self._maxConnections, ssl=self._sslContext),
+                cookie_jar=aiohttp.CookieJar(unsafe=True),
+                timeout=aiohttp.ClientTimeout(total=self._timeout))
+
+        return self._session
+
+    async def request(self, method, url, body=None, headers=None):
+        session = self._getSession()
+
+        hadCookies = len(session.cookie_jar) > 0
+
+        response = await self._request(session, method, url, body, headers)
+
+        if response.status == 401 and hadCookies:
+            session.cookie_jar.clear()
+
+            response = await self._request(
+                session, method, url, body, headers)
+
+        return response
+
+    async def _request(self, session, method, url, body, headers):
+        requestHeaders = dict(headers or {})
+
+        if not len(session.cookie_jar) and self._authorization:
+            requestHeaders['Authorization'] = self._authorization
+
+        async with session.request(
+                method, self.getUrl(url), data=body,
+                headers=requestHeaders) as resp:
+            data = await resp.read()
+
+            return HttpResponse(
+                resp.status, resp.reason,
+                {key.lower(): value for key, value in resp.headers.items()},
+                data)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+            self._session = None
@@ -13,21 +13,225 @@
 # limitations under the License.
 
 import base64
-import urllib.error
+import importlib
+import json
+import os
 import urllib.parse
-import urllib.request
 
 from tortuga.exceptions.tortugaException import TortugaException
 from tortuga.wsapi.tortugaWsApi import TortugaWsApi
-from ..objects import rule
+from .httpConnectionPool import HttpConnectionPool
+
+
+def encodeApplicationData(applicationData):
+    """
+    Encode application data the way the application data endpoint
+    expects it (base64 of the MIME base64 encoded document).
+    """
+
+    if isinstance(applicationData, str):
+        applicationData = applicationData.encode('utf-8')
+
+    return base64.b64encode(
+        base64.encodebytes(applicationData)).decode('ascii')
+
+
+def getConnectionSettings(username=None, password=None, baseurl=None):
+    """
+    Resolve web service URL and credentials for the connection pools,
+    using the installer defaults for anything not given.
+
+        Returns:
+            (baseurl, username, password)
+    """
+
+    if baseurl is None or username is None:
+        from tortuga.config.configManager import ConfigManager
+
+        cm = ConfigManager()
+
+        if baseurl is None:
+            baseurl = '{0}://{1}:{2}'.format(
+                cm.getAdminScheme(), cm.getInstaller(), cm.getAdminPort())
+
+        if username is None:
+            username = cm.getCfmUser()
+            password = cm.getCfmPassword()
+
+    return '{0}/v1'.format(baseurl.rstrip('/')), username, password
+
+
+# Modules of the exceptions raised by the rule web service, rebuilt on the
+# client from the tortuga status code of error responses
+EXCEPTION_MODULES = (
+    'ruleNotFound',
+    'ruleAlreadyExists',
+    'ruleAlreadyEnabled',
+    'ruleAlreadyDisabled',
+    'ruleDisabled',
+    'invalidXml',
+    'invalidArgument',
+    'userNotAuthorized',
+)
+
+_exceptionClassDict = None
+
+
+def getExceptionClass(errorCode):
+    """
+    Returns:
+        TortugaException subclass with tortuga status code 'errorCode',
+        TortugaException if there is none
+    """
+
+    global _exceptionClassDict
+
+    if _exceptionClassDict is None:
+        exceptionClassDict = {}
+
+        for moduleName in EXCEPTION_MODULES:
+            className = moduleName[0].upper() + moduleName[1:]
+
+            try:
+                exceptionClass = getattr(importlib.import_module(
+                    'tortuga.exceptions.' + moduleName), className)
+
+                exceptionClassDict[
+                    exceptionClass().getErrorCode()] = exceptionClass
+            except Exception:
+                # Not provided by this version of Tortuga
+                continue
+
+        _exceptionClassDict = exceptionClassDict
+
+    return _exceptionClassDict.get(errorCode, TortugaException)
+
+
+def getVerify(verify=True):
+    """
+    Resolve server certificate verification the way Tortuga clients do:
+    none if 'verify' is False or TORTUGA_WS_NO_VERIFY is set, otherwise
+    against the CA bundle 'verify' names or, by default, the installer CA
+    ($TORTUGA_ROOT/etc/CA/ca.pem) when present.
+
+        Returns:
+            False, or path of a CA bundle, or True for the system CAs
+    """
+
+    if verify is False or os.getenv('TORTUGA_WS_NO_VERIFY'):
+        return False
+
+    if isinstance(verify, str):
+        return verify
+
+    from tortuga.config.configManager import ConfigManager
+
+    caBundle = os.path.join(ConfigManager().getRoot(), 'etc', 'CA', 'ca.pem')
+
+    return caBundle if os.path.exists(caBundle) else True
+
+
+def getResponseContent(response):
+    """
+    Decode JSON response content, raising the exception named by the
+    tortuga status code of error responses (TortugaException if none).
+    """
+
+    try:
+        content = json.loads(response.body.decode('utf-8')) \
+            if response.body else {}
+    except ValueError:
+        content = {}
+
+    if response.status < 400:
+        return content
+
+    message = response.getHeader('tortuga-status-message') or \
+        response.getHeader('x-tortuga-status-message')
+
+    if not message and isinstance(content, dict):
+        error = content.get('error')
+
+        message = error.get('message') if isinstance(error, dict) \
+            else error
+
+    errorCode = response.getHeader('tortuga-status-code') or \
+        response.getHeader('x-tortuga-status-code')
+
+    try:
+        exceptionClass = getExceptionClass(int(errorCode))
+    except (TypeError, ValueError):
+        exceptionClass = TortugaException
+
+    raise exceptionClass(
+        message or 'HTTP {0} {1}'.format(response.status, response.reason))
 
 
 class RuleWsApi(TortugaWsApi):
     """
     Rule WS API class.
 
+    Requests are sent over a pool of persistent connections that is shared
+    by all calls made through this instance, so clients making many calls
+    pay for connection setup and authentication only once.
     """
 
+    def __init__(self, username=None, password=None, baseurl=None,
+                 verify=True, maxConnections=4):
+        super().__init__(username=username, password=password,
+                         baseurl=baseurl)
+
+        self._poolArgs = (username, password, baseurl)
+        self._verify = verify
+        self._maxConnections = maxConnections
+        self._pool = None
+
+    def _getPool(self):
+        if self._pool is None:
+            baseurl, username, password = \
+                getConnectionSettings(*self._poolArgs)
+
+            self._pool = HttpConnectionPool(
+                baseurl, username=username, password=password,
+                verify=getVerify(self._verify),
+                maxConnections=self._maxConnections)
+
+        return self._pool
+
+    def _sendRequest(self, method, url, data=None):
+        body = json.dumps(data).encode('utf-8') if data is not None \
+            else None
+
+        response = self._getPool().request(
+            method, url, body=body, headers={
+                'Content-Type': 'application/json',
+                'Accept': 'application/json',
+            })
+
+        return getResponseContent(response)
+
+    def get(self, url):
+        return self._sendRequest('GET', url)
+
+    def post(self, url, data=None):
+        return self._sendRequest('POST', url, data=data)
+
+    def put(self, url, data=None):
+        return self._sendRequest('PUT', url, data=data)
+
+    def delete(self, url):
+        return self._sendRequest('DELETE', url)
+
+    def close(self):
+        """
+        Close persistent connections.
+        """
+
+        if self._pool is not None:
+            self._pool.close()
+
+            self._pool = None
+
     def getRule(self, applicationName, ruleName):
         """
         Get rule info.
@@ -44,6 +248,8 @@ class RuleWsApi(TortugaWsApi):
             urllib.parse.quote_plus(ruleName))
 
         try:
+            from ..objects import rule
+
             responseDict = self.get(url)
             r = rule.Rule.getFromDict(responseDict.get('rule'))
             r.decode()
@@ -56,6 +262,32 @@ class RuleWsApi(TortugaWsApi):
         except Exception as ex:
             raise TortugaException(exception=ex)
 
+    def getRuleHistory(self, applicationName, ruleName):
+        """
+        Get recent evaluations of a rule.
+
+            Returns:
+                [{field: value}], oldest first
+            Throws:
+                RuleNotFound
+                TortugaException
+        """
+
+        url = 'rules/{0}/name/{1}/history'.format(
+            urllib.parse.quote_plus(applicationName),
+            urllib.parse.quote_plus(ruleName))
+
+        try:
+            responseDict = self.get(url)
+
+            return responseDict.get('history', [])
+
+        except TortugaException:
+            raise
+
+        except Exception as ex:
+            raise TortugaException(exception=ex)
+
     def getRuleList(self):
         """
         Get rule list.
@@ -69,6 +301,8 @@ class RuleWsApi(TortugaWsApi):
         url = 'rules'
 
         try:
+            from ..objects import rule
+
             responseDict = self.get(url)
             ruleList = rule.Rule.getListFromDict(responseDict)
             ruleList.decode()
@@ -148,17 +382,81 @@ class RuleWsApi(TortugaWsApi):
                 TortugaException
         """
 
+        url = 'applications/{0}/data'.format(
+            urllib.parse.quote_plus(applicationName))
+
+        if isinstance(applicationData, str):
+            applicationData = applicationData.encode('utf-8')
+
+        try:
+            # Posted as is; the web service reads it into a single buffer
+            getResponseContent(self._getPool().request(
+                'POST', url, body=applicationData, headers={
+                    'Content-Type': 'application/xml',
+                    'Accept': 'application/json',
+                }))
+
+        except TortugaException as ex:
+            raise
+
+        except Exception as ex:
+            raise TortugaException(exception=ex)
+
+    def evaluateApplicationData(self, applicationName, applicationData):
+        """
+        Evaluate application monitoring data against the rules of the
+        application, without running any command or changing rule state.
+
+            Returns:
+                {'applicationName': ..., 'parseTime': seconds,
+                 'rules': [{...}]}, see RuleEngine.dryRunApplicationData()
+            Throws:
+                TortugaException
+        """
+
+        url = 'applications/{0}/evaluate'.format(
+            urllib.parse.quote_plus(applicationName))
+
+        if isinstance(applicationData, str):
+            applicationData = applicationData.encode('utf-8')
+
+        try:
+            return getResponseContent(self._getPool().request(
+                'POST', url, body=applicationData, headers={
+                    'Content-Type': 'application/xml',
+                    'Accept': 'application/json',
+                }))
+
+        except TortugaException:
+            raise
+
+        except Exception as ex:
+            raise TortugaException(exception=ex)
+
+    def postApplicationDataList(self, applicationName,
+                                applicationDataList):
+        """
+        Send several application monitoring data documents in a single
+        request. Documents are processed in order.
+
+            Returns:
+                None
+            Throws:
+                TortugaException
+        """
+
         url = 'applications/{0}/data'.format(
             urllib.parse.quote_plus(applicationName))
 
         postdata = {
-            'data': base64.b64encode(base64.encodestring(applicationData)),
+            'data': [encodeApplicationData(applicationData)
+                     for applicationData in applicationDataList],
         }
 
         try:
             self.post(url, data=postdata)
 
-        except TortugaException as ex:
+        except TortugaException:
             raise
 
         except Exception as ex:
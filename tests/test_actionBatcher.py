@@ -0,0 +1,118 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+try:
+    from tortuga.exceptions.invalidArgument import InvalidArgument
+    from tortuga.rule.actionBatcher import ActionBatcher, BatchPolicy
+    from tortuga.rule.substitutionTemplate import SubstitutionTemplate
+    HAVE_TORTUGA_EXCEPTIONS = True
+except ImportError:
+    HAVE_TORTUGA_EXCEPTIONS = False
+
+
+VARIABLES = ('__profile__', '__count__')
+
+
+class _Rule(object):
+    def __init__(self, name, batchMerge=''):
+        self.name = name
+        self.batchPolicy = BatchPolicy.fromApplicationMonitor(
+            {'batchKey': 'add-__profile__', 'batchMerge': batchMerge},
+            VARIABLES)
+        self.actionTemplate = SubstitutionTemplate(
+            'add --profile __profile__ --count __count__ # %s' % (name),
+            VARIABLES)
+        self.batched = 0
+
+    def actionBatched(self):
+        self.batched += 1
+
+
+@unittest.skipUnless(HAVE_TORTUGA_EXCEPTIONS, 'tortuga not installed')
+class TestActionBatcher(unittest.TestCase):
+    def setUp(self):
+        self.scheduled = []
+        self.dispatched = []
+
+        self.batcher = ActionBatcher(
+            lambda delay, callback, *args: self.scheduled.append(
+                (delay, callback, args)),
+            lambda rule, actionCmd: self.dispatched.append(actionCmd))
+
+    def _flush(self):
+        for _, callback, args in self.scheduled:
+            callback(*args)
+
+        self.scheduled = []
+
+    def test_merge_by_key(self):
+        a = _Rule('a', '__count__:sum')
+        b = _Rule('b')
+
+        self.batcher.add(a, {'__profile__': 'gpu', '__count__': 2.0})
+        self.batcher.add(b, {'__profile__': 'gpu', '__count__': 3.0})
+        self.batcher.add(a, {'__profile__': 'cpu', '__count__': 1.0})
+
+        self.assertEqual(len(self.scheduled), 2)
+        self.assertEqual(self.batcher.getPendingCount(), 3)
+
+        self._flush()
+
+        self.assertEqual(sorted(self.dispatched), [
+            'add --profile cpu --count 1.0 # a',
+            'add --profile gpu --count 5.0 # a',
+        ])
+        self.assertEqual((a.batched, b.batched), (0, 1))
+        self.assertEqual(self.batcher.getPendingCount(), 0)
+
+    def test_flush_all(self):
+        a = _Rule('a', '__count__:sum')
+
+        self.batcher.add(a, {'__profile__': 'gpu', '__count__': 2.0})
+        self.batcher.add(a, {'__profile__': 'gpu', '__count__': 3.0})
+        self.batcher.add(a, {'__profile__': 'cpu', '__count__': 1.0})
+
+        self.batcher.flushAll()
+
+        self.assertEqual(sorted(self.dispatched), [
+            'add --profile cpu --count 1.0 # a',
+            'add --profile gpu --count 5.0 # a',
+        ])
+        self.assertEqual(self.batcher.getPendingCount(), 0)
+
+        # Flushes scheduled when the batches were started
+        self._flush()
+
+        self.assertEqual(len(self.dispatched), 2)
+
+    def test_merge_functions(self):
+        policy = BatchPolicy(
+            'key', mergeDict=BatchPolicy.parseMerge(
+                '__a__:max, __b__:min __c__:sum'))
+
+        self.assertEqual(
+            policy.merge([
+                {'__a__': 1.0, '__b__': 1.0, '__c__': 1.0, '__d__': 'x'},
+                {'__a__': 3.0, '__b__': 3.0, '__c__': 'n/a', '__d__': 'y'},
+            ]),
+            {'__a__': 3.0, '__b__': 1.0, '__c__': 'n/a', '__d__': 'y'})
+
+    def test_invalid(self):
+        for appMonitor in ({'batchKey': 'k', 'batchMerge': '__a__:avg'},
+                           {'batchKey': 'k', 'batchWindow': '-1'},
+                           {'batchWindow': '10'}):
+            with self.assertRaises(InvalidArgument):
+                BatchPolicy.fromApplicationMonitor(appMonitor)
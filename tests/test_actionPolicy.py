@@ -0,0 +1,75 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+try:
+    from tortuga.rule.actionPolicy import ActionPolicy, ExclusionGroups
+    HAVE_TORTUGA_EXCEPTIONS = True
+except ImportError:
+    HAVE_TORTUGA_EXCEPTIONS = False
+
+
+@unittest.skipUnless(HAVE_TORTUGA_EXCEPTIONS, 'tortuga not installed')
+class TestActionPolicy(unittest.TestCase):
+    def setUp(self):
+        self.groups = ExclusionGroups()
+
+    def _check(self, policy, conditionMet, now, lastSuccess=None,
+               ruleId='app/rule'):
+        return policy.check(
+            conditionMet, now, lastSuccess, ruleId, self.groups)[0]
+
+    def test_hold(self):
+        policy = ActionPolicy(holdCount=2, holdTime=60)
+
+        self.assertFalse(self._check(policy, True, 0))
+        self.assertFalse(self._check(policy, True, 30))
+        self.assertTrue(self._check(policy, True, 60))
+
+        # Unmet conditions start over
+        self.assertFalse(self._check(policy, False, 70))
+        self.assertFalse(self._check(policy, True, 200))
+
+    def test_cooldown(self):
+        policy = ActionPolicy(cooldown=300)
+
+        self.assertFalse(self._check(policy, True, 1000, lastSuccess=800))
+        self.assertTrue(self._check(policy, True, 1100, lastSuccess=800))
+
+    def test_rate_limit(self):
+        policy = ActionPolicy(maxActions=2, maxActionsPeriod=3600)
+
+        self.assertTrue(self._check(policy, True, 0))
+        self.assertTrue(self._check(policy, True, 1))
+        self.assertFalse(self._check(policy, True, 2))
+
+        # One token refilled after maxActionsPeriod / maxActions
+        self.assertTrue(self._check(policy, True, 1801))
+        self.assertFalse(self._check(policy, True, 1802))
+
+    def test_exclusion_group(self):
+        burst = ActionPolicy(exclusionGroup='burst.q', exclusionInterval=900)
+        unburst = ActionPolicy(
+            exclusionGroup='burst.q', exclusionInterval=900)
+
+        self.assertTrue(self._check(burst, True, 0, ruleId='app/burst'))
+        self.assertTrue(self._check(burst, True, 10, ruleId='app/burst'))
+        self.assertFalse(self._check(unburst, True, 600, ruleId='app/unburst'))
+        self.assertTrue(self._check(unburst, True, 911, ruleId='app/unburst'))
+        self.assertFalse(self._check(burst, True, 920, ruleId='app/burst'))
+
+
+if __name__ == '__main__':
+    unittest.main()
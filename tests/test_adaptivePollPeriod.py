@@ -0,0 +1,64 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+try:
+    from tortuga.exceptions.invalidArgument import InvalidArgument
+    from tortuga.rule.adaptivePollPeriod import AdaptivePollPeriod, \
+        getTriggerDistance
+    HAVE_TORTUGA_EXCEPTIONS = True
+except ImportError:
+    HAVE_TORTUGA_EXCEPTIONS = False
+
+
+@unittest.skipUnless(HAVE_TORTUGA_EXCEPTIONS, 'tortuga not installed')
+class TestAdaptivePollPeriod(unittest.TestCase):
+    def test_grow_and_shrink(self):
+        adaptive = AdaptivePollPeriod(30, 600, 300)
+
+        # Stable output grows the period up to the maximum
+        self.assertEqual(adaptive.observe(('0',), 5.0, False), 450)
+        self.assertEqual(adaptive.observe(('0',), 5.0, False), 600)
+        self.assertEqual(adaptive.observe(('0',), 5.0, False), 600)
+
+        # Changed metrics, met conditions or metrics close to the trigger
+        # value shrink it down to the minimum
+        self.assertEqual(adaptive.observe(('4',), 5.0, False), 300)
+        self.assertEqual(adaptive.observe(('4',), 5.0, True), 150)
+        self.assertEqual(adaptive.observe(('4',), 0.05, False), 75)
+        self.assertEqual(adaptive.observe(('8',), 5.0, False), 37.5)
+        self.assertEqual(adaptive.observe(('9',), 5.0, False), 30)
+
+    def test_trigger_distance(self):
+        self.assertAlmostEqual(getTriggerDistance(95.0, '100'), 0.05)
+        self.assertAlmostEqual(getTriggerDistance('0.5', 0), 0.5)
+        self.assertIsNone(getTriggerDistance('busy', '100'))
+
+    def test_from_application_monitor(self):
+        self.assertIsNone(
+            AdaptivePollPeriod.fromApplicationMonitor({'pollPeriod': '300'}))
+
+        adaptive = AdaptivePollPeriod.fromApplicationMonitor(
+            {'pollPeriod': '300', 'minPollPeriod': '60'})
+
+        self.assertEqual(
+            (adaptive.minPollPeriod, adaptive.maxPollPeriod, adaptive.period),
+            (60, 300, 300))
+
+        for appMonitor in ({'minPollPeriod': '60'},
+                           {'minPollPeriod': '600', 'maxPollPeriod': '60'},
+                           {'pollPeriod': '300', 'maxPollPeriod': 'x'}):
+            with self.assertRaises(InvalidArgument):
+                AdaptivePollPeriod.fromApplicationMonitor(appMonitor)
@@ -0,0 +1,69 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from tortuga.rule.applicationData import SpooledApplicationData, \
+    readApplicationData, releaseApplicationData
+
+
+class TestApplicationData(unittest.TestCase):
+    def setUp(self):
+        self.spoolDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.spoolDir)
+
+    def test_small_document_in_memory(self):
+        document = b'<resourceData/>'
+
+        self.assertEqual(
+            readApplicationData(
+                io.BytesIO(document), len(document), spoolSize=100,
+                spoolDir=self.spoolDir), document)
+
+        # Unknown length
+        self.assertEqual(
+            readApplicationData(
+                io.BytesIO(document), spoolSize=100,
+                spoolDir=self.spoolDir), document)
+
+        self.assertEqual(os.listdir(self.spoolDir), [])
+
+    def test_large_document_spooled(self):
+        document = b'<resourceData>' + b' ' * 1000 + b'</resourceData>'
+
+        data = readApplicationData(
+            io.BytesIO(document), len(document), spoolSize=100,
+            spoolDir=self.spoolDir)
+
+        self.assertIsInstance(data, SpooledApplicationData)
+        self.assertEqual(len(data), len(document))
+        self.assertEqual(data.getBuffer()[:14], b'<resourceData>')
+        self.assertEqual(data.read(), document)
+
+        # Copies for worker processes leave the file alone
+        copy = pickle.loads(pickle.dumps(data))
+        copy.close()
+
+        self.assertTrue(os.path.exists(data.path))
+
+        releaseApplicationData(data)
+
+        self.assertFalse(os.path.exists(data.path))
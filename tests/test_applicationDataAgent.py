@@ -0,0 +1,165 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from tortuga.rule.applicationDataAgent import ApplicationDataAgent
+
+
+class FakePoster(object):
+    def __init__(self, failAfter=None):
+        self.down = False
+        # documents accepted before going down
+        self.failAfter = failAfter
+        self.documents = []
+
+    def __call__(self, applicationName, document):
+        if self.down or len(self.documents) == self.failAfter:
+            raise Exception('web service unavailable')
+
+        self.documents.append((applicationName, document))
+
+
+class TestApplicationDataAgent(unittest.TestCase):
+    def setUp(self):
+        self.spoolDir = tempfile.mkdtemp()
+        self.poster = FakePoster()
+        self.agent = ApplicationDataAgent(
+            self.poster, 'app', self.spoolDir, stopInterval=0.05)
+
+    def tearDown(self):
+        shutil.rmtree(self.spoolDir)
+
+    def test_stream_batches_and_skips_duplicates(self):
+        self.agent.addStreamSource(io.BytesIO(b'<a/>\0<a/>\0<b/>\0<a/>'))
+
+        self.agent.run()
+
+        self.assertEqual(
+            [document for _, document in self.poster.documents],
+            [b'<a/>', b'<b/>', b'<a/>'])
+        self.assertEqual(self.agent.skipped, 1)
+
+    def test_run_until_every_stream_ends(self):
+        readFd, writeFd = os.pipe()
+
+        self.agent.addStreamSource(io.BytesIO(b'<a/>'))
+
+        with os.fdopen(readFd, 'rb') as stream:
+            self.agent.addStreamSource(stream)
+
+            agent = threading.Thread(target=self.agent.run)
+            agent.start()
+
+            # First stream ended, second still open
+            for _ in range(500):
+                if self.agent.posted:
+                    break
+
+                agent.join(0.01)
+
+            agent.join(0.2)
+
+            self.assertTrue(agent.is_alive())
+
+            with os.fdopen(writeFd, 'wb') as fp:
+                fp.write(b'<b/>')
+
+            agent.join(5)
+
+        self.assertFalse(agent.is_alive())
+        self.assertEqual(
+            [document for _, document in self.poster.documents],
+            [b'<a/>', b'<b/>'])
+
+    def test_spool_while_down_and_flush_in_order(self):
+        self.poster.down = True
+
+        self.agent.processBatch([b'<a/>'])
+        self.agent.processBatch([b'<b/>'])
+
+        self.assertEqual(len(os.listdir(self.spoolDir)), 2)
+        self.assertEqual(self.poster.documents, [])
+
+        self.poster.down = False
+
+        self.agent.processBatch([b'<c/>'])
+
+        self.assertEqual(os.listdir(self.spoolDir), [])
+        self.assertEqual(
+            [document for _, document in self.poster.documents],
+            [b'<a/>', b'<b/>', b'<c/>'])
+
+    def test_spool_documents_not_posted(self):
+        self.poster.failAfter = 1
+
+        self.agent.processBatch([b'<a/>', b'<b/>', b'<c/>'])
+
+        self.assertEqual(self.agent.posted, 1)
+        self.assertEqual(self.agent.spooled, 2)
+
+        self.poster.failAfter = None
+
+        self.agent.processBatch([])
+
+        self.assertEqual(
+            [document for _, document in self.poster.documents],
+            [b'<a/>', b'<b/>', b'<c/>'])
+
+    @unittest.skipUnless(hasattr(os, 'mkfifo'), 'FIFOs not supported')
+    def test_fifo_writer_sessions_and_stop(self):
+        fifo = os.path.join(self.spoolDir, 'fifo')
+
+        os.mkfifo(fifo)
+
+        self.agent.addFifoSource(fifo, pollInterval=0.05)
+
+        agent = threading.Thread(target=self.agent.run)
+        agent.start()
+
+        for document in (b'<a/>', b'<b/>'):
+            with open(fifo, 'wb') as fp:
+                fp.write(document)
+
+            # one writer at a time
+            for _ in range(500):
+                if (self.agent.posted and
+                        self.poster.documents[-1][1] == document):
+                    break
+
+                agent.join(0.01)
+
+        # Stops although no writer is connected
+        self.agent.stop()
+
+        agent.join(5)
+
+        self.assertFalse(agent.is_alive())
+
+        for source in self.agent._sources:
+            source.join(5)
+
+            self.assertFalse(source.is_alive())
+        self.assertEqual(
+            [document for _, document in self.poster.documents],
+            [b'<a/>', b'<b/>'])
+
+
+if __name__ == '__main__':
+    unittest.main()
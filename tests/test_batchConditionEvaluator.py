@@ -0,0 +1,138 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import operator
+import unittest
+from unittest import mock
+
+from tortuga.rule import batchConditionEvaluator
+from tortuga.rule.batchConditionEvaluator import BatchConditionEvaluator
+
+
+Condition = collections.namedtuple(
+    'Condition', 'metricXPath evaluationOperator triggerValue')
+
+Rule = collections.namedtuple('Rule', 'name conditions xPathVariables')
+
+XPATHS = {
+    '__neededNodes__': 'number(resourceData/neededNodes)',
+    '__extraNodes__': 'number(resourceData/extraNodes)',
+}
+
+OPERATORS = {
+    '>': operator.gt, '>=': operator.ge, '<': operator.lt,
+    '<=': operator.le, '==': operator.eq, '!=': operator.ne,
+}
+
+
+def getRules():
+    rules = []
+
+    for tier in range(0, 40, 4):
+        for op in OPERATORS:
+            rules.append(Rule(
+                'needed%s%d' % (op, tier),
+                (Condition('__neededNodes__', op, str(tier)),),
+                tuple(XPATHS.items())))
+
+        rules.append(Rule(
+            'band%d' % tier,
+            (Condition('__neededNodes__', '>=', str(tier)),
+             Condition('__neededNodes__', '<', str(tier + 4)),
+             Condition('__extraNodes__', '==', '0')),
+            tuple(XPATHS.items())))
+
+    # Left to the per-condition callback
+    rules.append(Rule(
+        'scalar',
+        (Condition('__neededNodes__', '>', '__extraNodes__'),),
+        tuple(XPATHS.items())))
+
+    rules.append(Rule('always', (), ()))
+
+    return rules
+
+
+def getExpected(rules, values):
+    fired = []
+
+    for rule in rules:
+        met = True
+
+        for condition in rule.conditions:
+            metric = values[XPATHS[condition.metricXPath]]
+
+            triggerValue = values[XPATHS[condition.triggerValue]] \
+                if condition.triggerValue in XPATHS \
+                else float(condition.triggerValue)
+
+            if not OPERATORS[condition.evaluationOperator](
+                    metric, triggerValue):
+                met = False
+
+        if met:
+            fired.append(rule.name)
+
+    return fired
+
+
+class TestBatchConditionEvaluator(unittest.TestCase):
+    def _check(self):
+        rules = getRules()
+
+        evaluator = BatchConditionEvaluator(rules)
+
+        for needed in (0.0, 3.0, 4.0, 17.5, 40.0):
+            for extra in (0.0, 2.0):
+                values = {
+                    XPATHS['__neededNodes__']: needed,
+                    XPATHS['__extraNodes__']: extra,
+                }
+
+                scalarCalls = []
+
+                def evaluateCondition(rule, condition):
+                    scalarCalls.append(rule.name)
+
+                    return OPERATORS[condition.evaluationOperator](
+                        values[XPATHS[condition.metricXPath]],
+                        values[XPATHS[condition.triggerValue]])
+
+                fired = [rule.name for rule in evaluator.evaluate(
+                    values.__getitem__, evaluateCondition)]
+
+                self.assertEqual(fired, getExpected(rules, values))
+                self.assertEqual(scalarCalls, ['scalar'])
+
+    @unittest.skipIf(batchConditionEvaluator.numpy is None,
+                     'NumPy not installed')
+    def test_numpy(self):
+        self._check()
+
+    def test_bisect(self):
+        with mock.patch.object(batchConditionEvaluator, 'numpy', None):
+            self._check()
+
+    def test_undefined_metric(self):
+        rules = getRules()
+
+        fired = BatchConditionEvaluator(rules).evaluate(
+            lambda xPath: float('nan'), lambda rule, condition: False)
+
+        self.assertEqual([rule.name for rule in fired], ['always'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import subprocess
+import sys
+import unittest
+
+try:
+    import tortuga.cli.tortugaCli
+    HAVE_TORTUGA_CLI = True
+except ImportError:
+    HAVE_TORTUGA_CLI = False
+
+
+BENCHMARK = os.path.join(
+    os.path.dirname(__file__), '..', 'benchmarks', 'cli_startup.py')
+
+
+@unittest.skipUnless(HAVE_TORTUGA_CLI, 'tortuga CLI framework not installed')
+class TestCliStartup(unittest.TestCase):
+    def test_post_application_data_startup_budget(self):
+        """post-application-data must start within the cold-start budget"""
+
+        p = subprocess.run([sys.executable, BENCHMARK, '--runs', '5'],
+                           stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+        self.assertEqual(p.returncode, 0, p.stdout.decode())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+try:
+    from tortuga.objects.xPathVariable import XPathVariable
+    from tortuga.rule.compiledRule import CompiledRule
+    from tortuga.rule.objects.applicationMonitor import ApplicationMonitor
+    from tortuga.rule.objects.rule import Rule
+    from tortuga.rule.objects.ruleCondition import RuleCondition
+    HAVE_TORTUGA_OBJECTS = True
+except ImportError:
+    HAVE_TORTUGA_OBJECTS = False
+
+
+@unittest.skipUnless(HAVE_TORTUGA_OBJECTS, 'tortuga objects not installed')
+class TestCompiledRule(unittest.TestCase):
+    def _getRule(self):
+        rule = Rule('simple_burst', 'basicBurst', 'Burst nodes')
+
+        appMonitor = ApplicationMonitor('poll', pollPeriod='60')
+        appMonitor.setQueryCommand('get-burst-data')
+        appMonitor.setActionCommand('burst __neededNodes__')
+        appMonitor.setMaxActionInvocations('2')
+
+        rule.setApplicationMonitor(appMonitor)
+
+        v = XPathVariable()
+        v.setName('__neededNodes__')
+        v.setXPath('number(resourceData/neededNodes)')
+
+        rule.addXPathVariable(v)
+
+        rule.addCondition(RuleCondition('__neededNodes__', '>', '10'))
+
+        return rule
+
+    def test_round_trip(self):
+        compiled = CompiledRule(self._getRule())
+
+        self.assertEqual(compiled.ruleId, 'simple_burst/basicBurst')
+        self.assertEqual(compiled.maxActionInvocations, 2)
+        self.assertEqual(
+            compiled.xPathVariables,
+            (('__neededNodes__', 'number(resourceData/neededNodes)'),))
+
+        rule = compiled.toRule()
+
+        self.assertEqual(rule.getName(), 'basicBurst')
+        self.assertEqual(rule.getDescription(), 'Burst nodes')
+        self.assertTrue(rule.isStatusEnabled())
+        self.assertIsNone(rule.getTotalInvocations())
+
+        appMonitor = rule.getApplicationMonitor()
+
+        self.assertEqual(appMonitor.getPollPeriod(), '60')
+        self.assertEqual(appMonitor.getQueryCommand(), 'get-burst-data')
+        self.assertEqual(appMonitor.getActionCommand(), 'burst __neededNodes__')
+        self.assertIsNone(appMonitor.getTotalActionInvocations())
+
+        condition = rule.getConditionList()[0]
+
+        self.assertEqual(condition.getEvaluationOperator(), '>')
+        self.assertEqual(condition.getTriggerValue(), '10')
+
+    def test_counters(self):
+        compiled = CompiledRule(self._getRule())
+
+        compiled.ruleInvoked()
+        compiled.actionInvocationSucceeded()
+        compiled.actionInvocationFailed()
+
+        rule = compiled.toRule()
+
+        self.assertEqual(rule.getTotalInvocations(), 1)
+
+        appMonitor = rule.getApplicationMonitor()
+
+        self.assertEqual(appMonitor.getTotalActionInvocations(), 2)
+        self.assertEqual(appMonitor.getSuccessfulActionInvocations(), 1)
+        self.assertEqual(appMonitor.getFailedActionInvocations(), 1)
+        self.assertIsNone(appMonitor.getTotalQueryInvocations())
+
+        # Counters persisted in the rule file are picked up again
+        self.assertEqual(
+            CompiledRule(rule).getSuccessfulActionInvocations(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
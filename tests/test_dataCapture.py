@@ -0,0 +1,79 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    from tortuga.rule.applicationData import readApplicationData
+    from tortuga.rule.dataCapture import CaptureWriter, readCapture
+    HAVE_TORTUGA_EXCEPTIONS = True
+except ImportError:
+    HAVE_TORTUGA_EXCEPTIONS = False
+
+
+@unittest.skipUnless(HAVE_TORTUGA_EXCEPTIONS, 'tortuga not installed')
+class TestDataCapture(unittest.TestCase):
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpDir, 'capture.gz')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    def test_round_trip(self):
+        document = b'<resourceData>' + b' ' * 1000 + b'</resourceData>'
+
+        spooled = readApplicationData(
+            io.BytesIO(document), len(document), spoolSize=100,
+            spoolDir=self.tmpDir)
+
+        writer = CaptureWriter(self.path)
+        writer.write('simple_burst', b'<a/>\n<b/>', time_=1.5)
+        writer.write('my app/1', '<c/>', time_=2.0)
+        writer.write('simple_burst', spooled, time_=3.0)
+        writer.close()
+
+        spooled.close()
+
+        # Appending to an existing log
+        writer = CaptureWriter(self.path)
+        writer.write('simple_burst', b'', time_=4.0)
+        writer.close()
+
+        self.assertEqual(list(readCapture(self.path)), [
+            (1.5, 'simple_burst', b'<a/>\n<b/>'),
+            (2.0, 'my app/1', b'<c/>'),
+            (3.0, 'simple_burst', document),
+            (4.0, 'simple_burst', b''),
+        ])
+
+    def test_unclosed_log(self):
+        writer = CaptureWriter(self.path)
+        writer.write('simple_burst', b'<a/>', time_=1.0)
+        writer.write('simple_burst', b'<b/>', time_=2.0)
+
+        # Readable up to the last record while still being written
+        self.assertEqual(
+            [data for _, _, data in readCapture(self.path)],
+            [b'<a/>', b'<b/>'])
+
+        writer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pickle
+import unittest
+
+from tortuga.rule.evaluationPool import EvaluationPool, getWorkerRules, \
+    installWorkerRules
+
+
+def _getRule(applicationName, rules, index):
+    return applicationName, rules[index]
+
+
+class TestEvaluationPool(unittest.TestCase):
+    def test_worker_rules_built_once_per_generation(self):
+        builds = []
+
+        def build(rules):
+            builds.append(rules)
+
+            return tuple(rules)
+
+        pickledRules = pickle.dumps(['rule1', 'rule2'])
+
+        installWorkerRules('app', 1, pickledRules, build)
+        installWorkerRules('app', 1, pickledRules, build)
+
+        self.assertEqual(getWorkerRules('app', 1), ('rule1', 'rule2'))
+        self.assertEqual(len(builds), 1)
+
+        # Rules of the application changed
+        self.assertRaises(KeyError, getWorkerRules, 'app', 2)
+
+        installWorkerRules('app', 2, pickle.dumps(['rule1']), build)
+
+        self.assertEqual(getWorkerRules('app', 2), ('rule1',))
+        self.assertEqual(len(builds), 2)
+
+    def test_rules_shipped_once_per_generation(self):
+        pool = EvaluationPool(_getRule, tuple, workers=1)
+
+        try:
+            for _ in range(3):
+                self.assertEqual(
+                    pool.evaluate('app', 1, ['rule1', 'rule2'], 1),
+                    ('app', 'rule2'))
+
+            self.assertEqual(pool.rulesShipped, 1)
+
+            self.assertEqual(
+                pool.evaluate('app', 2, ['rule3'], 0), ('app', 'rule3'))
+            self.assertEqual(pool.rulesShipped, 2)
+
+            # Raised in the worker
+            self.assertRaises(IndexError, pool.evaluate, 'app', 2, [], 5)
+
+            # Workers started again after shutdown get the rules again
+            pool.shutdown()
+
+            self.assertEqual(
+                pool.evaluate('app', 2, ['rule3'], 0), ('app', 'rule3'))
+            self.assertEqual(pool.rulesShipped, 3)
+        finally:
+            pool.shutdown()
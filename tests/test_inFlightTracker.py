@@ -0,0 +1,102 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import unittest
+
+try:
+    from tortuga.exceptions.invalidArgument import InvalidArgument
+    from tortuga.rule.inFlightTracker import InFlightPolicy, InFlightTracker
+    HAVE_TORTUGA_EXCEPTIONS = True
+except ImportError:
+    HAVE_TORTUGA_EXCEPTIONS = False
+
+
+class _Rule(object):
+    def __init__(self, inFlightPolicy=None):
+        self.ruleId = 'app/rule'
+        self.inFlightPolicy = inFlightPolicy
+        self.counts = collections.Counter()
+
+    def actionQueued(self):
+        self.counts['queued'] += 1
+
+    def actionSuperseded(self):
+        self.counts['superseded'] += 1
+
+    def actionSkippedInFlight(self):
+        self.counts['skipped'] += 1
+
+
+@unittest.skipUnless(HAVE_TORTUGA_EXCEPTIONS, 'tortuga not installed')
+class TestInFlightTracker(unittest.TestCase):
+    def test_queue_latest(self):
+        rule = _Rule()
+        tracker = InFlightTracker()
+
+        self.assertTrue(tracker.acquire(rule, 'cmd 1'))
+        self.assertFalse(tracker.acquire(rule, 'cmd 2'))
+        self.assertFalse(tracker.acquire(rule, 'cmd 3'))
+
+        # Latest queued action runs in the released slot
+        self.assertEqual(tracker.release(rule, 'cmd 1'), (rule, 'cmd 3'))
+        self.assertEqual(tracker.getRunningCount(rule.ruleId), 1)
+        self.assertIsNone(tracker.release(rule, 'cmd 3'))
+        self.assertEqual(tracker.getRunningCount(), 0)
+
+        self.assertEqual(rule.counts, {'queued': 2, 'superseded': 1})
+
+    def test_skip(self):
+        rule = _Rule(InFlightPolicy(mode='skip'))
+        tracker = InFlightTracker()
+
+        self.assertTrue(tracker.acquire(rule, 'cmd'))
+        self.assertFalse(tracker.acquire(rule, 'cmd'))
+        self.assertIsNone(tracker.release(rule, 'cmd'))
+        self.assertTrue(tracker.acquire(rule, 'cmd'))
+
+        self.assertEqual(rule.counts, {'skipped': 1})
+
+    def test_parallel(self):
+        rule = _Rule(InFlightPolicy(mode='parallel', maxInFlight=2))
+        tracker = InFlightTracker()
+
+        self.assertTrue(tracker.acquire(rule, 'cmd'))
+        self.assertTrue(tracker.acquire(rule, 'cmd'))
+        self.assertFalse(tracker.acquire(rule, 'cmd'))
+        self.assertEqual(tracker.getRunningCount(rule.ruleId), 2)
+
+    def test_key_command(self):
+        rule = _Rule(InFlightPolicy(mode='skip', key='command'))
+        tracker = InFlightTracker()
+
+        self.assertTrue(tracker.acquire(rule, 'cmd 1'))
+        self.assertTrue(tracker.acquire(rule, 'cmd 2'))
+        self.assertFalse(tracker.acquire(rule, 'cmd 1'))
+        self.assertEqual(tracker.getRunningCount(rule.ruleId), 2)
+
+    def test_from_application_monitor(self):
+        self.assertIsNone(InFlightPolicy.fromApplicationMonitor({}))
+
+        policy = InFlightPolicy.fromApplicationMonitor({'maxInFlight': '4'})
+
+        self.assertEqual(
+            (policy.mode, policy.maxInFlight, policy.key),
+            ('parallel', 4, 'rule'))
+
+        for appMonitor in ({'inFlightPolicy': 'wait'},
+                           {'inFlightKey': 'node'},
+                           {'maxInFlight': '0'}):
+            with self.assertRaises(InvalidArgument):
+                InFlightPolicy.fromApplicationMonitor(appMonitor)
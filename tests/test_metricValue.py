@@ -0,0 +1,95 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import pickle
+import unittest
+
+from tortuga.rule.metricValue import MetricExpression, compareValues, \
+    formatValue, isUndefined
+
+
+Node = collections.namedtuple('Node', 'content')
+
+
+class TestMetricValue(unittest.TestCase):
+    def test_numbers(self):
+        self.assertTrue(compareValues(12.0, '>', '10'))
+        self.assertTrue(compareValues('12', '>', '9'))
+        self.assertTrue(compareValues(4.0, '==', '4'))
+        self.assertFalse(compareValues(4.0, '!=', 4))
+        self.assertTrue(compareValues(True, '>', '0'))
+
+    def test_strings(self):
+        self.assertTrue(compareValues('up', '==', 'up'))
+        self.assertTrue(compareValues('abc', '<', 'abd'))
+        self.assertFalse(compareValues('down', '==', 'up'))
+
+    def test_node_set(self):
+        nodes = [Node('3'), Node('15')]
+
+        self.assertTrue(compareValues(nodes, '>', '10'))
+        self.assertFalse(compareValues(nodes, '>', '20'))
+        self.assertEqual(formatValue(nodes), '3 15')
+
+    def test_unknown_operator(self):
+        self.assertRaises(ValueError, compareValues, 1.0, '=>', '0')
+
+    def test_undefined(self):
+        for value in (None, '', 'nan', float('nan'), []):
+            self.assertTrue(isUndefined(value))
+
+        for value in (0.0, '0', [Node('')]):
+            self.assertFalse(isUndefined(value))
+
+    def test_format(self):
+        self.assertEqual(formatValue(12.0), '12.0')
+        self.assertEqual(formatValue('burst.q'), 'burst.q')
+
+    def test_expression(self):
+        expression = MetricExpression(
+            '__a__ - __b__', ['__a__', '__b__', '__c__'])
+
+        self.assertEqual(expression.variableNames, ('__a__', '__b__'))
+
+        value = expression.evaluate({'__a__': 15.0, '__b__': '6'})
+
+        self.assertEqual(value, 9.0)
+        # Numeric, not '9.0' > '10' as text
+        self.assertFalse(compareValues(value, '>', '10'))
+
+        copy = pickle.loads(pickle.dumps(expression))
+
+        self.assertEqual(copy.evaluate({'__a__': 15.0, '__b__': 6.0}), 9.0)
+
+        self.assertEqual(
+            MetricExpression('-(__a__ + 1) * 2 // 4 % 5', ['__a__']).evaluate(
+                {'__a__': [Node('3')]}),
+            3.0)
+
+    def test_expression_undefined(self):
+        expression = MetricExpression('__a__ / __b__', ['__a__', '__b__'])
+
+        self.assertIsNone(expression.evaluate({'__a__': 1.0}))
+        self.assertIsNone(expression.evaluate({'__a__': 1.0, '__b__': 'x'}))
+        self.assertIsNone(expression.evaluate({'__a__': 1.0, '__b__': 0.0}))
+
+    def test_invalid_expression(self):
+        for text in ('__a__.q', '__a__ ** 2', 'abs(__a__)', '__a__ - x',
+                     '__a__ -', '__a__ < 1', "__a__ + 'x'", '__a__ + True'):
+            self.assertRaises(ValueError, MetricExpression, text, ['__a__'])
+
+
+if __name__ == '__main__':
+    unittest.main()
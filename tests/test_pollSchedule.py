@@ -0,0 +1,63 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import unittest
+
+from tortuga.rule.pollSchedule import PollSchedule, getPhaseOffset
+
+
+class TestPollSchedule(unittest.TestCase):
+    def test_spread(self):
+        schedule = PollSchedule()
+
+        ruleIds = ['simple_burst/rule%d' % (n) for n in range(100)]
+
+        # Rules enabled at the same instant poll at distinct offsets
+        firstPolls = sorted(
+            schedule.getInitialDelay(ruleId, 300.0, now=1000.0)
+            for ruleId in ruleIds)
+
+        self.assertTrue(all(0 < delay <= 300 for delay in firstPolls))
+        self.assertGreater(firstPolls[-1] - firstPolls[0], 240)
+        self.assertEqual(len(set(firstPolls)), len(ruleIds))
+
+    def test_next_poll_keeps_phase(self):
+        schedule = PollSchedule()
+
+        ruleId = 'simple_burst/poller'
+        slot = getPhaseOffset(ruleId, 300.0) + 3000.0
+
+        # Poll finished 20 seconds late: next slot is unchanged
+        self.assertAlmostEqual(
+            schedule.getNextDelay(ruleId, 300.0, now=slot + 20), 280.0)
+
+        # Poll ran 10 seconds early: not polled again 10 seconds later
+        self.assertAlmostEqual(
+            schedule.getNextDelay(ruleId, 300.0, now=slot - 10), 310.0)
+
+    def test_jitter(self):
+        schedule = PollSchedule(
+            spread=False, jitter=0.1, random_=random.Random(1))
+
+        delays = [schedule.getNextDelay('app/rule', 300.0) for _ in range(50)]
+
+        self.assertTrue(all(270 <= delay <= 330 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+    def test_disabled(self):
+        schedule = PollSchedule(spread=False)
+
+        self.assertEqual(schedule.getInitialDelay('app/rule', 300.0), 300.0)
+        self.assertEqual(schedule.getNextDelay('app/rule', 300.0), 300.0)
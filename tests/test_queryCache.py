@@ -0,0 +1,80 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+import unittest
+
+try:
+    from tortuga.rule.queryCache import QueryCache, SingleFlight
+    HAVE_TORTUGA_EXCEPTIONS = True
+except ImportError:
+    HAVE_TORTUGA_EXCEPTIONS = False
+
+
+@unittest.skipUnless(HAVE_TORTUGA_EXCEPTIONS, 'tortuga not installed')
+class TestQueryCache(unittest.TestCase):
+    def setUp(self):
+        self.freed = []
+        self.cache = QueryCache(free=self.freed.append)
+
+    def test_max_age(self):
+        result = self.cache.store('qstat', '<a/>', maxAge=30, now=100)
+        self.cache.release(result)
+
+        self.assertIs(self.cache.acquire('qstat', 30, now=120), result)
+        self.assertIsNone(self.cache.acquire('qstat', 10, now=120))
+        self.assertIsNone(self.cache.acquire('qhost', 30, now=120))
+
+    def test_document_freed_when_replaced_and_unused(self):
+        old = self.cache.store('qstat', '<a/>', maxAge=30, now=100)
+
+        self.assertEqual(old.getDocument(lambda stdout: 'doc1'), 'doc1')
+        self.assertEqual(old.getDocument(lambda stdout: 'doc2'), 'doc1')
+
+        new = self.cache.store('qstat', '<b/>', maxAge=30, now=110)
+
+        # Still in use
+        self.assertEqual(self.freed, [])
+
+        self.cache.release(old)
+
+        self.assertEqual(self.freed, ['doc1'])
+
+        self.cache.release(new)
+
+    def test_single_flight(self):
+        flight = SingleFlight()
+        runs = []
+        results = []
+
+        def query():
+            runs.append(1)
+            time.sleep(0.2)
+            return 'output'
+
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(flight.do('qstat', query)))
+            for _ in range(4)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(sorted(results), [('output', False)] +
+                         [('output', True)] * 3)
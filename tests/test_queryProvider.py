@@ -0,0 +1,96 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import unittest
+
+try:
+    from tortuga.exceptions.invalidArgument import InvalidArgument
+    from tortuga.rule.providers.gridEngine import GridEngineQueryProvider, \
+        getJobSlots, isQueueRequested, iterElements
+    from tortuga.rule.queryProvider import getQueryProvider, \
+        parseQueryProvider
+    HAVE_TORTUGA_EXCEPTIONS = True
+except ImportError:
+    HAVE_TORTUGA_EXCEPTIONS = False
+
+
+JOBS = b'''<?xml version='1.0'?>
+<detailed_job_info>
+  <djob_info>
+    <element>
+      <JB_job_number>1</JB_job_number>
+      <JB_ja_structure>
+        <task_id_range>
+          <RN_min>1</RN_min><RN_max>10</RN_max><RN_step>1</RN_step>
+        </task_id_range>
+      </JB_ja_structure>
+      <JB_hard_queue_list>
+        <destin_ident_list><QR_name>burst.q</QR_name></destin_ident_list>
+      </JB_hard_queue_list>
+    </element>
+    <element>
+      <JB_job_number>2</JB_job_number>
+      <JB_pe_range>
+        <element><RN_min>4</RN_min><RN_max>8</RN_max></element>
+      </JB_pe_range>
+    </element>
+  </djob_info>
+</detailed_job_info>
+'''
+
+
+@unittest.skipUnless(HAVE_TORTUGA_EXCEPTIONS, 'tortuga not installed')
+class TestQueryProvider(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(
+            parseQueryProvider('gridengine queueName=burst.q "cellDir=/a b"'),
+            ('gridengine', {'queueName': 'burst.q', 'cellDir': '/a b'}))
+
+        for spec in ('', 'gridengine queueName', 'gridengine =x'):
+            with self.assertRaises(InvalidArgument):
+                parseQueryProvider(spec)
+
+    def test_get_provider(self):
+        provider = getQueryProvider(
+            'gridengine queueName=burst.q softwareProfile=execd'
+            ' cellDir=/opt/uge slotsPerHost=4')
+
+        self.assertIsInstance(provider, GridEngineQueryProvider)
+        self.assertEqual(provider.slotsPerHost, 4)
+
+        for spec in ('nosuchprovider',
+                     'tortuga.rule.queryProvider.parseQueryProvider',
+                     'gridengine queueName=burst.q',
+                     'gridengine queueName=burst.q softwareProfile=execd'
+                     ' cellDir=/opt/uge slotsPerHost=0',
+                     'gridengine queueName=burst.q softwareProfile=execd'
+                     ' cellDir=/opt/uge color=red'):
+            with self.assertRaises(InvalidArgument):
+                getQueryProvider(spec)
+
+    def test_iter_jobs(self):
+        jobs = [
+            (jobElement.findtext('JB_job_number'),
+             isQueueRequested(jobElement, 'burst.q'),
+             getJobSlots(jobElement))
+            for jobElement in iterElements(
+                io.BytesIO(JOBS), 'djob_info', 'element')
+        ]
+
+        self.assertEqual(jobs, [('1', True, 10), ('2', False, 8)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+try:
+    from tortuga.exceptions.invalidArgument import InvalidArgument
+    from tortuga.rule.ruleChain import ChainGraph, ChainPolicy
+    HAVE_TORTUGA_EXCEPTIONS = True
+except ImportError:
+    HAVE_TORTUGA_EXCEPTIONS = False
+
+
+@unittest.skipUnless(HAVE_TORTUGA_EXCEPTIONS, 'tortuga not installed')
+class TestRuleChain(unittest.TestCase):
+    def test_from_application_monitor(self):
+        self.assertIsNone(ChainPolicy.fromApplicationMonitor({}))
+
+        policy = ChainPolicy.fromApplicationMonitor({'chainTo': 'burst'})
+
+        self.assertEqual(policy.applicationName, 'burst')
+        self.assertEqual(policy.output, 'action')
+        self.assertEqual(
+            policy.getAttributes(),
+            {'chainTo': 'burst', 'chainOutput': 'action'})
+
+        policy = ChainPolicy.fromApplicationMonitor({
+            'chainTo': 'burst', 'chainOutput': 'query',
+            'queryCommand': 'qstat'})
+
+        self.assertEqual(policy.output, 'query')
+
+    def test_invalid(self):
+        for appMonitor in ({'chainOutput': 'action'},
+                           {'chainTo': 'burst', 'chainOutput': 'stderr'},
+                           {'chainTo': 'burst', 'chainOutput': 'query'}):
+            with self.assertRaises(InvalidArgument):
+                ChainPolicy.fromApplicationMonitor(appMonitor)
+
+    def test_find_cycle(self):
+        graph = ChainGraph()
+
+        graph.add('a/r1', 'a', 'b')
+        graph.add('b/r1', 'b', 'c')
+
+        self.assertIsNone(graph.findCycle('a', 'd'))
+        self.assertEqual(graph.findCycle('c', 'a'), ['c', 'a', 'b', 'c'])
+        self.assertEqual(graph.findCycle('d', 'd'), ['d', 'd'])
+        self.assertEqual(graph.getDependencies(), {'a': ['b'], 'b': ['c']})
+
+        graph.remove('b/r1')
+
+        self.assertIsNone(graph.findCycle('c', 'a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    from tortuga.exceptions.invalidArgument import InvalidArgument
+    from tortuga.rule.inFlightTracker import InFlightPolicy
+    from tortuga.rule.ruleEngine import RuleEngine
+    from tortuga.rule.ruleEngineReplicated import RuleEngineReplicated
+    from tortuga.rule.ruleEngineSettings import RuleEngineSettings
+    from tortuga.rule.ruleXmlParser import RuleXmlParser
+    HAVE_TORTUGA_EXCEPTIONS = True
+except ImportError:
+    HAVE_TORTUGA_EXCEPTIONS = False
+
+
+POLL_RULE = '''<rule applicationName="test" name="poller">
+  <applicationMonitor type="poll" pollPeriod="3600">
+    <actionCommand>true</actionCommand>
+  </applicationMonitor>
+</rule>'''
+
+EXPRESSION_RULE = '''<rule applicationName="test" name="{name}">
+  <xPathVariable name="__total__" xPath="number(r/total)"/>
+  <xPathVariable name="__used__" xPath="number(r/used)"/>
+  <applicationMonitor type="receive">
+    <actionCommand>true</actionCommand>
+  </applicationMonitor>
+  <condition metricXPath="{metric}" evaluationOperator="&gt;"
+    triggerValue="10"/>
+</rule>'''
+
+
+@unittest.skipUnless(HAVE_TORTUGA_EXCEPTIONS, 'tortuga not installed')
+class TestRuleEngine(unittest.TestCase):
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir, ignore_errors=True)
+
+    def _getEngine(self, engineClass=None, **overrides):
+        settings = dict(
+            rulesDir=os.path.join(self.tmpDir, 'rules'),
+            queueFile=os.path.join(self.tmpDir, 'queue.gz'),
+            processingDelay='0')
+
+        settings.update(overrides)
+
+        return (engineClass or RuleEngine)(settings=RuleEngineSettings(
+            configFile=os.path.join(self.tmpDir, 'none.conf'),
+            overrides=settings))
+
+    def test_invalid_in_flight_settings(self):
+        engine = self._getEngine(inFlightPolicy='bogus')
+
+        # Falls back to the defaults rather than failing to start
+        self.assertEqual(
+            engine._inFlightTracker._defaultPolicy.mode,
+            InFlightPolicy().mode)
+
+        engine.stop(drainTimeout=0)
+
+    def test_no_offload_in_daemonic_process(self):
+        with mock.patch('multiprocessing.current_process') as process:
+            process.return_value.daemon = True
+
+            engine = self._getEngine(offloadThreshold='1')
+
+        self.assertIsNone(engine._evaluationPool)
+
+        engine.stop(drainTimeout=0)
+
+        engine = self._getEngine(offloadThreshold='1')
+
+        self.assertIsNotNone(engine._evaluationPool)
+
+        engine.stop(drainTimeout=0)
+
+    def test_restart_rearms_polls(self):
+        engine = self._getEngine()
+
+        engine.addRule(RuleXmlParser().parseString(POLL_RULE))
+
+        self.assertIn('test/poller', engine._pollTimerDict)
+
+        engine.stop(drainTimeout=0)
+
+        self.assertEqual(engine._pollTimerDict, {})
+
+        engine.start()
+
+        self.assertIn('test/poller', engine._pollTimerDict)
+
+        engine.stop(drainTimeout=0)
+
+    def test_metric_expression(self):
+        engine = self._getEngine()
+
+        engine.addRule(RuleXmlParser().parseString(EXPRESSION_RULE.format(
+            name='free', metric='__total__ - __used__')))
+
+        result = engine.dryRunApplicationData(
+            'test', '<r><total>15</total><used>6</used></r>')
+
+        # 9 > 10 compared as numbers, not as text
+        self.assertFalse(result['rules'][0]['conditionsMet'])
+
+        self.assertRaises(
+            InvalidArgument, engine.addRule,
+            RuleXmlParser().parseString(EXPRESSION_RULE.format(
+                name='invalid', metric='__total__.__used__')))
+
+        self.assertEqual(
+            [rule.getName() for rule in engine.getRuleList()], ['free'])
+
+        engine.stop(drainTimeout=0)
+
+    def test_replicated_restart_takes_lease(self):
+        engine = self._getEngine(
+            RuleEngineReplicated,
+            stateStore=os.path.join(self.tmpDir, 'state.db'))
+
+        self.assertTrue(engine.isActive())
+
+        engine.stop(drainTimeout=0)
+
+        self.assertFalse(engine.isActive())
+
+        engine.start()
+
+        self.assertTrue(engine.isActive())
+        self.assertTrue(engine._leaseThread.is_alive())
+
+        engine.stop(drainTimeout=0)
@@ -0,0 +1,49 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+try:
+    from tortuga.exceptions.ruleNotFound import RuleNotFound
+    from tortuga.rule.ruleEngineSharded import _getException, getShardIndex
+    HAVE_TORTUGA_EXCEPTIONS = True
+except ImportError:
+    HAVE_TORTUGA_EXCEPTIONS = False
+
+
+@unittest.skipUnless(HAVE_TORTUGA_EXCEPTIONS, 'tortuga not installed')
+class TestRuleEngineSharded(unittest.TestCase):
+    def test_shard_index(self):
+        applicationNames = ['application%d' % (n) for n in range(100)]
+
+        indexes = [getShardIndex(name, 4) for name in applicationNames]
+
+        # Same shard for an application every time, all shards used
+        self.assertEqual(
+            indexes, [getShardIndex(name, 4) for name in applicationNames])
+        self.assertEqual(set(indexes), {0, 1, 2, 3})
+
+        self.assertEqual(getShardIndex('simple_burst', 1), 0)
+
+    def test_exception(self):
+        ex = _getException(
+            'tortuga.exceptions.ruleNotFound', 'RuleNotFound',
+            'Rule [a/b] not found.')
+
+        self.assertIsInstance(ex, RuleNotFound)
+
+        self.assertEqual(
+            _getException('no.such.module', 'Error', 'failed').__class__
+            .__name__, 'TortugaException')
+
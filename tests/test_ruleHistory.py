@@ -0,0 +1,118 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pickle
+import unittest
+
+from tortuga.rule.ruleHistory import SKIPPED, SUPPRESSED, TRIGGERED, \
+    RuleHistory, getDecision
+
+
+class TestRuleHistory(unittest.TestCase):
+    def test_decision(self):
+        self.assertEqual(getDecision(False, False), SKIPPED)
+        self.assertEqual(getDecision(True, False), SUPPRESSED)
+        self.assertEqual(getDecision(True, True), TRIGGERED)
+
+    def test_ring_buffer(self):
+        history = RuleHistory(3, ['jobs'])
+
+        for n in range(5):
+            history.record(
+                float(n), TRIGGERED if n == 3 else SKIPPED, queryTime=0.5,
+                values=('%d' % (n),))
+
+        history.actionFinished(0.25, False, 2)
+
+        # Only one action per trigger is recorded
+        history.actionFinished(1.0, True, 0)
+
+        entries = history.getEntries()
+
+        self.assertEqual([entry['time'] for entry in entries],
+                         [2.0, 3.0, 4.0])
+        self.assertEqual(entries[1]['decision'], 'triggered')
+        self.assertEqual(entries[1]['action'], 'failed')
+        self.assertEqual(entries[1]['actionTime'], 0.25)
+        self.assertEqual(entries[1]['exitStatus'], 2)
+        self.assertEqual(entries[2]['values'], {'jobs': '4'})
+        self.assertEqual(entries[2]['queryTime'], 0.5)
+        self.assertIsNone(entries[2]['evaluationTime'])
+        self.assertIsNone(entries[2]['action'])
+
+    def test_action_left_buffer(self):
+        history = RuleHistory(2)
+
+        history.record(0.0, TRIGGERED)
+        history.record(1.0, SKIPPED)
+        history.record(2.0, SKIPPED)
+
+        history.actionFinished(0.1, True, 0)
+
+        self.assertEqual(
+            [entry['action'] for entry in history.getEntries()],
+            [None, None])
+
+    def test_action_of_oldest_entry(self):
+        history = RuleHistory(1)
+
+        history.record(0.0, TRIGGERED)
+
+        history.actionFinished(0.1, True, 0)
+
+        entry = history.getEntries()[0]
+
+        self.assertEqual(entry['action'], 'succeeded')
+        self.assertEqual(entry['exitStatus'], 0)
+
+        history = RuleHistory(2)
+
+        history.record(0.0, TRIGGERED)
+        history.record(1.0, SKIPPED)
+
+        history.actionFinished(0.1, False)
+
+        self.assertEqual(history.getEntries()[0]['action'], 'failed')
+
+    def test_sizes(self):
+        history = RuleHistory(2)
+
+        history.record(0.0, TRIGGERED, dataSize=120)
+
+        history.actionFinished(0.1, True, 0, 42)
+
+        history.record(1.0, SKIPPED)
+
+        entries = history.getEntries()
+
+        self.assertEqual(entries[0]['dataSize'], 120)
+        self.assertEqual(entries[0]['outputSize'], 42)
+        self.assertIsNone(entries[1]['dataSize'])
+        self.assertIsNone(entries[1]['outputSize'])
+
+    def test_pickle_is_empty(self):
+        history = RuleHistory(2, ['jobs'])
+
+        history.record(0.0, SKIPPED, digest=b'\x01' * 16)
+
+        self.assertEqual(history.getEntries()[0]['data'], '01' * 8)
+
+        copy = pickle.loads(pickle.dumps(history))
+
+        self.assertEqual(copy.getEntries(), [])
+        self.assertEqual(copy.variableNames, ('jobs',))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from tortuga.rule.ruleStateStore import RuleStateStore
+
+
+class TestRuleStateStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpDir, 'state.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    def test_lease(self):
+        active = RuleStateStore(self.path)
+        standby = RuleStateStore(self.path)
+
+        self.assertTrue(active.acquireLease('a', 10, now=100))
+        self.assertFalse(standby.acquireLease('b', 10, now=101))
+
+        # Renewal
+        self.assertTrue(active.acquireLease('a', 10, now=105))
+        self.assertFalse(standby.acquireLease('b', 10, now=114))
+        self.assertEqual(standby.getLeaseHolder(now=114), 'a')
+
+        # Expired
+        self.assertTrue(standby.acquireLease('b', 10, now=116))
+        self.assertFalse(active.acquireLease('a', 10, now=117))
+
+        standby.releaseLease('b')
+
+        self.assertIsNone(active.getLeaseHolder(now=117))
+        self.assertTrue(active.acquireLease('a', 10, now=117))
+
+    def test_rule_state(self):
+        store = RuleStateStore(self.path)
+
+        store.setNextPoll('app/poller', 1234.5)
+        store.saveCounters({'app/poller': b'\x01\x02', 'app/receiver': b''})
+
+        self.assertEqual(
+            RuleStateStore(self.path).getRuleStates(), {
+                'app/poller': (1234.5, b'\x01\x02'),
+                'app/receiver': (None, b''),
+            })
+
+        store.deleteRuleState('app/poller')
+
+        self.assertEqual(list(store.getRuleStates()), ['app/receiver'])
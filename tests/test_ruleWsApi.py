@@ -0,0 +1,150 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import http.server
+import os
+import threading
+import unittest
+
+try:
+    from tortuga.exceptions.ruleNotFound import RuleNotFound
+    from tortuga.exceptions.tortugaException import TortugaException
+    from tortuga.rule.wsapi.httpConnectionPool import HttpConnectionPool, \
+        HttpResponse
+    from tortuga.rule.wsapi.ruleWsApi import getResponseContent, getVerify
+    HAVE_TORTUGA_EXCEPTIONS = True
+except ImportError:
+    HAVE_TORTUGA_EXCEPTIONS = False
+
+
+CREDENTIALS = 'Basic ' + base64.b64encode(b'admin:password').decode('ascii')
+
+
+class SessionHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Requires the credentials unless the current session cookie is sent.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        cookie = 'session_id=%d' % (self.server.session)
+
+        if self.headers.get('Cookie') == cookie:
+            self.send_response(200)
+        elif self.headers.get('Authorization') == CREDENTIALS:
+            self.server.authCount += 1
+
+            self.send_response(200)
+            self.send_header('Set-Cookie', cookie + '; Path=/')
+        else:
+            self.send_response(401)
+
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+@unittest.skipUnless(HAVE_TORTUGA_EXCEPTIONS, 'tortuga not installed')
+class TestHttpConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.server = http.server.HTTPServer(
+            ('127.0.0.1', 0), SessionHandler)
+        self.server.session = 1
+        self.server.authCount = 0
+
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+        self.pool = HttpConnectionPool(
+            'http://127.0.0.1:%d/v1' % (self.server.server_address[1]),
+            username='admin', password='password')
+
+    def tearDown(self):
+        self.pool.close()
+
+        self.server.shutdown()
+        self.server.server_close()
+
+        self.thread.join()
+
+    def test_session_cookie(self):
+        for _ in range(3):
+            self.assertEqual(self.pool.request('POST', 'data').status, 200)
+
+        self.assertEqual(self.server.authCount, 1)
+
+        # Session expired on the server
+        self.server.session = 2
+
+        for _ in range(3):
+            self.assertEqual(self.pool.request('POST', 'data').status, 200)
+
+        self.assertEqual(self.server.authCount, 2)
+
+    def test_threads(self):
+        statuses = []
+
+        def post():
+            for _ in range(10):
+                statuses.append(self.pool.request('POST', 'data').status)
+
+        threads = [threading.Thread(target=post) for _ in range(4)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(statuses, [200] * 40)
+
+
+@unittest.skipUnless(HAVE_TORTUGA_EXCEPTIONS, 'tortuga not installed')
+class TestRuleWsApi(unittest.TestCase):
+    def test_response_content(self):
+        self.assertEqual(getResponseContent(HttpResponse(
+            200, 'OK', {}, b'{"rule": {}}')), {'rule': {}})
+
+    def test_typed_exception(self):
+        response = HttpResponse(404, 'Not Found', {
+            'tortuga-status-code': str(RuleNotFound().getErrorCode()),
+            'tortuga-status-message': 'Rule [a/b] not found.',
+        }, b'')
+
+        with self.assertRaisesRegex(RuleNotFound, r'Rule \[a/b\]'):
+            getResponseContent(response)
+
+    def test_untyped_exception(self):
+        with self.assertRaises(TortugaException) as context:
+            getResponseContent(HttpResponse(500, 'Error', {}, b''))
+
+        self.assertIs(context.exception.__class__, TortugaException)
+        self.assertEqual(str(context.exception), 'HTTP 500 Error')
+
+    def test_verify(self):
+        self.assertIs(getVerify(False), False)
+        self.assertEqual(getVerify('/etc/ca.pem'), '/etc/ca.pem')
+
+        os.environ['TORTUGA_WS_NO_VERIFY'] = '1'
+
+        try:
+            self.assertIs(getVerify(True), False)
+        finally:
+            del os.environ['TORTUGA_WS_NO_VERIFY']
@@ -0,0 +1,52 @@
+# Copyright 2008-2018 Univa Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from tortuga.rule.substitutionTemplate import SubstitutionTemplate
+
+
+class TestSubstitutionTemplate(unittest.TestCase):
+    def test_overlapping_names(self):
+        for names in (['__n__', '__nn__'], ['__nn__', '__n__']):
+            template = SubstitutionTemplate(
+                'burst __nn__ __n__ __nn__', names)
+
+            self.assertEqual(
+                template.render({'__n__': 1.0, '__nn__': 'x'}),
+                'burst x 1.0 x')
+
+        template = SubstitutionTemplate('__n__n__', ['__n__', '__n__n__'])
+
+        self.assertEqual(template.render({'__n__': 1, '__n__n__': 2}), '2')
+
+    def test_single_variable(self):
+        names = ['__neededNodes__']
+
+        self.assertEqual(
+            SubstitutionTemplate('__neededNodes__', names)
+            .getSingleVariable(), '__neededNodes__')
+        self.assertIsNone(
+            SubstitutionTemplate('__neededNodes__ + 1', names)
+            .getSingleVariable())
+        self.assertFalse(SubstitutionTemplate('10', names).hasVariables())
+
+    def test_missing_value(self):
+        template = SubstitutionTemplate('run __a__ __b__', ['__a__', '__b__'])
+
+        self.assertEqual(template.render({'__a__': 'x'}), 'run x __b__')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -19,12 +19,19 @@ import base64
 import cherrypy
 
 from tortuga.exceptions.invalidArgument import InvalidArgument
+from tortuga.rule.applicationData import readApplicationData, \
+    releaseApplicationData
+from tortuga.rule.ruleEngineSettings import RuleEngineSettings
 from tortuga.web_service.auth.decorators import authentication_required
 from tortuga.web_service.controllers.tortugaController import \
     TortugaController
 from ..ruleManager import ruleManager
 
 
+# Posted documents of at least this size are spooled to disk
+DATA_SPOOL_SIZE = RuleEngineSettings().getInt('dataSpoolSize')
+
+
 class ApplicationMonitorController(TortugaController):
     """
     Application monitor admin controller class.
@@ -37,15 +44,57 @@ class ApplicationMonitorController(TortugaController):
             'action': 'receiveApplicationData',
             'method': ['POST'],
         },
+        {
+            'name': 'applicationMonitorEvaluate',
+            'path': '/v1/applications/:(application_name)/evaluate',
+            'action': 'evaluateApplicationData',
+            'method': ['POST'],
+        },
     ]
 
+    def _readApplicationDataList(self): \
+            # pylint: disable=no-self-use
+        """
+        Returns:
+            list of documents posted as is or as JSON
+        Throws:
+            InvalidArgument
+            TypeError
+        """
+
+        if not hasattr(cherrypy.request, 'json'):
+            # Raw document, handed to the engine without copies
+            return [readApplicationData(
+                cherrypy.request.body,
+                length=cherrypy.request.body.length,
+                spoolSize=DATA_SPOOL_SIZE)]
+
+        postdata = cherrypy.request.json
+        if 'data' not in postdata:
+            raise InvalidArgument('Malformed application data')
+
+        # 'data' is either a single encoded document or a list of
+        # them (batched posts from the post-application-data agent)
+        encoded_data = postdata['data'] \
+            if isinstance(postdata['data'], list) \
+            else [postdata['data']]
+
+        return [
+            base64.decodebytes(base64.b64decode(data))
+            for data in encoded_data]
+
     @cherrypy.tools.json_out()
-    @cherrypy.tools.json_in()
+    @cherrypy.tools.json_in(force=False)
     @authentication_required()
     def receiveApplicationData(self, application_name):
         """
         Receive application monitoring data.
 
+        The document is either posted as is (any content type other than
+        JSON, e.g. application/xml), read into a single buffer or spooled
+        to disk when large, or as JSON {'data': ...} with base64 encoded
+        documents.
+
         """
         response = None
 
@@ -54,13 +103,11 @@ class ApplicationMonitorController(TortugaController):
                                                 application_name))
 
         try:
-            postdata = cherrypy.request.json
-            if 'data' not in postdata:
-                raise InvalidArgument('Malformed application data')
-            application_data = base64.decodebytes(
-                base64.b64decode(postdata['data']))
-            ruleManager.receiveApplicationData(
-                application_name, application_data)
+            application_data_list = self._readApplicationDataList()
+
+            for application_data in application_data_list:
+                ruleManager.receiveApplicationData(
+                    application_name, application_data)
 
         except TypeError:
             errmsg = 'Malformed data payload (base64 decode failed)'
@@ -75,3 +122,44 @@ class ApplicationMonitorController(TortugaController):
             response = self.errorResponse(str(ex))
 
         return self.formatResponse(response)
+
+    @cherrypy.tools.json_out()
+    @cherrypy.tools.json_in(force=False)
+    @authentication_required()
+    def evaluateApplicationData(self, application_name):
+        """
+        Evaluate a document against the rules of an application without
+        running any command or changing rule state, posted as for
+        receiveApplicationData().
+
+        """
+        application_data = None
+
+        try:
+            application_data_list = self._readApplicationDataList()
+
+            if len(application_data_list) != 1:
+                raise InvalidArgument('Expected a single document')
+
+            application_data = application_data_list[0]
+
+            response = ruleManager.dryRunApplicationData(
+                application_name, application_data)
+
+        except TypeError:
+            errmsg = 'Malformed data payload (base64 decode failed)'
+            self.getLogger().debug(
+                '[{}] evaluateApplicationData(): {}'.format(self.__module__,
+                                                            errmsg))
+            response = self.errorResponse(errmsg)
+
+        except Exception as ex:
+            self.getLogger().debug('[%s] %s' % (self.__module__, ex))
+            self.handleException(ex)
+            response = self.errorResponse(str(ex))
+
+        finally:
+            if application_data is not None:
+                releaseApplicationData(application_data)
+
+        return self.formatResponse(response)
@@ -41,6 +41,13 @@ class RuleController(TortugaController):
             'action': 'getRule',
             'method': ['GET'],
         },
+        {
+            'name': 'getRuleHistory',
+            'path': '/v1/rules/:(application_name)/name/:(rule_name)'
+                    '/history',
+            'action': 'getRuleHistory',
+            'method': ['GET'],
+        },
         {
             'name': 'deleteRule',
             'path': '/v1/rules/:(application_name)/name/:(rule_name)',
@@ -100,6 +107,31 @@ class RuleController(TortugaController):
 
         return self.formatResponse(response)
 
+    @authentication_required()
+    @cherrypy.tools.json_out()
+    @cherrypy.tools.json_in()
+    def getRuleHistory(self, application_name, rule_name):
+        """
+        Return recent evaluations of the specified rule.
+
+        """
+        try:
+            response = {
+                'history': ruleManager.getRuleHistory(
+                    application_name, rule_name),
+            }
+
+        except Exception as ex:
+            if not isinstance(ex, RuleNotFound):
+                self.getLogger().exception(
+                    '[{}] getRuleHistory() raised an exception'.format(
+                        self.__class__.__name__))
+
+            self.handleException(ex)
+            response = self.errorResponse(str(ex))
+
+        return self.formatResponse(response)
+
     @authentication_required()
     @cherrypy.tools.json_out()
     @cherrypy.tools.json_in()
@@ -12,9 +12,23 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import cherrypy
+
 from tortuga.rule.ruleManager import RuleManager
 from tortuga.rule.ruleObjectFactory import RuleObjectFactory
 
 
+# Stop the engine once the HTTP server has stopped taking requests
+ENGINE_STOP_PRIORITY = 60
+
+
 ruleObjectFactory = RuleObjectFactory()
 ruleManager = RuleManager(ruleObjectFactory)
+
+cherrypy.engine.subscribe('start', ruleManager.start)
+cherrypy.engine.subscribe(
+    'stop', ruleManager.stop, priority=ENGINE_STOP_PRIORITY)
+
+if cherrypy.engine.state == cherrypy.engine.states.STARTED:
+    # Controllers loaded after the web service started
+    ruleManager.start()